@@ -0,0 +1,18 @@
+import django_filters
+from core.models import Experiment
+from core.models.experiment import Status
+
+
+class ExperimentFilter(django_filters.FilterSet):
+    """Filtros del listado de experimentos (?name=, ?mouse_name=, ?status=, ?date_after=, ?date_before=)
+
+    name busca por subcadena sin distinguir mayúsculas; mouse_name exige el nombre completo.
+    """
+    name = django_filters.CharFilter(lookup_expr='icontains')
+    mouse_name = django_filters.CharFilter(lookup_expr='iexact')
+    status = django_filters.ChoiceFilter(choices=Status.choices)
+    date = django_filters.DateFromToRangeFilter()
+
+    class Meta:
+        model = Experiment
+        fields = ['name', 'mouse_name', 'status', 'date']
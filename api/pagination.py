@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ExperimentCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset): el coste de cada página no depende de su posición"""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -5,12 +5,18 @@ from .experiment_serializer import (
     ExperimentDetailSerializer,
     UploadExperimentSerializer,
     UpdateObjectLabelSerializer,
+    ReanalyzeExperimentSerializer,
+    TimeCourseQuerySerializer,
+    TrajectoryQuerySerializer,
+    HeatmapQuerySerializer,
+    EthogramQuerySerializer,
     ExperimentObjectSerializer  # Asegúrate que esté exportado desde experiment_serializer.py
 )
 from .clip_serializer import (
     ClipSerializer,
     ClipBasicSerializer,
     ClipDeleteSerializer,
+    ClipReviewSerializer,
     BehaviorSerializer,
     ExperimentObjectRefSerializer  # Añade esta línea
 )
@@ -22,10 +28,16 @@ __all__ = [
     'ExperimentDetailSerializer',
     'UploadExperimentSerializer',
     'UpdateObjectLabelSerializer',
+    'ReanalyzeExperimentSerializer',
+    'TimeCourseQuerySerializer',
+    'TrajectoryQuerySerializer',
+    'HeatmapQuerySerializer',
+    'EthogramQuerySerializer',
     'ExperimentObjectSerializer',
     'ClipSerializer',
     'ClipBasicSerializer',
     'ClipDeleteSerializer',
+    'ClipReviewSerializer',
     'BehaviorSerializer',
     'ExperimentObjectRefSerializer',
     'UserSerializer' # Añade esta línea
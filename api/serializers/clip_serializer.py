@@ -11,17 +11,30 @@ class BehaviorSerializer(serializers.ModelSerializer):
         model = Behavior
         fields = ['id', 'name', 'description']
 
-class ClipBasicSerializer(serializers.ModelSerializer):
+class ClipThumbnailsMixin(serializers.Serializer):
+    """URLs de póster y sprite sheet para previsualizar sin descargar el video"""
+    poster_url = serializers.SerializerMethodField()
+    sprite_url = serializers.SerializerMethodField()
+
+    def get_poster_url(self, obj):
+        return obj.poster.url if obj.poster else None
+
+    def get_sprite_url(self, obj):
+        return obj.sprite.url if obj.sprite else None
+
+class ClipBasicSerializer(ClipThumbnailsMixin, serializers.ModelSerializer):
     """Serializer mínimo para clips (usado en listados)"""
     behavior_name = serializers.SerializerMethodField()
     object_label = serializers.SerializerMethodField()
     object_time = serializers.SerializerMethodField()
+    video_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Clip
         fields = [
             'id', 'duration', 'start_time', 'end_time',
-            'behavior_name', 'object_label', 'object_time', 'video_url'
+            'behavior_name', 'object_label', 'object_time', 'video_url',
+            'poster_url', 'sprite_url', 'sprite_frames'
         ]
         read_only_fields = fields
 
@@ -50,7 +63,10 @@ class ClipBasicSerializer(serializers.ModelSerializer):
                 return 0.0
         return 0.0
 
-class ClipSerializer(serializers.ModelSerializer):
+    def get_video_url(self, obj):
+        return obj.video_clip.url if obj.video_clip else None
+
+class ClipSerializer(ClipThumbnailsMixin, serializers.ModelSerializer):
     """Serializer completo para clips"""
     behavior = serializers.SerializerMethodField()
     experiment_object = serializers.SerializerMethodField()
@@ -60,9 +76,10 @@ class ClipSerializer(serializers.ModelSerializer):
         model = Clip
         fields = [
             'id', 'experiment_id', 'start_time', 'end_time', 'duration',
-            'behavior', 'experiment_object', 'video_url', 'valid'
+            'behavior', 'experiment_object', 'video_url', 'valid',
+            'poster_url', 'sprite_url', 'sprite_frames'
         ]
-        read_only_fields = ['id', 'duration', 'video_url']
+        read_only_fields = ['id', 'duration', 'video_url', 'poster_url', 'sprite_url', 'sprite_frames']
 
     def get_behavior(self, obj):
         try:
@@ -96,8 +113,10 @@ class ClipDeleteSerializer(serializers.Serializer):
         if not experiment_id:
             raise serializers.ValidationError("experiment_id es requerido en el contexto")
         
+        # Solo se consultan los ids pedidos, no todos los del experimento
         existing_ids = set(Clip.objects.filter(
-            experiment_id=experiment_id
+            experiment_id=experiment_id,
+            id__in=value
         ).values_list('id', flat=True))
         
         invalid_ids = set(value) - existing_ids
@@ -105,4 +124,54 @@ class ClipDeleteSerializer(serializers.Serializer):
             raise serializers.ValidationError(
                 f"IDs no válidos para este experimento: {invalid_ids}"
             )
-        return value
\ No newline at end of file
+        return value
+
+class ClipReviewItemSerializer(serializers.Serializer):
+    clip_id = serializers.IntegerField()
+    valid = serializers.BooleanField(required=False)
+    behavior_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        if 'valid' not in attrs and 'behavior_id' not in attrs:
+            raise serializers.ValidationError("Cada cambio necesita 'valid' o 'behavior_id'")
+        return attrs
+
+class ClipReviewSerializer(serializers.Serializer):
+    """Serializer para la revisión masiva de clips (validez y comportamiento)"""
+    MAX_CHANGES = 5000
+
+    changes = serializers.ListField(
+        child=ClipReviewItemSerializer(),
+        min_length=1,
+        max_length=MAX_CHANGES
+    )
+
+    def validate_changes(self, value):
+        experiment_id = self.context.get('experiment_id')
+        if not experiment_id:
+            raise serializers.ValidationError("experiment_id es requerido en el contexto")
+
+        clip_ids = [change['clip_id'] for change in value]
+        if len(set(clip_ids)) != len(clip_ids):
+            raise serializers.ValidationError("Cada clip solo puede aparecer una vez")
+
+        existing_ids = set(Clip.objects.filter(
+            experiment_id=experiment_id,
+            id__in=clip_ids
+        ).values_list('id', flat=True))
+        invalid_ids = set(clip_ids) - existing_ids
+        if invalid_ids:
+            raise serializers.ValidationError(
+                f"IDs no válidos para este experimento: {sorted(invalid_ids)[:20]}"
+            )
+
+        behavior_ids = {change['behavior_id'] for change in value if change.get('behavior_id') is not None}
+        if behavior_ids:
+            invalid_behaviors = behavior_ids - set(
+                Behavior.objects.filter(id__in=behavior_ids).values_list('id', flat=True)
+            )
+            if invalid_behaviors:
+                raise serializers.ValidationError(
+                    f"Comportamientos no válidos: {sorted(invalid_behaviors)}"
+                )
+        return value
@@ -1,6 +1,10 @@
+from collections import defaultdict
 from rest_framework import serializers
 from core.models import Experiment, ExperimentObject, Clip
-from django.db.models import Sum
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from core.services.interaction_engine import KEYPOINT_NAMES
+from api.serializers.clip_serializer import ClipThumbnailsMixin
 
 class ExperimentObjectReferenceValidator:
     """Valida que la referencia del objeto sea única por experimento"""
@@ -45,43 +49,75 @@ class ExperimentSerializer(BaseExperimentSerializer):
             'clips_count'
         ]
 
+    @staticmethod
+    def annotate_list(queryset):
+        """Anota el número de clips y los datos de los objetos 1 y 2 (incluido su tiempo guardado).
+
+        Todo se resuelve con subconsultas correlacionadas en la misma sentencia SQL que lista
+        los experimentos, en lugar de una consulta por experimento y objeto.
+        """
+        clips_count = Clip.objects.filter(
+            experiment_id=OuterRef('id')
+        ).order_by().values('experiment_id').annotate(total=Count('id')).values('total')
+        annotations = {'clips_count': Coalesce(Subquery(clips_count), 0)}
+
+        for reference in ExperimentObject.Reference.values:
+            experiment_object = ExperimentObject.objects.filter(
+                experiment_id=OuterRef('id'),
+                reference=reference
+            )
+            for field in ('id', 'name', 'label', 'time'):
+                annotations[f"object_{reference}_{field}"] = Subquery(experiment_object.values(field)[:1])
+
+        return queryset.annotate(**annotations)
+
     def get_experiment_objects(self, obj):
-        from core.models import ExperimentObject, Clip, Behavior
-        
         # Solo procesar si el experimento está completado
         if obj.status != 'COM':
             return []
+
+        if hasattr(obj, 'clips_count'):
+            return self._annotated_objects(obj)
             
         objects = ExperimentObject.objects.filter(experiment_id=obj.id)
-        objects_data = []
-        
-        for obj in objects:
-            # Calcular tiempo total de exploración (clips válidos con behavior_type = 'EXP')
-            total_time = Clip.objects.filter(
-                experiment_id=obj.experiment_id,
-                experiment_object_id=obj.id,
-                valid=True,
-                behavior_id__in=Behavior.objects.filter(
-                    behavior_type='EXP'
-                ).values_list('id', flat=True)
-            ).aggregate(total=Sum('duration'))['total'] or 0.0
-            
-            objects_data.append({
+        return [
+            {
                 "id": obj.id,
                 "reference": obj.reference,
                 "name": obj.name,
                 "label": obj.label,
                 "label_display": obj.get_label_display(),
-                "time_object": round(total_time, 2)
+                # Tiempo de exploración mantenido por ExplorationTotalsService
+                "time_object": round(obj.time, 2)
+            }
+            for obj in objects
+        ]
+
+    def _annotated_objects(self, obj):
+        labels = dict(ExperimentObject.Label.choices)
+        objects_data = []
+        for reference in ExperimentObject.Reference.values:
+            prefix = f"object_{reference}"
+            if getattr(obj, f"{prefix}_id") is None:
+                continue
+            label = getattr(obj, f"{prefix}_label")
+            objects_data.append({
+                "id": getattr(obj, f"{prefix}_id"),
+                "reference": reference,
+                "name": getattr(obj, f"{prefix}_name"),
+                "label": label,
+                "label_display": labels.get(label, label),
+                "time_object": round(getattr(obj, f"{prefix}_time") or 0.0, 2)
             })
-            
         return objects_data
 
     def get_clips_count(self, obj):
+        if hasattr(obj, 'clips_count'):
+            return obj.clips_count
         from core.models import Clip
         return Clip.objects.filter(experiment_id=obj.id).count()
 
-class ClipBasicSerializer(serializers.ModelSerializer):
+class ClipBasicSerializer(ClipThumbnailsMixin, serializers.ModelSerializer):
     behavior_name = serializers.SerializerMethodField()
     object_name = serializers.SerializerMethodField()
 
@@ -89,21 +125,28 @@ class ClipBasicSerializer(serializers.ModelSerializer):
         model = Clip
         fields = [
             'id', 'video_clip', 'duration', 'start_time', 'end_time',
-            'behavior_id', 'behavior_name', 'experiment_object_id', 'object_name'
+            'behavior_id', 'behavior_name', 'experiment_object_id', 'object_name',
+            'poster_url', 'sprite_url', 'sprite_frames'
         ]
         read_only_fields = fields
 
     def get_behavior_name(self, obj):
         if obj.behavior_id:
-            from core.models import Behavior
-            behavior = Behavior.objects.filter(id=obj.behavior_id).first()
+            if 'behaviors_by_id' in self.context:
+                behavior = self.context['behaviors_by_id'].get(obj.behavior_id)
+            else:
+                from core.models import Behavior
+                behavior = Behavior.objects.filter(id=obj.behavior_id).first()
             return behavior.name if behavior else None
         return None
 
     def get_object_name(self, obj):
         if obj.experiment_object_id:
-            from core.models import ExperimentObject
-            obj = ExperimentObject.objects.filter(id=obj.experiment_object_id).first()
+            if 'objects_by_id' in self.context:
+                obj = self.context['objects_by_id'].get(obj.experiment_object_id)
+            else:
+                from core.models import ExperimentObject
+                obj = ExperimentObject.objects.filter(id=obj.experiment_object_id).first()
             return obj.name if obj else None
         return None
 
@@ -121,32 +164,28 @@ class ExperimentObjectWithClipsSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_clips(self, obj):
-        from core.models import Clip
-        clips = Clip.objects.filter(
-            experiment_id=obj.experiment_id,
-            experiment_object_id=obj.id,
-            valid=True
-        )
-        return ClipBasicSerializer(clips, many=True).data
+        if 'clips_by_object' in self.context:
+            clips = self.context['clips_by_object'].get(obj.id, [])
+        else:
+            from core.models import Clip
+            clips = Clip.objects.filter(
+                experiment_id=obj.experiment_id,
+                experiment_object_id=obj.id,
+                valid=True
+            )
+        return ClipBasicSerializer(clips, many=True, context=self.context).data
 
     def get_total_exploration_time(self, obj):
-        from core.models import Clip, Behavior
-        total = Clip.objects.filter(
-            experiment_id=obj.experiment_id,
-            experiment_object_id=obj.id,
-            valid=True,
-            behavior_id__in=Behavior.objects.filter(
-                behavior_type='EXP'
-            ).values_list('id', flat=True)
-        ).aggregate(total=Sum('duration'))['total']
-        return round(total, 2) if total else 0.0
+        return round(obj.time, 2) if obj.time else 0.0
 
 class ExperimentDetailSerializer(serializers.ModelSerializer):
-    objects = ExperimentObjectWithClipsSerializer(
-        many=True,
-        source='experimentobject_set',
-        read_only=True
-    )
+    """Detalle del experimento con sus objetos y clips.
+
+    Objetos, clips y comportamientos se cargan una sola vez por experimento (ver
+    lookup_context) y los serializers anidados los reciben en el contexto, así que el número
+    de consultas no depende del número de clips. Los tiempos de exploración son los guardados.
+    """
+    objects = serializers.SerializerMethodField()
     total_exploration_time = serializers.SerializerMethodField()
     status_display = serializers.CharField(
         source='get_status_display',
@@ -162,16 +201,40 @@ class ExperimentDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = fields
 
+    @staticmethod
+    def lookup_context(experiment_id: int) -> dict:
+        """Mapas de consulta del experimento: 3 consultas en total"""
+        from core.models import Behavior
+
+        objects = list(ExperimentObject.objects.filter(experiment_id=experiment_id))
+        clips_by_object = defaultdict(list)
+        for clip in Clip.objects.filter(experiment_id=experiment_id, valid=True):
+            clips_by_object[clip.experiment_object_id].append(clip)
+
+        behavior_ids = {clip.behavior_id for clips in clips_by_object.values() for clip in clips}
+        behavior_ids.discard(None)
+        behaviors_by_id = Behavior.objects.in_bulk(behavior_ids) if behavior_ids else {}
+
+        return {
+            'experiment_objects': objects,
+            'objects_by_id': {obj.id: obj for obj in objects},
+            'clips_by_object': clips_by_object,
+            'behaviors_by_id': behaviors_by_id
+        }
+
+    def to_representation(self, instance):
+        self._lookups = self.lookup_context(instance.id)
+        return super().to_representation(instance)
+
+    def get_objects(self, obj):
+        return ExperimentObjectWithClipsSerializer(
+            self._lookups['experiment_objects'],
+            many=True,
+            context={**self.context, **self._lookups}
+        ).data
+
     def get_total_exploration_time(self, obj):
-        from core.models import Clip, Behavior
-        total = Clip.objects.filter(
-            experiment_id=obj.id,
-            valid=True,
-            behavior_id__in=Behavior.objects.filter(
-                behavior_type='EXP'
-            ).values_list('id', flat=True)
-        ).aggregate(total=Sum('duration'))['total']
-        return round(total, 2) if total else 0.0
+        return round(obj.exploration_time, 2) if obj.exploration_time else 0.0
 
 class UploadExperimentSerializer(BaseExperimentSerializer):
     class Meta(BaseExperimentSerializer.Meta):
@@ -180,7 +243,7 @@ class UploadExperimentSerializer(BaseExperimentSerializer):
             'video_file': {'required': True}
         }
 
-class UpdateObjectLabelSerializer(serializers.Serializer, ExperimentObjectReferenceValidator):
+class UpdateObjectLabelSerializer(serializers.Serializer):
     reference = serializers.IntegerField(min_value=1, max_value=2)
     label = serializers.ChoiceField(choices=ExperimentObject.Label.choices)
     new_name = serializers.CharField(required=False, max_length=100)
@@ -190,4 +253,87 @@ class UpdateObjectLabelSerializer(serializers.Serializer, ExperimentObjectRefere
         if 'new_name' in validated_data:
             instance.name = validated_data['new_name']
         instance.save()
-        return instance
\ No newline at end of file
+        return instance
+
+class InteractionFacingSerializer(serializers.Serializer):
+    origin = serializers.ChoiceField(choices=KEYPOINT_NAMES, required=False, source='from')
+    to = serializers.ChoiceField(choices=KEYPOINT_NAMES, required=False)
+    max_angle = serializers.FloatField(required=False, min_value=0, max_value=180)
+
+    def to_internal_value(self, data):
+        # "from" es palabra reservada: se acepta en el JSON y se mapea al campo origin
+        data = dict(data)
+        if 'from' in data:
+            data['origin'] = data.pop('from')
+        return super().to_internal_value(data)
+
+
+class InteractionRuleSerializer(serializers.Serializer):
+    """Regla de InteractionEngine (keypoints, distancia, visibilidad y orientación)"""
+    name = serializers.CharField(required=False)
+    keypoints = serializers.ListField(child=serializers.ChoiceField(choices=KEYPOINT_NAMES), required=False, min_length=1)
+    max_distance = serializers.FloatField(required=False, min_value=0)
+    max_distance_cm = serializers.FloatField(required=False, min_value=0)
+    inside = serializers.BooleanField(required=False)
+    min_visibility = serializers.FloatField(required=False, min_value=0, max_value=1)
+    aggregate = serializers.ChoiceField(choices=['any', 'all', 'weighted'], required=False)
+    min_score = serializers.FloatField(required=False, min_value=0, max_value=1)
+    facing = InteractionFacingSerializer(required=False)
+    roi_class_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    exclude_roi_class_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class ReanalyzeExperimentSerializer(serializers.Serializer):
+    min_interaction_frames = serializers.IntegerField(required=False, min_value=1)
+    max_gap_frames = serializers.IntegerField(required=False, min_value=0)
+    max_class_change_frames = serializers.IntegerField(required=False, min_value=0)
+    proximity_threshold = serializers.FloatField(required=False, min_value=0)
+    interaction_rules = InteractionRuleSerializer(many=True, required=False, allow_empty=False)
+    pixels_per_cm = serializers.FloatField(required=False, min_value=0.001)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("Se requiere al menos un parámetro de análisis")
+        # Sin calibración la tarea fallaría en segundo plano: se rechaza aquí
+        uses_cm = any(rule.get('max_distance_cm') is not None for rule in attrs.get('interaction_rules') or [])
+        experiment = self.context.get('experiment')
+        stored_pixels_per_cm = (experiment.analysis_params or {}).get('pixels_per_cm') if experiment else None
+        if uses_cm and not (attrs.get('pixels_per_cm') or stored_pixels_per_cm):
+            raise serializers.ValidationError({
+                'pixels_per_cm': "max_distance_cm requiere pixels_per_cm en la petición o calibrado en el experimento"
+            })
+        return attrs
+
+
+class TimeWindowQuerySerializer(serializers.Serializer):
+    """Ventana opcional [start, end) en segundos común a las consultas de análisis"""
+    start = serializers.FloatField(required=False, min_value=0)
+    end = serializers.FloatField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        if attrs.get('start') is not None and attrs.get('end') is not None and attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError("end debe ser mayor que start")
+        return attrs
+
+
+class TimeCourseQuerySerializer(TimeWindowQuerySerializer):
+    bin = serializers.FloatField(required=False, default=60.0, min_value=0.01)
+    source = serializers.ChoiceField(choices=['exploration', 'interaction'], required=False, default='exploration')
+
+
+class TrajectoryQuerySerializer(TimeWindowQuerySerializer):
+    points = serializers.IntegerField(required=False, default=1000, min_value=2, max_value=20000)
+    keypoint = serializers.ChoiceField(choices=KEYPOINT_NAMES, required=False, default='nariz')
+    method = serializers.ChoiceField(choices=['lttb', 'minmax'], required=False, default='lttb')
+
+
+class HeatmapQuerySerializer(serializers.Serializer):
+    kind = serializers.ChoiceField(choices=['occupancy', 'nose'], required=False, default='occupancy')
+    grid = serializers.IntegerField(required=False, default=64, min_value=4, max_value=512)
+    split = serializers.ChoiceField(choices=['none', 'roi', 'episode'], required=False, default='none')
+    output = serializers.ChoiceField(choices=['json', 'png'], required=False, default='json')
+    map = serializers.CharField(required=False)
+
+
+class EthogramQuerySerializer(TimeWindowQuerySerializer):
+    resolution = serializers.FloatField(required=False, default=0.0, min_value=0)
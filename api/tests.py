@@ -1,3 +1,502 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from asgiref.sync import async_to_sync
+from types import SimpleNamespace
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.models import Experiment, ExperimentObject, Clip, Behavior
+from core.services.exploration_totals import ExplorationTotalsService
+from core.services.experiment_cache import ExperimentCacheService
+from core.services.synthetic_data import SyntheticDataGenerator
+from interfaces.progress.progress_publisher import ProgressPublisher
+from api.views.progress_view import ExperimentProgressStreamView
+from api.serializers import ReanalyzeExperimentSerializer
+from prometheus_client import REGISTRY
+from infrastructure.metrics.celery_exporter import _on_task_prerun, _on_task_postrun
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentDetailQueryCountTests(TestCase):
+    """El detalle del experimento se serializa con un número fijo de consultas"""
+    # versión + experimento + objetos + clips + comportamientos
+    DETAIL_QUERIES = 5
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.experiment = Experiment.objects.create(
+            name="Detalle", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/detalle.mp4", status='COM'
+        )
+        self.objects = [
+            ExperimentObject.objects.create(
+                experiment_id=self.experiment.id, reference=reference,
+                name=f"Objeto {reference}", label=label
+            )
+            for reference, label in ((1, ExperimentObject.Label.NOVEL), (2, ExperimentObject.Label.FAMILIAR))
+        ]
+        self.behaviors = list(Behavior.objects.all())
+
+    def create_clips(self, count):
+        clips = Clip.objects.bulk_create([
+            Clip(
+                experiment_id=self.experiment.id,
+                experiment_object_id=self.objects[i % 2].id,
+                behavior_id=self.behaviors[i % len(self.behaviors)].id,
+                video_clip=f"experiments/{self.experiment.id}/clips/clip_{i}.mp4",
+                start_time=float(i),
+                end_time=i + 0.5,
+                duration=0.5,
+                valid=i % 10 != 9
+            )
+            for i in range(count)
+        ])
+        ExplorationTotalsService.clips_added(clips)
+
+    def get_detail(self):
+        return self.client.get(reverse('experiment-detail', args=[self.experiment.id]))
+
+    def test_query_count_does_not_grow_with_clips(self):
+        self.create_clips(10)
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.get_detail()
+        self.assertEqual(response.status_code, 200)
+
+        self.create_clips(500)
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.get_detail()
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_content(self):
+        self.create_clips(40)
+        data = self.get_detail().json()['data']
+
+        self.assertEqual([obj['reference'] for obj in data['objects']], [1, 2])
+        valid_clips = Clip.objects.filter(experiment_id=self.experiment.id, valid=True)
+        self.assertEqual(sum(len(obj['clips']) for obj in data['objects']), valid_clips.count())
+
+        behavior_names = {b.id: b.name for b in self.behaviors}
+        exploration_ids = {b.id for b in self.behaviors if b.behavior_type == Behavior.BehaviorType.EXPLORATION}
+        for obj in data['objects']:
+            expected = sum(
+                clip.duration for clip in valid_clips
+                if clip.experiment_object_id == obj['id'] and clip.behavior_id in exploration_ids
+            )
+            self.assertAlmostEqual(obj['total_exploration_time'], round(expected, 2))
+            for clip in obj['clips']:
+                self.assertEqual(clip['behavior_name'], behavior_names[clip['behavior_id']])
+                self.assertEqual(clip['object_name'], obj['name'])
+
+        self.assertAlmostEqual(
+            data['total_exploration_time'],
+            round(sum(obj['total_exploration_time'] for obj in data['objects']), 2)
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentListTests(TestCase):
+    """Listado paginado por cursor con conteos y tiempos anotados en una sola consulta"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.exploration = Behavior.objects.filter(behavior_type=Behavior.BehaviorType.EXPLORATION).first()
+
+    def create_experiments(self, count, status='COM', mouse_name="Ratón 1", date="2025-01-01"):
+        experiments = []
+        for i in range(count):
+            experiment = Experiment.objects.create(
+                name=f"Experimento {i}", mouse_name=mouse_name, date=date,
+                video_file=f"experiments/videos/{i}.mp4", status=status
+            )
+            obj = ExperimentObject.objects.create(
+                experiment_id=experiment.id, reference=1, name="Objeto 1", label=ExperimentObject.Label.NOVEL
+            )
+            clips = Clip.objects.bulk_create([
+                Clip(
+                    experiment_id=experiment.id, experiment_object_id=obj.id,
+                    behavior_id=self.exploration.id, video_clip=f"experiments/{experiment.id}/clips/{j}.mp4",
+                    start_time=float(j), end_time=j + 1.25, duration=1.25
+                )
+                for j in range(3)
+            ])
+            ExplorationTotalsService.clips_added(clips)
+            experiments.append(experiment)
+        return experiments
+
+    def get_list(self, **params):
+        return self.client.get(reverse('experiment-list'), params)
+
+    def test_single_query_per_page(self):
+        self.create_experiments(5)
+        with self.assertNumQueries(1):
+            response = self.get_list()
+        self.assertEqual(response.status_code, 200)
+
+        self.create_experiments(30)
+        with self.assertNumQueries(1):
+            response = self.get_list(page_size=20)
+        self.assertEqual(len(response.json()['data']), 20)
+
+    def test_annotated_values(self):
+        experiment, = self.create_experiments(1)
+        data = self.get_list().json()['data'][0]
+
+        self.assertEqual(data['id'], experiment.id)
+        self.assertEqual(data['clips_count'], 3)
+        self.assertEqual(len(data['experiment_objects']), 1)
+        self.assertEqual(data['experiment_objects'][0]['reference'], 1)
+        self.assertEqual(data['experiment_objects'][0]['label_display'], 'Novel')
+        self.assertAlmostEqual(data['experiment_objects'][0]['time_object'], 3.75)
+
+    def test_cursor_walks_every_experiment_once(self):
+        experiments = self.create_experiments(7)
+        seen, response = [], self.get_list(page_size=3).json()
+        while True:
+            seen.extend(item['id'] for item in response['data'])
+            if not response['next']:
+                break
+            response = self.client.get(response['next']).json()
+        self.assertEqual(seen, [e.id for e in reversed(experiments)])
+
+    def test_filters(self):
+        self.create_experiments(2, status='COM', mouse_name="Ratón A", date="2025-01-10")
+        self.create_experiments(3, status='PRO', mouse_name="Ratón B", date="2025-02-10")
+
+        self.assertEqual(len(self.get_list(status='PRO').json()['data']), 3)
+        self.assertEqual(len(self.get_list(mouse_name='ratón a').json()['data']), 2)
+        self.assertEqual(len(self.get_list(mouse_name='ratón').json()['data']), 0)
+        self.assertEqual(len(self.get_list(name='experimento').json()['data']), 5)
+        self.assertEqual(len(self.get_list(name='MENTO 2').json()['data']), 1)
+        self.assertEqual(len(self.get_list(date_after='2025-02-01').json()['data']), 3)
+        self.assertEqual(len(self.get_list(date_before='2025-01-31').json()['data']), 2)
+        self.assertEqual(self.get_list(status='XXX').status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentResponseCacheTests(TestCase):
+    """Las lecturas repetidas salen de la caché versionada y se revalidan con ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.experiment = Experiment.objects.create(
+            name="Caché", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/cache.mp4", status='COM'
+        )
+        ExperimentObject.objects.create(
+            experiment_id=self.experiment.id, reference=2, name="Objeto 2", label=ExperimentObject.Label.FAMILIAR
+        )
+        self.detail_url = reverse('experiment-detail', args=[self.experiment.id])
+
+    def test_repeat_detail_only_checks_version(self):
+        first = self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.detail_url)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_label_update_bumps_version(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                reverse('update-label', args=[self.experiment.id]),
+                {'reference': 2, 'label': ExperimentObject.Label.FAMILIAR, 'new_name': "Cubo"},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['data']['objects'][0]['name'], "Cubo")
+
+    def test_list_served_from_cache_until_a_mutation(self):
+        list_url = reverse('experiment-list')
+        etag = self.client.get(list_url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ExperimentCacheService.bump(self.experiment.id)
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ClipReviewTests(TestCase):
+    """La revisión masiva aplica miles de cambios con un número fijo de consultas"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.experiment = Experiment.objects.create(
+            name="Revisión", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/revision.mp4", status='COM'
+        )
+        self.objects = [
+            ExperimentObject.objects.create(
+                experiment_id=self.experiment.id, reference=reference, name=f"Objeto {reference}"
+            )
+            for reference in (1, 2)
+        ]
+        self.behaviors = list(Behavior.objects.all())
+        clips = Clip.objects.bulk_create([
+            Clip(
+                experiment_id=self.experiment.id,
+                experiment_object_id=self.objects[i % 2].id,
+                behavior_id=self.behaviors[i % len(self.behaviors)].id,
+                video_clip=f"experiments/{self.experiment.id}/clips/clip_{i}.mp4",
+                start_time=float(i), end_time=i + 0.5, duration=0.5
+            )
+            for i in range(2000)
+        ])
+        ExplorationTotalsService.clips_added(clips)
+        self.clip_ids = [clip.id for clip in clips]
+        self.url = reverse('review-clips', args=[self.experiment.id])
+
+    def review(self, changes):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'changes': changes}, format='json')
+        return response, len(queries)
+
+    def changes(self, ids):
+        return [
+            {'clip_id': clip_id, 'valid': i % 3 != 0, 'behavior_id': self.behaviors[(i + 1) % len(self.behaviors)].id}
+            for i, clip_id in enumerate(ids)
+        ]
+
+    def test_query_count_does_not_grow_with_changes(self):
+        small, small_queries = self.review(self.changes(self.clip_ids[:20]))
+        large, large_queries = self.review(self.changes(self.clip_ids[20:]))
+        self.assertEqual(small.status_code, 200)
+        self.assertEqual(large.status_code, 200)
+        self.assertEqual(small_queries, large_queries)
+        self.assertEqual(large.json()['data']['updated_clips'], 1980)
+
+    def test_totals_match_clips(self):
+        response, _ = self.review(self.changes(self.clip_ids[:1500]) + [
+            {'clip_id': clip_id, 'valid': False} for clip_id in self.clip_ids[1500:1600]
+        ])
+        data = response.json()['data']
+
+        exploration_ids = ExplorationTotalsService.exploration_behavior_ids()
+        clips = Clip.objects.filter(experiment_id=self.experiment.id, valid=True, behavior_id__in=exploration_ids)
+        self.assertAlmostEqual(data['exploration_time'], round(sum(c.duration for c in clips), 2))
+        for obj in data['objects']:
+            expected = sum(c.duration for c in clips if c.experiment_object_id == obj['id'])
+            self.assertAlmostEqual(obj['time_object'], round(expected, 2))
+        self.assertFalse(Clip.objects.filter(id__in=self.clip_ids[1500:1600], valid=True).exists())
+
+    def test_rejects_foreign_and_duplicate_ids(self):
+        other = Experiment.objects.create(
+            name="Otro", mouse_name="Ratón 2", date="2025-01-01", video_file="experiments/videos/otro.mp4"
+        )
+        foreign = Clip.objects.create(
+            experiment_id=other.id, video_clip="experiments/x.mp4", start_time=0.0, end_time=1.0, duration=1.0
+        )
+        response, _ = self.review([{'clip_id': foreign.id, 'valid': False}])
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.review([{'clip_id': self.clip_ids[0], 'valid': False}] * 2)
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.review([{'clip_id': self.clip_ids[0]}])
+        self.assertEqual(response.status_code, 400)
+
+
+class LateCompletionPublisher(ProgressPublisher):
+    """Publicador en memoria que completa el experimento justo después de leer el snapshot"""
+
+    class Subscription:
+        def __init__(self):
+            self.messages = []
+
+        def get(self, timeout):
+            return self.messages.pop(0) if self.messages else None
+
+        def close(self):
+            pass
+
+    def __init__(self):
+        self.snapshot = {'experiment_id': 1, 'stage': 'keypoints', 'current': 10, 'total': 100}
+        self.subscriptions = []
+
+    def publish(self, experiment_id, stage, current=None, total=None, status=None):
+        self.snapshot = {'experiment_id': experiment_id, 'stage': stage, 'current': current, 'total': total}
+        for subscription in self.subscriptions:
+            subscription.messages.append(self.snapshot)
+
+    def get_snapshot(self, experiment_id):
+        snapshot = self.snapshot
+        self.publish(experiment_id, 'completed', status='COM')
+        return snapshot
+
+    def subscribe(self, experiment_id):
+        subscription = self.Subscription()
+        self.subscriptions.append(subscription)
+        return subscription
+
+
+class ProgressStreamTests(TestCase):
+    """El stream de progreso no pierde el evento final publicado al abrirse"""
+
+    @async_to_sync
+    async def drain(self, publisher, limit=5):
+        events = []
+        async for event in ExperimentProgressStreamView()._event_stream(publisher, 1):
+            events.append(event)
+            if len(events) >= limit:
+                break
+        return events
+
+    def test_completion_between_snapshot_and_subscribe_ends_stream(self):
+        events = self.drain(LateCompletionPublisher())
+        self.assertEqual(len(events), 2)
+        self.assertIn('"stage": "keypoints"', events[0])
+        self.assertIn('"stage": "completed"', events[1])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MetricsTests(TestCase):
+    """/metrics expone latencia, consultas por petición y duración de tareas"""
+
+    def setUp(self):
+        cache.clear()
+        self.experiment = Experiment.objects.create(
+            name="Métricas", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/metricas.mp4", status='COM'
+        )
+        self.client = APIClient()
+
+    @staticmethod
+    def sample(name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def test_metrics_endpoint_exposes_request_series(self):
+        self.client.get(reverse('experiment-detail', args=[self.experiment.id]))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE ratlab_api_request_duration_seconds histogram', body)
+        self.assertIn('ratlab_api_request_duration_seconds_bucket{', body)
+        self.assertIn('# TYPE ratlab_api_db_queries histogram', body)
+        self.assertIn('ratlab_api_db_queries_count{', body)
+
+    def test_middleware_counts_queries_of_one_request(self):
+        url = reverse('experiment-detail', args=[self.experiment.id])
+        view = self.client.get(url).wsgi_request.resolver_match.func.view_class.__name__
+        labels = {'view': view, 'method': 'GET'}
+        queries_before = self.sample('ratlab_api_db_queries_sum', labels)
+        count_before = self.sample('ratlab_api_db_queries_count', labels)
+        latency_before = self.sample(
+            'ratlab_api_request_duration_seconds_count', {**labels, 'status': '200'}
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        self.assertEqual(self.sample('ratlab_api_db_queries_count', labels), count_before + 1)
+        self.assertEqual(self.sample('ratlab_api_db_queries_sum', labels), queries_before + len(queries))
+        self.assertEqual(
+            self.sample('ratlab_api_request_duration_seconds_count', {**labels, 'status': '200'}),
+            latency_before + 1
+        )
+
+    def test_celery_signals_record_duration_and_state(self):
+        task = SimpleNamespace(name='core.tasks.metricas_prueba')
+        for task_id, state in (('ok', 'SUCCESS'), ('ko', 'FAILURE')):
+            _on_task_prerun(task_id=task_id, task=task)
+            _on_task_postrun(task_id=task_id, task=task, state=state)
+        for state in ('SUCCESS', 'FAILURE'):
+            labels = {'task': task.name, 'state': state}
+            self.assertEqual(self.sample('ratlab_celery_task_duration_seconds_count', labels), 1)
+            self.assertGreaterEqual(self.sample('ratlab_celery_task_duration_seconds_sum', labels), 0)
+
+        # Un postrun sin prerun (worker reiniciado) no registra nada
+        _on_task_postrun(task_id='desconocida', task=task, state='SUCCESS')
+        self.assertEqual(
+            self.sample('ratlab_celery_task_duration_seconds_count', {'task': task.name, 'state': 'SUCCESS'}), 1
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ExperimentHeatmapViewTests(TestCase):
+    """Heatmap en JSON y PNG, separado por ROI sin timecourse previo, y 404 con un mapa desconocido"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+        self.experiment = SyntheticDataGenerator(seed=4).create_analysis_experiment(frames=600, clips_per_object=1)
+
+    def get_heatmap(self, **params):
+        return self.client.get(reverse('experiment-heatmap', args=[self.experiment.id]), params)
+
+    def test_json(self):
+        response = self.get_heatmap(grid=32)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['grid'], [32, 18])
+        self.assertEqual(len(data['maps']['all']), 18)
+        self.assertEqual(len(data['maps']['all'][0]), 32)
+
+    def test_split_builds_missing_timecourse(self):
+        response = self.get_heatmap(split='roi')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['data']['maps']), ['objeto_1', 'objeto_2'])
+
+    def test_png(self):
+        response = self.get_heatmap(output='png', split='episode', map='outside_episode')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG\r\n\x1a\n'))
+
+    def test_unknown_map_returns_404(self):
+        response = self.get_heatmap(output='png', map='objeto_99')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['status'], 'error')
+
+
+class ReanalyzeValidationTests(TestCase):
+    """Una regla en centímetros necesita calibración antes de encolar el re-análisis"""
+    RULES = [{'keypoints': ['nariz'], 'max_distance_cm': 3.0}]
+
+    def setUp(self):
+        self.experiment = Experiment.objects.create(
+            name="Calibración", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/calibracion.mp4", status='COM',
+            analysis_params={'proximity_threshold': 40}
+        )
+
+    def serializer(self, **data):
+        return ReanalyzeExperimentSerializer(data=data, context={'experiment': self.experiment})
+
+    def test_rule_in_cm_without_calibration_is_rejected(self):
+        serializer = self.serializer(interaction_rules=self.RULES)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('pixels_per_cm', serializer.errors)
+
+        response = APIClient().post(
+            reverse('experiment-reanalyze', args=[self.experiment.id]),
+            {'interaction_rules': self.RULES}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('pixels_per_cm', response.json()['errors'])
+
+    def test_calibration_from_request_or_experiment(self):
+        self.assertTrue(self.serializer(interaction_rules=self.RULES, pixels_per_cm=12.5).is_valid())
+        self.experiment.analysis_params = {'pixels_per_cm': 12.5}
+        self.assertTrue(self.serializer(interaction_rules=self.RULES).is_valid())
+        self.assertTrue(self.serializer(interaction_rules=[{'keypoints': ['nariz'], 'max_distance': 30}]).is_valid())
@@ -4,8 +4,16 @@ from api.views import (
     ExperimentUploadView,
     ExperimentListView,
     ExperimentDetailView,
+    ExperimentStatusView,
+    ExperimentProgressStreamView,
+    ExperimentReanalyzeView,
+    ExperimentTimeCourseView,
+    ExperimentTrajectoryView,
+    ExperimentHeatmapView,
+    ExperimentEthogramView,
     UpdateObjectLabelView,
-    ClipDeleteView
+    ClipDeleteView,
+    ClipReviewView
 )
 
 urlpatterns = [
@@ -16,8 +24,16 @@ urlpatterns = [
     path('experiments/', ExperimentUploadView.as_view(), name='experiment-upload'),
     path('experiments/list/', ExperimentListView.as_view(), name='experiment-list'),
     path('experiments/<int:experiment_id>/', ExperimentDetailView.as_view(), name='experiment-detail'),
+    path('experiments/<int:experiment_id>/status/', ExperimentStatusView.as_view(), name='experiment-status'),
+    path('experiments/<int:experiment_id>/progress/', ExperimentProgressStreamView.as_view(), name='experiment-progress'),
+    path('experiments/<int:experiment_id>/reanalyze/', ExperimentReanalyzeView.as_view(), name='experiment-reanalyze'),
+    path('experiments/<int:experiment_id>/timecourse/', ExperimentTimeCourseView.as_view(), name='experiment-timecourse'),
+    path('experiments/<int:experiment_id>/trajectory/', ExperimentTrajectoryView.as_view(), name='experiment-trajectory'),
+    path('experiments/<int:experiment_id>/heatmap/', ExperimentHeatmapView.as_view(), name='experiment-heatmap'),
+    path('experiments/<int:experiment_id>/ethogram/', ExperimentEthogramView.as_view(), name='experiment-ethogram'),
     path('experiments/<int:experiment_id>/update-label/', UpdateObjectLabelView.as_view(), name='update-label'),
     
     # Endpoints de Clips
     path('experiments/<int:experiment_id>/clips/delete/', ClipDeleteView.as_view(), name='delete-clips'),
+    path('experiments/<int:experiment_id>/clips/review/', ClipReviewView.as_view(), name='review-clips'),
 ]
\ No newline at end of file
@@ -3,9 +3,18 @@ from .experiment_view import (
     ExperimentUploadView,
     ExperimentListView,
     ExperimentDetailView,
+    ExperimentStatusView,
+    ExperimentReanalyzeView,
     UpdateObjectLabelView
 )
-from .clip_view import ClipDeleteView
+from .progress_view import ExperimentProgressStreamView
+from .analysis_view import (
+    ExperimentTimeCourseView,
+    ExperimentTrajectoryView,
+    ExperimentHeatmapView,
+    ExperimentEthogramView
+)
+from .clip_view import ClipDeleteView, ClipReviewView
 from .auth_view import (UserCreateView, LoginView)  # Asegúrate de que tu vista de creación de usuario esté importada
 
 __all__ = [
@@ -14,6 +23,14 @@ __all__ = [
     'ExperimentUploadView',
     'ExperimentListView',
     'ExperimentDetailView',
+    'ExperimentStatusView',
+    'ExperimentProgressStreamView',
+    'ExperimentReanalyzeView',
+    'ExperimentTimeCourseView',
+    'ExperimentTrajectoryView',
+    'ExperimentHeatmapView',
+    'ExperimentEthogramView',
     'UpdateObjectLabelView',
-    'ClipDeleteView'
+    'ClipDeleteView',
+    'ClipReviewView'
 ]
\ No newline at end of file
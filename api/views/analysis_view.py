@@ -0,0 +1,169 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from core.services.timecourse import TimeCourseService
+from core.services.trajectory_service import TrajectoryService
+from core.services.heatmaps import HeatmapService
+from core.services.ethogram import EthogramService
+from api.serializers.experiment_serializer import (
+    TimeCourseQuerySerializer,
+    TrajectoryQuerySerializer,
+    HeatmapQuerySerializer,
+    EthogramQuerySerializer
+)
+from core.models import Experiment
+import logging
+
+logger = logging.getLogger(__name__)
+
+def etag_matches(request, etag: str) -> bool:
+    """Compara If-None-Match (lista de ETags, débiles o no) con el ETag actual"""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in candidates or etag in candidates
+
+class ExperimentTimeCourseView(APIView):
+    """Exploración por bin de tiempo, índice de discriminación y curvas acumuladas (GET)"""
+    def get(self, request, experiment_id):
+        experiment = get_object_or_404(Experiment, id=experiment_id)
+
+        serializer = TimeCourseQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+
+        try:
+            data = TimeCourseService().build(
+                experiment,
+                bin_seconds=params['bin'],
+                start=params.get('start'),
+                end=params.get('end'),
+                source=params['source']
+            )
+        except FileNotFoundError as e:
+            return Response(
+                {"status": "error", "message": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response({
+            "status": "success",
+            "data": data
+        })
+
+class ExperimentTrajectoryView(APIView):
+    """Trayectoria submuestreada de un keypoint en una ventana de tiempo (GET, cacheable por ETag)"""
+    def get(self, request, experiment_id):
+        experiment = get_object_or_404(Experiment, id=experiment_id)
+
+        serializer = TrajectoryQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+
+        service = TrajectoryService()
+        try:
+            store = service.get_store(experiment)
+        except FileNotFoundError as e:
+            return Response(
+                {"status": "error", "message": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # El ETag depende solo del almacén y de los parámetros: un 304 no toca los datos
+        etag = service.etag(store, params)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = service.get_track(
+            experiment,
+            store,
+            keypoint=params['keypoint'],
+            start=params.get('start'),
+            end=params.get('end'),
+            points=params['points'],
+            method=params['method']
+        )
+        return Response({
+            "status": "success",
+            "data": data
+        }, headers=headers)
+
+class ExperimentHeatmapView(APIView):
+    """Heatmaps de ocupación o de la nariz servidos desde la caché del experimento (GET)"""
+    def get(self, request, experiment_id):
+        experiment = get_object_or_404(Experiment, id=experiment_id)
+
+        serializer = HeatmapQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+
+        try:
+            service = HeatmapService.for_experiment(experiment)
+            if params['output'] == 'png':
+                image = service.png(params['kind'], params['grid'], params['split'], name=params.get('map'))
+                return HttpResponse(image, content_type='image/png')
+            result = service.get(params['kind'], params['grid'], params['split'])
+        except FileNotFoundError as e:
+            return Response(
+                {"status": "error", "message": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except KeyError:
+            return Response(
+                {"status": "error", "message": f"Mapa no encontrado: {params.get('map')}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        data = {k: v for k, v in result.items() if k != 'maps'}
+        data['maps'] = {name: values.round(3).tolist() for name, values in result['maps'].items()}
+        return Response({
+            "status": "success",
+            "data": data
+        })
+
+class ExperimentEthogramView(APIView):
+    """Etograma por tramos en una ventana, uniendo tramos más cortos que la resolución (GET)"""
+    def get(self, request, experiment_id):
+        experiment = get_object_or_404(Experiment, id=experiment_id)
+
+        serializer = EthogramQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        params = serializer.validated_data
+
+        try:
+            data = EthogramService().build(
+                experiment,
+                start=params.get('start'),
+                end=params.get('end'),
+                resolution=params['resolution']
+            )
+        except FileNotFoundError as e:
+            return Response(
+                {"status": "error", "message": str(e)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        return Response({
+            "status": "success",
+            "data": data
+        })
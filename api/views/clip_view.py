@@ -2,7 +2,9 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from core.models import Clip
-from api.serializers import ClipDeleteSerializer
+from core.services.exploration_totals import ExplorationTotalsService
+from core.services.clip_review import ClipReviewService
+from api.serializers import ClipDeleteSerializer, ClipReviewSerializer
 
 class ClipDeleteView(APIView):
     """Endpoint para eliminar múltiples clips (POST)"""
@@ -18,11 +20,11 @@ class ClipDeleteView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Actualizado para usar el manager estándar y filter por experiment_id
-        deleted_count, _ = Clip.objects.filter(
+        # Los totales de exploración se descuentan en la misma transacción que el borrado
+        deleted_count = ExplorationTotalsService.delete_clips(Clip.objects.filter(
             id__in=serializer.validated_data['clip_ids'],
             experiment_id=experiment_id
-        ).delete()
+        ))
 
         return Response({
             "status": "success",
@@ -30,4 +32,25 @@ class ClipDeleteView(APIView):
                 "deleted_clips": deleted_count,
                 "experiment_id": experiment_id
             }
-        })
\ No newline at end of file
+        })
+
+class ClipReviewView(APIView):
+    """Endpoint para revisar (validar / cambiar comportamiento) miles de clips en una petición (POST)"""
+    def post(self, request, experiment_id):
+        serializer = ClipReviewSerializer(
+            data=request.data,
+            context={'experiment_id': experiment_id}
+        )
+
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = ClipReviewService().review(experiment_id, serializer.validated_data['changes'])
+
+        return Response({
+            "status": "success",
+            "data": result
+        })
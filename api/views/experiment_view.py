@@ -5,19 +5,44 @@ from rest_framework.parsers import MultiPartParser
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from core.services.experiment_service import ExperimentService
+from core.services.experiment_status import ExperimentStatusService
+from core.services.experiment_cache import ExperimentCacheService
 from infrastructure.storage.docker_volume_storage import DockerVolumeStorage
 from infrastructure.ai.celery_adapter import CeleryVideoAdapter
+from infrastructure.progress import RedisProgressPublisher
 from api.serializers.experiment_serializer import (
     UploadExperimentSerializer,
     ExperimentSerializer,
     ExperimentDetailSerializer,
-    UpdateObjectLabelSerializer
+    UpdateObjectLabelSerializer,
+    ReanalyzeExperimentSerializer
 )
 from core.models import Experiment, Clip, ExperimentObject
+from api.filters import ExperimentFilter
+from api.pagination import ExperimentCursorPagination
+from api.views.analysis_view import etag_matches
 import logging
 
 logger = logging.getLogger(__name__)
 
+def cached_response(request, key: str, build):
+    """Respuesta desde la caché versionada, con ETag y 304 si el cliente ya la tiene.
+
+    build() devuelve el payload a cachear o una Response (errores), que no se cachea.
+    """
+    etag = ExperimentCacheService.etag(key)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    payload = ExperimentCacheService.get(key)
+    if payload is None:
+        payload = build()
+        if isinstance(payload, Response):
+            return payload
+        ExperimentCacheService.set(key, payload)
+    return Response(payload, headers=headers)
+
 class ExperimentUploadView(APIView):
     """Endpoint para subir nuevos experimentos (POST)"""
     parser_classes = [MultiPartParser]
@@ -59,38 +84,42 @@ class ExperimentUploadView(APIView):
             )
 
 class ExperimentStatusView(APIView):
-    """Endpoint para verificar estado de procesamiento (GET)"""
+    """Endpoint ligero para verificar estado de procesamiento (GET)"""
     def get(self, request, experiment_id):
-        experiment = get_object_or_404(
-            Experiment.objects.only('status'),
-            id=experiment_id
-        )
+        service = ExperimentStatusService(progress_publisher=RedisProgressPublisher())
+        data = service.get_status(experiment_id)
         
-        # Contar clips manualmente usando experiment_id
-        clips_count = Clip.objects.filter(experiment_id=experiment.id).count()
+        if data is None:
+            return Response(
+                {"status": "error", "message": "Experimento no encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
         return Response({
             "status": "success",
-            "data": {
-                "experiment_id": experiment.id,
-                "processing_status": experiment.status,
-                "clips_count": clips_count
-            }
+            "data": data
         })
 
 class ExperimentDetailView(APIView):
+    """Detalle del experimento (GET), cacheado por versión y revalidable con ETag"""
     def get(self, request, experiment_id):
-        experiment = get_object_or_404(
-            Experiment.objects,
-            id=experiment_id
+        # Única consulta en una visita repetida: la versión actual del experimento
+        version = ExperimentCacheService.experiment_version(experiment_id)
+        if version is None:
+            return Response(
+                {"status": "error", "message": "Experimento no encontrado"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        key = ExperimentCacheService.detail_key(
+            experiment_id, version, request.user.pk, request.build_absolute_uri()
         )
-        
-        # Solo necesitas pasar el experiment al serializer
-        serializer = ExperimentDetailSerializer(experiment, context={'request': request})
-        
-        return Response({
+        return cached_response(request, key, lambda: {
             "status": "success",
-            "data": serializer.data
+            "data": ExperimentDetailSerializer(
+                get_object_or_404(Experiment.objects, id=experiment_id),
+                context={'request': request}
+            ).data
         })
 
 class UpdateObjectLabelView(APIView):
@@ -128,7 +157,8 @@ class UpdateObjectLabelView(APIView):
             updated_object = service.update_object_label(
                 experiment_id=experiment_id,
                 reference=serializer.validated_data['reference'],
-                new_label=serializer.validated_data['label']
+                new_label=serializer.validated_data['label'],
+                new_name=serializer.validated_data.get('new_name')
             )
 
             return Response({
@@ -150,17 +180,71 @@ class UpdateObjectLabelView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+class ExperimentReanalyzeView(APIView):
+    """Endpoint para re-analizar un experimento con nuevos parámetros (POST)"""
+    def post(self, request, experiment_id):
+        experiment = get_object_or_404(Experiment, id=experiment_id)
+        
+        serializer = ReanalyzeExperimentSerializer(data=request.data, context={'experiment': experiment})
+        if not serializer.is_valid():
+            return Response(
+                {"status": "error", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            service = ExperimentService(
+                file_storage=DockerVolumeStorage(),
+                video_processor=CeleryVideoAdapter()
+            )
+            task = service.request_reanalysis(experiment_id, serializer.validated_data)
+        except ValueError as e:
+            return Response(
+                {"status": "error", "message": str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        return Response({
+            "status": "success",
+            "data": {
+                "experiment_id": experiment_id,
+                "analyzer_params": serializer.validated_data,
+                "task_id": task['task_id'],
+                "task_status": task['status']
+            }
+        }, status=status.HTTP_202_ACCEPTED)
+        
 class ExperimentListView(APIView):
+    """Listado paginado por cursor (?cursor=, ?page_size=) con filtros de ExperimentFilter.
+
+    Las páginas se cachean con la versión global del listado, que sube con cualquier cambio
+    de un experimento, así que una visita repetida no consulta la base de datos.
+    """
+    pagination_class = ExperimentCursorPagination
+
     def get(self, request):
-        queryset = Experiment.objects.all().order_by('-created_at')
-        
-        if name := request.query_params.get('name'):
-            queryset = queryset.filter(name__iexact=name)
+        key = ExperimentCacheService.list_key(
+            ExperimentCacheService.list_version(), request.user.pk, request.build_absolute_uri()
+        )
+        return cached_response(request, key, lambda: self._build(request))
 
-        serializer = ExperimentSerializer(queryset, many=True)
+    def _build(self, request):
+        filterset = ExperimentFilter(request.query_params, queryset=Experiment.objects.all())
+        if not filterset.is_valid():
+            return Response(
+                {"status": "error", "errors": filterset.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = ExperimentSerializer.annotate_list(filterset.qs)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = ExperimentSerializer(page, many=True)
         
-        return Response({
+        return {
             "status": "success",
             "data": serializer.data,
-            "count": len(serializer.data)
-        })
\ No newline at end of file
+            "count": len(serializer.data),
+            "next": paginator.get_next_link(),
+            "previous": paginator.get_previous_link()
+        }
@@ -0,0 +1,60 @@
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.views import View
+from core.services.experiment_status import ExperimentStatusService
+from infrastructure.progress import RedisProgressPublisher
+
+logger = logging.getLogger(__name__)
+
+class ExperimentProgressStreamView(View):
+    """Endpoint Server-Sent-Events con el progreso del procesamiento (GET)"""
+    HEARTBEAT_SECONDS = 15
+    TERMINAL_STAGES = RedisProgressPublisher.TERMINAL_STAGES
+
+    async def get(self, request, experiment_id):
+        publisher = RedisProgressPublisher()
+        response = StreamingHttpResponse(
+            self._event_stream(publisher, experiment_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Evita el buffering en nginx
+        return response
+
+    def _format_event(self, data, event='progress') -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def _event_stream(self, publisher, experiment_id):
+        # Suscripción antes de leer el snapshot: un evento final publicado entre ambas
+        # lecturas llega por el canal en lugar de perderse
+        subscription = await sync_to_async(publisher.subscribe, thread_sensitive=False)(experiment_id)
+        try:
+            snapshot = await sync_to_async(publisher.get_snapshot)(experiment_id)
+            if snapshot is None:
+                # Sin progreso publicado: se envía el estado persistido y se termina si ya es final
+                status_data = await sync_to_async(ExperimentStatusService().get_status)(experiment_id)
+                if status_data is None:
+                    yield self._format_event({"message": "Experimento no encontrado"}, event='error')
+                    return
+                yield self._format_event(status_data, event='status')
+                if status_data['processing_status'] in ExperimentStatusService.TERMINAL_STATUSES:
+                    return
+            else:
+                yield self._format_event(snapshot)
+                if snapshot.get('stage') in self.TERMINAL_STAGES:
+                    return
+
+            while True:
+                message = await sync_to_async(subscription.get, thread_sensitive=False)(
+                    timeout=self.HEARTBEAT_SECONDS
+                )
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield self._format_event(message)
+                if message.get('stage') in self.TERMINAL_STAGES:
+                    break
+        finally:
+            await sync_to_async(subscription.close, thread_sensitive=False)()
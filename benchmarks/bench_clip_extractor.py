@@ -0,0 +1,40 @@
+"""Micro-benchmarks de VideoClipExtractor: ventanas de los clips y extracción de un clip corto."""
+import cv2
+import pytest
+from core.services.pipeline_total_v2 import VideoClipExtractor
+from core.services.video_processing import VideoProcessingService
+
+CLIP_PARAMS = VideoProcessingService.DEFAULT_CLIP_PARAMS
+EPISODE = {'start_frame': 150, 'end_frame': 240, 'class_id': 0.0, 'object_roi': 'tapa_azul'}
+
+
+@pytest.fixture
+def extractor(arena_video, tmp_path):
+    extractor = VideoClipExtractor(arena_video, [], str(tmp_path / 'clips'), **CLIP_PARAMS)
+    yield extractor
+    extractor.close()
+
+
+def clip_windows(extractor, episodes):
+    return [extractor._get_adjusted_frames(ep['start_frame'], ep['end_frame']) for ep in episodes]
+
+
+@pytest.mark.benchmark(group='clip_windows')
+def bench_clip_windows(benchmark, extractor, episodes, frames):
+    windows = benchmark(clip_windows, extractor, episodes)
+    assert len(windows) == len(episodes)
+    assert all(0 <= start <= end < extractor.total_frames for start, end in windows if start < extractor.total_frames)
+
+
+@pytest.mark.benchmark(group='extract_clip')
+@pytest.mark.parametrize('thumbnails', [True, False], ids=['miniaturas', 'sin_miniaturas'])
+def bench_extract_clip(benchmark, extractor, thumbnails):
+    extractor.thumbnails = thumbnails
+    path = benchmark(extractor.extract_clip, EPISODE, 0)
+
+    cap = cv2.VideoCapture(path)
+    written = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    assert written == EPISODE['end_frame'] - EPISODE['start_frame'] + 1 + 2 * extractor.margin_frames
+    info = extractor.thumbnails_by_clip.get(path)
+    assert (info is not None and info['sprite_frames'] == extractor.sprite_frames) == thumbnails
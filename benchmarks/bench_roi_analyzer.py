@@ -0,0 +1,135 @@
+"""Micro-benchmarks de ROIAnalyzer y comprobación de identidad de episodios.
+
+Los benchmarks de _find_episodes miden también la implementación de referencia (reference.py)
+para ver la mejora; las pruebas test_* exigen que la versión actual produzca exactamente los
+mismos episodios, así que una optimización solo puede entrar si las mantiene en verde.
+"""
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+from core.services.pipeline_total_v2 import ROIAnalyzer
+from reference import find_episodes_reference
+from conftest import ANALYZER_PARAMS
+
+EPISODE_PARAMS = ('min_interaction_frames', 'max_gap_frames', 'max_class_change_frames')
+
+
+def _rounds(frames: int) -> int:
+    return min(50, max(5, 1_000_000 // frames))
+
+
+def _normalized(episodes):
+    """Episodios comparables con == (class_id NaN se iguala a sí mismo)"""
+    return [
+        (int(ep['start_frame']), int(ep['end_frame']), int(ep['duration']),
+         None if pd.isna(ep['class_id']) else float(ep['class_id']))
+        for ep in episodes
+    ]
+
+
+def _find_all(analyzer, interactions, implementation):
+    episodes = {}
+    for roi_name in analyzer.rois:
+        args = (interactions['frame'], interactions[f'interaction_{roi_name}'], interactions['class_id'])
+        if implementation == 'referencia':
+            episodes[roi_name] = find_episodes_reference(
+                *args, **{name: getattr(analyzer, name) for name in EPISODE_PARAMS}
+            )
+        else:
+            episodes[roi_name] = analyzer._find_episodes(*args)
+    return episodes
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+@pytest.mark.benchmark(group='process_dataframe')
+def bench_process_dataframe(benchmark, analyzer, predictions, frames):
+    _, raw = predictions
+    target = copy.copy(analyzer)
+
+    def setup():
+        target.df = raw
+
+    benchmark.pedantic(target._process_dataframe, setup=setup, rounds=_rounds(frames))
+    assert len(target.df) == raw['frame'].nunique()
+
+
+@pytest.mark.benchmark(group='detect_interactions')
+def bench_detect_interactions(benchmark, analyzer, frames):
+    df = benchmark(analyzer._detect_interactions)
+    assert all(f'interaction_{roi_name}' in df.columns for roi_name in analyzer.rois)
+
+
+@pytest.mark.benchmark(group='find_episodes')
+@pytest.mark.parametrize('implementation', ['actual', 'referencia'])
+def bench_find_episodes(benchmark, analyzer, interactions, frames, implementation):
+    episodes = benchmark.pedantic(
+        _find_all, args=(analyzer, interactions, implementation),
+        rounds=_rounds(frames) if implementation == 'actual' else 3
+    )
+    assert sum(len(roi_episodes) for roi_episodes in episodes.values()) > 0
+
+
+@pytest.mark.benchmark(group='aggregated_metrics')
+def bench_aggregated_metrics(benchmark, analyzer, episodes, frames):
+    aggregated = benchmark(analyzer._calculate_aggregated_metrics, episodes)
+    assert aggregated['total_episodes'].sum() == sum(1 for ep in episodes if ep['class_id'] == 0)
+
+
+# ----------------------------------------------------------------------
+# Identidad con la referencia
+# ----------------------------------------------------------------------
+
+def test_arena_episodes_match_reference(analyzer, interactions, frames):
+    actual = _find_all(analyzer, interactions, 'actual')
+    reference = _find_all(analyzer, interactions, 'referencia')
+    for roi_name in analyzer.rois:
+        assert _normalized(actual[roi_name]) == _normalized(reference[roi_name]), roi_name
+
+
+def _random_series(n: int, seed: int):
+    """Rachas de interacción de longitud aleatoria, clases con parpadeos y huecos en la numeración"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.geometric(rng.choice([0.05, 0.2, 0.6], size=n), size=n)
+    values = np.arange(len(lengths)) % 2 == rng.integers(2)
+    interacting = np.repeat(values, lengths)[:n]
+
+    class_lengths = rng.geometric(0.1, size=n)
+    classes = np.repeat(rng.integers(0, 4, size=n), class_lengths)[:n].astype(float)
+    flicker = rng.random(n) < 0.05
+    classes[flicker] = rng.integers(0, 4, int(flicker.sum()))
+    # Sin detección no hay interacción: los NaN de clase solo caen en frames sin interacción
+    classes[~interacting & (rng.random(n) < 0.1)] = np.nan
+
+    frames = np.cumsum(rng.choice([1, 1, 1, 2], size=n)) + int(rng.integers(0, 100))
+    return pd.Series(frames), pd.Series(interacting), pd.Series(classes)
+
+
+@pytest.mark.parametrize('seed', range(8))
+@pytest.mark.parametrize('params', [
+    (4, 20, 6),
+    (1, 0, 0),
+    (3, 1, 1),
+    (10, 5, 2),
+    (0, 3, 3),
+], ids=lambda params: '-'.join(map(str, params)))
+def test_random_series_match_reference(params, seed):
+    frame_series, interaction_series, class_series = _random_series(5000, seed)
+    kwargs = dict(zip(EPISODE_PARAMS, params))
+    # Con todos los parámetros explícitos _find_episodes no depende de los datos del analizador
+    actual = ROIAnalyzer.__new__(ROIAnalyzer)._find_episodes(frame_series, interaction_series, class_series, **kwargs)
+    reference = find_episodes_reference(frame_series, interaction_series, class_series, **kwargs)
+    assert _normalized(actual) == _normalized(reference)
+
+
+def test_sweep_matches_analyze(analyzer, frames):
+    """sweep() con los parámetros por defecto reproduce las métricas de analyze()"""
+    grid = {name: [ANALYZER_PARAMS[name]] for name in ANALYZER_PARAMS}
+    swept = analyzer.sweep(grid).drop(columns=[*grid, 'episodes_all_classes'])
+    aggregated = analyzer.analyze()['aggregated']
+    pd.testing.assert_frame_equal(
+        swept.reset_index(drop=True), aggregated.reset_index(drop=True), check_dtype=False
+    )
@@ -0,0 +1,130 @@
+"""Datos compartidos por los micro-benchmarks del análisis (ROIAnalyzer y VideoClipExtractor).
+
+Dependencias en requirements-dev.txt. Ejecución, desde la raíz del repositorio:
+    pytest benchmarks/                                   # 10k, 100k y 1M frames
+    pytest benchmarks/ --frames 10000 100000             # solo algunos tamaños
+    pytest benchmarks/ --benchmark-disable               # solo las comprobaciones de identidad
+    pytest benchmarks/ --benchmark-save=base             # guardar y comparar después con
+    pytest benchmarks/ --benchmark-compare=0001_base --benchmark-compare-fail=median:10%
+"""
+import os
+import json
+import django
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from core.services.interaction_engine import KEYPOINT_NAMES  # noqa: E402
+from core.services.pipeline_total_v2 import ROIAnalyzer  # noqa: E402
+from core.services.synthetic_video import SyntheticArenaVideo  # noqa: E402
+from core.services.trajectory_store import TrajectoryStore  # noqa: E402
+from core.services.video_processing import VideoProcessingService  # noqa: E402
+
+DEFAULT_FRAMES = [10_000, 100_000, 1_000_000]
+FPS = 30.0
+ANALYZER_PARAMS = VideoProcessingService.DEFAULT_ANALYZER_PARAMS
+
+
+def pytest_addoption(parser):
+    parser.addoption('--frames', type=int, nargs='+', default=DEFAULT_FRAMES,
+                     help='Tamaños (frames) de los benchmarks parametrizados')
+
+
+def pytest_generate_tests(metafunc):
+    if 'frames' in metafunc.fixturenames:
+        sizes = metafunc.config.getoption('frames')
+        metafunc.parametrize('frames', sizes, ids=[f"{size // 1000}k" for size in sizes], scope='session')
+
+
+def arena_predictions(frames: int, seed: int = 0):
+    """Predicciones con el esquema del CSV del pipeline a partir de la verdad de terreno de la arena.
+
+    Incluye frames sin detección, parpadeos de clase y algún frame duplicado, como la salida
+    real de detect_keypoints.
+    """
+    video = SyntheticArenaVideo(fps=FPS, seconds=frames / FPS, seed=seed)
+    rng = np.random.default_rng(seed)
+    keypoints = video.keypoints() + rng.normal(0, 1.0, (video.frames, len(KEYPOINT_NAMES), 2))
+    boxes = video.boxes()
+
+    classes = video.classes.astype(float)
+    flicker = rng.random(video.frames) < 0.02
+    classes[flicker] = rng.integers(0, len(video.BEHAVIOR_CLASSES), int(flicker.sum()))
+
+    rows = {
+        'frame': np.arange(video.frames),
+        'class_id': classes,
+        'confidence': rng.uniform(0.5, 0.99, video.frames),
+        'bbox_xc': (boxes[:, 0] + boxes[:, 2]) / 2,
+        'bbox_yc': (boxes[:, 1] + boxes[:, 3]) / 2,
+        'bbox_w': boxes[:, 2] - boxes[:, 0],
+        'bbox_h': boxes[:, 3] - boxes[:, 1],
+    }
+    for k, name in enumerate(KEYPOINT_NAMES):
+        rows[f"{name}_x"] = keypoints[:, k, 0]
+        rows[f"{name}_y"] = keypoints[:, k, 1]
+        rows[f"{name}_v"] = rng.uniform(0.6, 1.0, video.frames)
+    df = pd.DataFrame(rows)
+
+    missed = rng.random(video.frames) < 0.02
+    df.loc[missed, df.columns != 'frame'] = np.nan
+    duplicated = df.sample(frac=0.001, random_state=seed)
+    return video, pd.concat([df, duplicated]).reset_index(drop=True)
+
+
+def write_rois(video: SyntheticArenaVideo, path: str) -> str:
+    """ROIs de la arena en el formato JSON de detect_rois"""
+    data = {
+        f"roi_{i}": {
+            'name': roi['name'],
+            'class_id': roi['class_id'],
+            'box': {key: roi[key] for key in ('x1', 'y1', 'x2', 'y2')},
+            'frame_width': roi['frame_width'],
+            'frame_height': roi['frame_height'],
+        }
+        for i, roi in enumerate(video.rois())
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    return path
+
+
+@pytest.fixture(scope='session')
+def arena_video(tmp_path_factory):
+    """Video corto de la arena: fuente del FPS del análisis y de los clips de extract_clip"""
+    video = SyntheticArenaVideo(width=320, height=240, fps=FPS, seconds=20)
+    return video.render(str(tmp_path_factory.mktemp('video') / 'arena.mp4'))
+
+
+@pytest.fixture(scope='session')
+def predictions(frames):
+    """(video, DataFrame crudo) por tamaño; se genera una vez por sesión"""
+    return arena_predictions(frames)
+
+
+@pytest.fixture(scope='session')
+def analyzer(frames, predictions, arena_video, tmp_path_factory):
+    video, df = predictions
+    directory = tmp_path_factory.mktemp(f"analisis_{frames}")
+    store = TrajectoryStore.write(df, str(directory / f"predicciones{TrajectoryStore.EXTENSION}"), fps=FPS)
+    rois = write_rois(video, str(directory / 'rois.json'))
+    return ROIAnalyzer(store, rois, arena_video, **ANALYZER_PARAMS)
+
+
+@pytest.fixture(scope='session')
+def interactions(analyzer):
+    return analyzer._detect_interactions()
+
+
+@pytest.fixture(scope='session')
+def episodes(analyzer, interactions):
+    episodes = []
+    for roi_name in analyzer.rois:
+        for episode in analyzer._find_episodes(
+            interactions['frame'], interactions[f'interaction_{roi_name}'], interactions['class_id']
+        ):
+            episodes.append({**episode, 'object_roi': roi_name})
+    return sorted(episodes, key=lambda episode: episode['start_frame'])
@@ -0,0 +1,68 @@
+"""Copia literal de la detección de episodios original de ROIAnalyzer (commit baseline).
+
+Es la referencia contra la que se comprueban las versiones optimizadas: cualquier cambio en
+_find_episodes / _scan_episodes debe producir exactamente los mismos episodios. Solo se ha
+cambiado `self.<parámetro>` por argumentos; no se debe "arreglar" ni optimizar.
+"""
+from typing import Dict, List
+import pandas as pd
+
+
+def _finalize_episode(episodes: List[Dict], episode: Dict, end_frame: int):
+    episode['end_frame'] = end_frame
+    episode['duration'] = end_frame - episode['start_frame'] + 1
+    episodes.append(episode)
+
+
+def find_episodes_reference(frame_series: pd.Series, interaction_series: pd.Series,
+                            class_series: pd.Series, min_interaction_frames: int,
+                            max_gap_frames: int, max_class_change_frames: int) -> List[Dict]:
+    episodes = []
+    current_episode = None
+    consecutive_interaction = 0
+    remaining_gap_tolerance = max_gap_frames
+    current_class = None
+    class_change_counter = 0
+
+    for i, (frame, is_interacting, class_id) in enumerate(zip(
+        frame_series, interaction_series, class_series
+    )):
+        if current_episode is not None:
+            if class_id == current_class:
+                class_change_counter = 0
+            else:
+                class_change_counter += 1
+                if class_change_counter > max_class_change_frames:
+                    _finalize_episode(episodes, current_episode, frame_series.iloc[i-1])
+                    current_episode = None
+                    consecutive_interaction = 0
+                    remaining_gap_tolerance = max_gap_frames
+                    current_class = None
+                    continue
+
+            if is_interacting:
+                remaining_gap_tolerance = max_gap_frames
+            else:
+                if remaining_gap_tolerance > 0:
+                    remaining_gap_tolerance -= 1
+                else:
+                    _finalize_episode(episodes, current_episode, frame_series.iloc[i-1])
+                    current_episode = None
+
+        if current_episode is None:
+            if is_interacting:
+                consecutive_interaction += 1
+                if consecutive_interaction >= min_interaction_frames:
+                    current_episode = {
+                        'start_frame': frame_series.iloc[i - consecutive_interaction + 1],
+                        'class_id': class_series.iloc[i - consecutive_interaction + 1:i+1].mode()[0],
+                    }
+                    current_class = current_episode['class_id']
+                    consecutive_interaction = 0
+            else:
+                consecutive_interaction = 0
+
+    if current_episode is not None:
+        _finalize_episode(episodes, current_episode, frame_series.iloc[-1])
+
+    return [ep for ep in episodes if ep['duration'] > 0]
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import os
 from celery import Celery
 from django.apps import apps
+from infrastructure.metrics.celery_exporter import install_celery_metrics
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -10,4 +11,7 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Auto-descubre las tareas en todas las apps INSTALLED_APPS
 # Cambia la línea de autodiscover_tasks para que sea más específica
-app.autodiscover_tasks(['core.tasks'])  # Sin force=True
\ No newline at end of file
+app.autodiscover_tasks(['core.tasks'])  # Sin force=True
+
+# Métricas de tareas y exportador HTTP del worker
+install_celery_metrics(app)
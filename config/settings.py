@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'infrastructure.metrics.middleware.PrometheusMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -109,6 +110,17 @@ DATABASES = {
     }
 }
 
+# PostgreSQL opcional (p. ej. para benchmark_api contra un Postgres local): se activa con POSTGRES_DB
+if os.getenv('POSTGRES_DB'):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv('POSTGRES_DB'),
+        "USER": os.getenv('POSTGRES_USER', 'postgres'),
+        "PASSWORD": os.getenv('POSTGRES_PASSWORD', ''),
+        "HOST": os.getenv('POSTGRES_HOST', 'localhost'),
+        "PORT": os.getenv('POSTGRES_PORT', '5432'),
+    }
+
 #AUTH_USER_MODEL = 'core.User'
 AUTH_USER_MODEL = 'core.User'  # Indica a Django usar tu modelo User personalizado
 # Password validation
@@ -156,6 +168,37 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/1')
 
+# Recolección de archivos (clips borrados, workdirs obsoletos, artefactos intermedios)
+FILE_GC_BATCH_SIZE = int(os.getenv('FILE_GC_BATCH_SIZE', '500'))
+FILE_GC_GRACE_SECONDS = int(os.getenv('FILE_GC_GRACE_SECONDS', str(6 * 60 * 60)))
+FILE_GC_MAX_WORKDIR_BYTES = int(os.getenv('FILE_GC_MAX_WORKDIR_BYTES', str(512 * 1024 ** 2)))
+
+CELERY_BEAT_SCHEDULE = {
+    # Reintenta los borrados que quedaron pendientes (p. ej. si el broker no estaba disponible)
+    'process-file-deletions': {
+        'task': 'process_file_deletions_task',
+        'schedule': 15 * 60,
+    },
+    'sweep-orphan-files': {
+        'task': 'sweep_orphan_files_task',
+        'schedule': 6 * 60 * 60,
+    },
+}
+
+# Progreso de procesamiento (pub/sub) y caché de respuestas
+PROGRESS_REDIS_URL = os.getenv('PROGRESS_REDIS_URL', 'redis://redis:6379/2')
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv('CACHE_REDIS_URL', 'redis://redis:6379/3'),
+    }
+}
+
+# Métricas (Prometheus)
+CELERY_METRICS_PORT = int(os.getenv('CELERY_METRICS_PORT', '9808'))
+CELERY_METRICS_QUEUES = os.getenv('CELERY_METRICS_QUEUES', 'celery').split(',')
+
 # Media files (Docker)
 MEDIA_ROOT = '/ratlab_ai_backend/media'  # Ruta dentro del contenedor
 MEDIA_URL = '/media/'
\ No newline at end of file
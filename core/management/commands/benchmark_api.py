@@ -0,0 +1,368 @@
+import os
+import io
+import json
+import time
+import shutil
+import tempfile
+import logging
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import Behavior, Clip, Experiment, User
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.synthetic_data import SyntheticDataGenerator
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga de la API sobre una base de datos de pruebas sembrada: latencia p50/p95 y '
+        'consultas SQL por endpoint; falla si se supera algún presupuesto. Usa SQLite o, con '
+        'POSTGRES_DB definido, PostgreSQL.'
+    )
+
+    # Presupuestos por escenario: p95 en milisegundos y máximo de consultas SQL por petición
+    DEFAULT_BUDGETS = {
+        'login': {'p95_ms': 50, 'queries': 0},
+        'experiment-list (cold)': {'p95_ms': 150, 'queries': 2},
+        'experiment-list (warm)': {'p95_ms': 30, 'queries': 1},
+        'experiment-list (304)': {'p95_ms': 30, 'queries': 1},
+        'experiment-list (filtered)': {'p95_ms': 150, 'queries': 2},
+        'experiment-list (page 2)': {'p95_ms': 150, 'queries': 2},
+        'experiment-detail (cold)': {'p95_ms': 100, 'queries': 6},
+        'experiment-detail (warm)': {'p95_ms': 30, 'queries': 2},
+        'experiment-status': {'p95_ms': 50, 'queries': 1},
+        'experiment-progress': {'p95_ms': 50, 'queries': 1},
+        'experiment-trajectory': {'p95_ms': 200, 'queries': 2},
+        'experiment-heatmap (png)': {'p95_ms': 50, 'queries': 2},
+        'experiment-timecourse (cold)': {'p95_ms': 1000, 'queries': 3},
+        'experiment-timecourse (warm)': {'p95_ms': 50, 'queries': 3},
+        'experiment-heatmap (cold)': {'p95_ms': 500, 'queries': 2},
+        'experiment-heatmap (warm)': {'p95_ms': 50, 'queries': 2},
+        'experiment-ethogram (cold)': {'p95_ms': 200, 'queries': 2},
+        'experiment-ethogram (warm)': {'p95_ms': 50, 'queries': 2},
+        'update-label': {'p95_ms': 50, 'queries': 9},
+        'delete-clips': {'p95_ms': 100, 'queries': 12},
+        'review-clips': {'p95_ms': 150, 'queries': 14},
+        'experiment-upload': {'p95_ms': 100, 'queries': 2},
+        'experiment-reanalyze': {'p95_ms': 100, 'queries': 3},
+    }
+    # Publican tareas de Celery: sin broker se omiten (en local basta con CELERY_BROKER_URL=memory://
+    # y CELERY_RESULT_BACKEND=cache+memory://, que encolan en memoria sin ejecutar nada)
+    BROKER_SCENARIOS = ('experiment-upload', 'experiment-reanalyze', 'delete-clips')
+    PASSWORD = 'benchmark-password'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--experiments', type=int, default=2000, help='Experimentos sembrados')
+        parser.add_argument('--clips-per-object', type=int, default=50, help='Clips por objeto (dos objetos por experimento)')
+        parser.add_argument('--frames', type=int, default=18000, help='Frames del experimento con análisis')
+        parser.add_argument('--requests', type=int, default=30, help='Peticiones medidas por escenario')
+        parser.add_argument('--warmup', type=int, default=2, help='Peticiones previas no medidas por escenario')
+        parser.add_argument('--only', nargs='*', help='Escenarios a medir (por defecto, todos)')
+        parser.add_argument('--budgets', help='JSON {escenario: {"p95_ms": ..., "queries": ...}} que sustituye a los presupuestos por defecto')
+        parser.add_argument('--output', help='Ruta donde escribir el informe en JSON')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        budgets = dict(self.DEFAULT_BUDGETS)
+        if options['budgets']:
+            with open(options['budgets']) as f:
+                budgets.update(json.load(f))
+
+        media_root = tempfile.mkdtemp(prefix='benchmark_api_')
+        setup_test_environment()
+        # Siempre una base de datos de pruebas: nunca se siembra la base de datos real
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+            ):
+                cache.clear()
+                started = time.perf_counter()
+                context = self._seed(options)
+                self.stdout.write(
+                    f"Sembrado en {time.perf_counter() - started:.1f}s ({connection.vendor}): "
+                    f"{context['counts']['experiments']} experimentos, {context['counts']['clips']} clips"
+                )
+                results = self._run(context, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        violations = self._check(results, budgets)
+        self._report(results, budgets, violations)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'database': connection.vendor,
+                    'experiments': options['experiments'],
+                    'clips_per_object': options['clips_per_object'],
+                    'requests': options['requests'],
+                    'results': results,
+                    'budgets': budgets,
+                    'violations': violations
+                }, f, indent=2)
+        if violations:
+            raise CommandError(f"{len(violations)} presupuestos superados:\n" + "\n".join(violations))
+        self.stdout.write(self.style.SUCCESS('Todos los escenarios dentro de presupuesto'))
+
+    # ------------------------------------------------------------------
+    # Datos
+    # ------------------------------------------------------------------
+
+    def _seed(self, options) -> dict:
+        generator = SyntheticDataGenerator(seed=options['seed'])
+        counts = generator.create_experiments(options['experiments'], options['clips_per_object'])
+        analysis = generator.create_analysis_experiment(
+            frames=options['frames'], clips_per_object=options['clips_per_object']
+        )
+        User.objects.create_user(username='benchmark', password=self.PASSWORD)
+
+        # Cada petición que modifica datos trabaja sobre un experimento distinto
+        completed = list(
+            Experiment.objects.filter(status='COM').exclude(id=analysis.id).order_by('id').values_list('id', flat=True)
+        )
+        with open(analysis.video_file.path, 'rb') as f:
+            video = f.read()
+        return {
+            'counts': counts,
+            'analysis': analysis,
+            'artifacts': ExperimentArtifacts.for_experiment(analysis),
+            'experiments': completed,
+            'behaviors': list(Behavior.objects.values_list('id', flat=True)),
+            'video': video
+        }
+
+    def _pool(self, context, offset: int):
+        """Experimentos para escenarios de escritura: un tramo distinto por escenario"""
+        experiments = context['experiments']
+        if not experiments:
+            raise CommandError("No hay experimentos completados: aumenta --experiments")
+        size = max(1, len(experiments) // 4)
+        chunk = experiments[offset * size:(offset + 1) * size] or experiments
+        return iter(chunk * (1 + 10000 // len(chunk)))
+
+    # ------------------------------------------------------------------
+    # Escenarios
+    # ------------------------------------------------------------------
+
+    def _scenarios(self, client, context) -> list:
+        analysis = context['analysis']
+        artifacts = context['artifacts']
+        experiments = context['experiments']
+        details = iter(experiments * (1 + 10000 // max(1, len(experiments))))
+
+        def remove(*paths):
+            def prepare():
+                for path in paths:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    elif os.path.exists(path):
+                        os.remove(path)
+            return prepare
+
+        def url(name, experiment_id=None, query=''):
+            kwargs = {'experiment_id': experiment_id} if experiment_id is not None else {}
+            return reverse(name, kwargs=kwargs) + query
+
+        first_page = client.get(url('experiment-list'))
+        next_page = first_page.json().get('next')
+
+        labels = self._pool(context, 0)
+        deletions = self._pool(context, 1)
+        reviews = self._pool(context, 2)
+        reanalysis = self._pool(context, 3)
+
+        def label_request():
+            experiment_id = next(labels)
+            return url('update-label', experiment_id), {'reference': 2, 'label': 'FAM', 'new_name': f"objeto_{experiment_id}"}
+
+        def delete_request():
+            experiment_id = next(deletions)
+            clip_ids = list(Clip.objects.filter(experiment_id=experiment_id).values_list('id', flat=True)[:20])
+            return url('delete-clips', experiment_id), {'clip_ids': clip_ids}
+
+        def review_request():
+            experiment_id = next(reviews)
+            behaviors = context['behaviors']
+            clips = Clip.objects.filter(experiment_id=experiment_id).values_list('id', 'valid', 'behavior_id')
+            # La mitad cambia de validez y la otra mitad de comportamiento
+            changes = [
+                {'clip_id': clip_id, 'valid': not valid} if n % 2 else
+                {'clip_id': clip_id, 'behavior_id': behaviors[(behaviors.index(behavior_id) + 1) % len(behaviors)]}
+                for n, (clip_id, valid, behavior_id) in enumerate(clips)
+            ]
+            return url('review-clips', experiment_id), {'changes': changes}
+
+        def upload_request():
+            return url('experiment-upload'), {
+                'name': 'Benchmark', 'mouse_name': 'M001', 'date': '2025-01-01',
+                'video_file': io.BytesIO(context['video'])
+            }
+
+        analysis_artifacts = [
+            ('experiment-timecourse', '?bin=30', remove(artifacts.timecourse)),
+            ('experiment-heatmap', '?grid=64', remove(os.path.join(artifacts.workdir, 'heatmaps'))),
+            ('experiment-ethogram', '?resolution=1', remove(artifacts.ethogram)),
+        ]
+
+        scenarios = [
+            {'name': 'login', 'method': 'post', 'url': url('login'),
+             'data': {'username': 'benchmark', 'password': self.PASSWORD}, 'anonymous': True},
+            {'name': 'experiment-list (cold)', 'url': url('experiment-list'), 'prepare': cache.clear},
+            {'name': 'experiment-list (warm)', 'url': url('experiment-list')},
+            {'name': 'experiment-list (304)', 'url': url('experiment-list'),
+             'headers': lambda: {'HTTP_IF_NONE_MATCH': client.get(url('experiment-list'))['ETag']}, 'expect': 304},
+            {'name': 'experiment-list (filtered)', 'prepare': cache.clear,
+             'url': url('experiment-list', query='?status=COM&mouse_name=M001&date_after=2000-01-01&page_size=20')},
+            {'name': 'experiment-list (page 2)', 'url': next_page, 'prepare': cache.clear},
+            {'name': 'experiment-detail (cold)', 'prepare': cache.clear,
+             'request': lambda: (url('experiment-detail', next(details)), None)},
+            {'name': 'experiment-detail (warm)', 'url': url('experiment-detail', experiments[0])},
+            {'name': 'experiment-status', 'url': url('experiment-status', analysis.id)},
+            # Vista asíncrona: las consultas hechas en hilos de sync_to_async no se capturan
+            {'name': 'experiment-progress', 'url': url('experiment-progress', analysis.id), 'stream': True},
+            {'name': 'experiment-trajectory', 'url': url('experiment-trajectory', analysis.id, '?points=2000')},
+            {'name': 'experiment-heatmap (png)', 'url': url('experiment-heatmap', analysis.id, '?output=png')},
+        ]
+        for name, query, prepare in analysis_artifacts:
+            scenarios.append({'name': f"{name} (cold)", 'url': url(name, analysis.id, query), 'prepare': prepare})
+            scenarios.append({'name': f"{name} (warm)", 'url': url(name, analysis.id, query)})
+        scenarios += [
+            {'name': 'update-label', 'method': 'patch', 'request': label_request},
+            {'name': 'delete-clips', 'method': 'post', 'request': delete_request},
+            {'name': 'review-clips', 'method': 'post', 'request': review_request},
+            {'name': 'experiment-upload', 'method': 'post', 'request': upload_request,
+             'format': 'multipart', 'expect': 201},
+            {'name': 'experiment-reanalyze', 'method': 'post', 'expect': 202,
+             'request': lambda: (url('experiment-reanalyze', next(reanalysis)), {'min_interaction_frames': 5})},
+        ]
+        return scenarios
+
+    # ------------------------------------------------------------------
+    # Medición
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _authenticate(client):
+        # Peticiones autenticadas con JWT como el frontend (la autenticación también consulta la BD)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(User.objects.get(username='benchmark'))}")
+
+    @staticmethod
+    async def _drain(response) -> bytes:
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    def _call(self, client, scenario):
+        method = scenario.get('method', 'get')
+        if 'request' in scenario:
+            path, data = scenario['request']()
+        else:
+            path, data = scenario['url'], scenario.get('data')
+
+        headers = scenario.get('headers', {})
+        kwargs = dict(headers() if callable(headers) else headers)
+        if data is not None:
+            kwargs['data'] = data
+            kwargs['format'] = scenario.get('format', 'json')
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            if scenario.get('stream'):
+                async_to_sync(self._drain)(response)
+            elapsed = (time.perf_counter() - started) * 1000
+        return response, elapsed, len(queries)
+
+    def _run(self, context, options) -> dict:
+        # Los avisos (p. ej. Redis de progreso no disponible) no deben contar en la latencia
+        logging.disable(logging.WARNING)
+        try:
+            return self._measure(context, options)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    @staticmethod
+    def _broker_available() -> bool:
+        from config.celery import app
+        try:
+            with app.connection_for_write() as conn:
+                conn.ensure_connection(max_retries=1)
+            return True
+        except Exception:
+            return False
+
+    def _measure(self, context, options) -> dict:
+        broker = self._broker_available()
+        client = APIClient()
+        self._authenticate(client)
+        anonymous = APIClient()
+
+        results = {}
+        for scenario in self._scenarios(client, context):
+            name = scenario['name']
+            if options['only'] and name not in options['only']:
+                continue
+            if name in self.BROKER_SCENARIOS and not broker:
+                results[name] = {'skipped': 'broker de Celery no disponible (CELERY_BROKER_URL=memory:// para medir en local)'}
+                continue
+
+            scenario_client = anonymous if scenario.get('anonymous') else client
+            expected = scenario.get('expect', 200)
+            latencies, query_counts = [], []
+            for iteration in range(options['warmup'] + options['requests']):
+                if scenario.get('prepare'):
+                    scenario['prepare']()
+                response, elapsed, query_count = self._call(scenario_client, scenario)
+                if response.status_code != expected:
+                    raise CommandError(
+                        f"{name}: respuesta {response.status_code} (se esperaba {expected}): "
+                        f"{getattr(response, 'content', b'')[:300]!r}"
+                    )
+                if iteration >= options['warmup']:
+                    latencies.append(elapsed)
+                    query_counts.append(query_count)
+
+            results[name] = {
+                'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+                'max_ms': round(max(latencies), 2),
+                'queries': max(query_counts),
+                'queries_p50': int(np.median(query_counts)),
+            }
+            self.stdout.write(
+                f"  {name:<32} p50 {results[name]['p50_ms']:>9.2f} ms   "
+                f"p95 {results[name]['p95_ms']:>9.2f} ms   {results[name]['queries']:>3} consultas"
+            )
+        return results
+
+    # ------------------------------------------------------------------
+    # Presupuestos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _check(results: dict, budgets: dict) -> list:
+        violations = []
+        for name, result in results.items():
+            budget = budgets.get(name)
+            if not budget or 'skipped' in result:
+                continue
+            if 'p95_ms' in budget and result['p95_ms'] > budget['p95_ms']:
+                violations.append(f"{name}: p95 {result['p95_ms']} ms > {budget['p95_ms']} ms")
+            if 'queries' in budget and result['queries'] > budget['queries']:
+                violations.append(f"{name}: {result['queries']} consultas > {budget['queries']}")
+        return violations
+
+    def _report(self, results: dict, budgets: dict, violations: list):
+        for name, result in results.items():
+            if 'skipped' in result:
+                self.stdout.write(self.style.WARNING(f"  {name:<32} omitido: {result['skipped']}"))
+            elif not budgets.get(name):
+                self.stdout.write(self.style.WARNING(f"  {name:<32} sin presupuesto"))
+        for violation in violations:
+            self.stdout.write(self.style.ERROR(f"  {violation}"))
@@ -0,0 +1,60 @@
+import json
+import shutil
+import tempfile
+from itertools import product
+from django.core.management.base import BaseCommand, CommandError
+from core.services.pipeline_benchmark import PipelineBenchmark
+
+class Command(BaseCommand):
+    help = (
+        'Rendimiento de extremo a extremo de VideoProcessingPipeline con videos sintéticos: '
+        'frames/s, tiempo por etapa y pico de memoria por configuración'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, nargs='+', default=[30.0, 120.0], help='Duraciones del video')
+        parser.add_argument('--resolution', nargs='+', default=['640x480'], help='Resoluciones (ANCHOxALTO)')
+        parser.add_argument('--fps', type=float, default=30.0)
+        parser.add_argument('--model', choices=PipelineBenchmark.MODELS, default='stub',
+                            help='stub: detecciones de la verdad de terreno; yolo: YOLOv8n con pesos aleatorios')
+        parser.add_argument('--no-clips', action='store_true', help='No extrae clips')
+        parser.add_argument('--workdir', help='Directorio de trabajo (por defecto, uno temporal que se borra)')
+        parser.add_argument('--output', help='Ruta donde escribir los resultados en JSON')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _resolutions(self, values):
+        resolutions = []
+        for value in values:
+            try:
+                width, height = (int(part) for part in value.lower().split('x'))
+            except ValueError:
+                raise CommandError(f"Resolución inválida: {value} (formato ANCHOxALTO)")
+            resolutions.append((width, height))
+        return resolutions
+
+    def handle(self, *args, **options):
+        configurations = [
+            {'seconds': seconds, 'width': width, 'height': height, 'fps': options['fps']}
+            for seconds, (width, height) in product(options['seconds'], self._resolutions(options['resolution']))
+        ]
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='benchmark_pipeline_')
+        try:
+            report = PipelineBenchmark(
+                workdir, model=options['model'], export_clips=not options['no_clips'], seed=options['seed']
+            ).run(configurations)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        finally:
+            if not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        for result in report['results']:
+            stages = "  ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result['stages'].items())
+            self.stdout.write(
+                f"{result['name']:<24} {result['frames_per_second']:>8} frames/s  "
+                f"pico {result['peak_rss_mb']} MB  {result['episodes']} episodios, {result['clips']} clips\n    {stages}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['output']}"))
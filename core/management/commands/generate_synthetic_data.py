@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from core.services.synthetic_data import SyntheticDataGenerator
+
+class Command(BaseCommand):
+    help = 'Genera experimentos, objetos y clips sintéticos a escala para benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--experiments', type=int, default=1000, help='Número de experimentos')
+        parser.add_argument('--clips-per-object', type=int, default=50, help='Clips por objeto (dos objetos por experimento)')
+        parser.add_argument('--behaviors', type=int, help='Comportamientos a usar; se crean sintéticos si faltan')
+        parser.add_argument('--batch-size', type=int, default=500, help='Experimentos por lote (y transacción)')
+        parser.add_argument('--media', action='store_true', help='Crea archivos de relleno mínimos para videos, clips y pósters')
+        parser.add_argument('--analysis', action='store_true', help='Añade un experimento con trayectoria y ROIs para los endpoints de análisis')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['experiments'] < 1 or options['clips_per_object'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--experiments, --clips-per-object y --batch-size deben ser positivos")
+
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            behaviors=options['behaviors'],
+            media=options['media']
+        )
+        start = time.perf_counter()
+        try:
+            counts = generator.create_experiments(options['experiments'], options['clips_per_object'])
+            if options['analysis']:
+                experiment = generator.create_analysis_experiment(clips_per_object=options['clips_per_object'])
+                self.stdout.write(f"Experimento con análisis: {experiment.id}")
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['experiments']} experimentos, {counts['objects']} objetos y {counts['clips']} clips "
+            f"en {elapsed:.1f}s ({counts['clips'] / elapsed:,.0f} clips/s)"
+        ))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from core.services.exploration_totals import ExplorationTotalsService
+
+class Command(BaseCommand):
+    help = 'Recalcula ExperimentObject.time y Experiment.exploration_time a partir de los clips'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'experiment_ids', type=int, nargs='*',
+            help='Experimentos a recalcular (por defecto, todos)'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = ExplorationTotalsService.rebuild(options['experiment_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(
+            f"Totales recalculados para {count} experimentos en {time.perf_counter() - start:.2f}s"
+        ))
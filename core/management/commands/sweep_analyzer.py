@@ -0,0 +1,45 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.services.reanalysis_service import ReanalysisService
+from core.services.video_processing import VideoProcessingService
+
+class Command(BaseCommand):
+    help = 'Evalúa una rejilla de parámetros de ROIAnalyzer sobre las predicciones de un experimento'
+
+    def add_arguments(self, parser):
+        parser.add_argument('experiment_id', type=int)
+        parser.add_argument('--min-interaction-frames', type=int, nargs='+')
+        parser.add_argument('--max-gap-frames', type=int, nargs='+')
+        parser.add_argument('--max-class-change-frames', type=int, nargs='+')
+        parser.add_argument('--proximity-threshold', type=float, nargs='+')
+        parser.add_argument('--output', help='Ruta CSV para la tabla de métricas (por defecto stdout)')
+
+    def handle(self, *args, **options):
+        grid = {
+            name: options[name]
+            for name in VideoProcessingService.DEFAULT_ANALYZER_PARAMS
+            if options.get(name)
+        }
+        service = ReanalysisService(VideoProcessingService(
+            model_path=settings.VIDEO_PIPELINE_MODEL_PATH,
+            segmenter_path=settings.VIDEO_PIPELINE_SEGMENTER_PATH
+        ))
+
+        start = time.perf_counter()
+        try:
+            table = service.sweep(options['experiment_id'], grid)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        if options['output']:
+            table.to_csv(options['output'], index=False)
+            self.stdout.write(f"Tabla guardada en {options['output']}")
+        else:
+            self.stdout.write(table.to_string(index=False))
+
+        combinations = table[list(VideoProcessingService.DEFAULT_ANALYZER_PARAMS)].drop_duplicates()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(combinations)} combinaciones evaluadas en {elapsed:.2f}s"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_create_default_behaviors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='analysis_params',
+            field=models.JSONField(blank=True, default=dict, help_text='Parámetros de ROIAnalyzer usados en el último análisis'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_experiment_analysis_params'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExperimentKinematics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('experiment_id', models.IntegerField(help_text='ID del experimento relacionado', unique=True)),
+                ('units', models.CharField(default='px', help_text='Unidades de distancia (cm o px)', max_length=2)),
+                ('distance_travelled', models.FloatField(default=0.0)),
+                ('mean_speed', models.FloatField(blank=True, null=True)),
+                ('max_speed', models.FloatField(blank=True, null=True)),
+                ('body_length', models.FloatField(blank=True, help_text='Mediana de la longitud corporal', null=True)),
+                ('immobility_time', models.FloatField(default=0.0, help_text='Tiempo total inmóvil en segundos')),
+                ('immobility_bouts', models.IntegerField(default=0)),
+                ('summary', models.JSONField(blank=True, default=dict, help_text='Resumen completo de KinematicsAnalyzer')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cinemática de Experimento',
+                'verbose_name_plural': 'Cinemáticas de Experimento',
+                'ordering': ['experiment_id'],
+            },
+        ),
+    ]
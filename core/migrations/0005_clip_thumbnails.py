@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_experiment_kinematics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clip',
+            name='poster',
+            field=models.FileField(blank=True, help_text='Fotograma JPEG representativo del clip', upload_to='experiments/clips/'),
+        ),
+        migrations.AddField(
+            model_name='clip',
+            name='sprite',
+            field=models.FileField(blank=True, help_text='Tira JPEG de fotogramas en baja resolución para previsualizar el clip', upload_to='experiments/clips/'),
+        ),
+        migrations.AddField(
+            model_name='clip',
+            name='sprite_frames',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Número de fotogramas en el sprite sheet'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_clip_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='experiment',
+            index=models.Index(fields=['-created_at', '-id'], name='experiment_created_id_idx'),
+        ),
+    ]
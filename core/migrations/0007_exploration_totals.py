@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:38
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_exploration_totals(apps, schema_editor):
+    Clip = apps.get_model('core', 'Clip')
+    Behavior = apps.get_model('core', 'Behavior')
+    Experiment = apps.get_model('core', 'Experiment')
+    ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+    exploration = Clip.objects.filter(
+        valid=True,
+        behavior_id__in=Behavior.objects.filter(behavior_type='EXP').values('id')
+    ).order_by()
+    by_object = dict(
+        exploration.exclude(experiment_object_id=None)
+        .values_list('experiment_object_id').annotate(total=Sum('duration'))
+    )
+    by_experiment = dict(exploration.values_list('experiment_id').annotate(total=Sum('duration')))
+
+    for object_id, total in by_object.items():
+        ExperimentObject.objects.filter(id=object_id).update(time=total or 0.0)
+    for experiment_id, total in by_experiment.items():
+        Experiment.objects.filter(id=experiment_id).update(exploration_time=total or 0.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_experiment_list_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='exploration_time',
+            field=models.FloatField(default=0.0, help_text='Tiempo total de exploración en segundos (suma de los objetos, mantenido al cambiar clips)'),
+        ),
+        migrations.RunPython(backfill_exploration_totals, migrations.RunPython.noop),
+    ]
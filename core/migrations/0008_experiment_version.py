@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_exploration_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Se incrementa en cada cambio del experimento (clave de caché y ETag de lectura)'),
+        ),
+    ]
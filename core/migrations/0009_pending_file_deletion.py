@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_experiment_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingFileDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Nombre en el storage (archivos) o ruta absoluta (directorios)', max_length=500)),
+                ('kind', models.CharField(choices=[('FIL', 'Archivo del storage'), ('DIR', 'Directorio de trabajo')], default='FIL', max_length=3)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Borrado de archivo pendiente',
+                'verbose_name_plural': 'Borrados de archivos pendientes',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -3,6 +3,8 @@ from .experiment import Experiment, Status
 from .experiment_object import ExperimentObject
 from .clip import Clip
 from .behavior import Behavior
+from .kinematics import ExperimentKinematics
+from .file_deletion import PendingFileDeletion
 from .user import User  # Asegúrate de que tu modelo User esté importado
 
-__all__ = ['Experiment', 'ExperimentObject', 'Status', 'Clip', 'Behavior','User']
\ No newline at end of file
+__all__ = ['Experiment', 'ExperimentObject', 'Status', 'Clip', 'Behavior', 'ExperimentKinematics', 'PendingFileDeletion', 'User']
\ No newline at end of file
@@ -18,6 +18,20 @@ class Clip(models.Model):
     )
     
     video_clip = models.FileField(upload_to='experiments/clips/')
+    poster = models.FileField(
+        upload_to='experiments/clips/',
+        blank=True,
+        help_text="Fotograma JPEG representativo del clip"
+    )
+    sprite = models.FileField(
+        upload_to='experiments/clips/',
+        blank=True,
+        help_text="Tira JPEG de fotogramas en baja resolución para previsualizar el clip"
+    )
+    sprite_frames = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Número de fotogramas en el sprite sheet"
+    )
     duration = models.FloatField(
         help_text="Duración en segundos (calculada como end_time - start_time)"
     )
@@ -16,11 +16,28 @@ class Experiment(models.Model):
         choices=Status.choices,
         default=Status.UPLOADED
     )
+    analysis_params = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Parámetros de ROIAnalyzer usados en el último análisis"
+    )
+    exploration_time = models.FloatField(
+        default=0.0,
+        help_text="Tiempo total de exploración en segundos (suma de los objetos, mantenido al cambiar clips)"
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        help_text="Se incrementa en cada cambio del experimento (clave de caché y ETag de lectura)"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     # Eliminado el manager personalizado ya que no es necesario
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Orden de la paginación por cursor del listado
+            models.Index(fields=['-created_at', '-id'], name='experiment_created_id_idx'),
+        ]
         verbose_name = "Experimento"
         verbose_name_plural = "Experimentos"
 
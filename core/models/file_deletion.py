@@ -0,0 +1,28 @@
+from django.db import models
+
+class PendingFileDeletion(models.Model):
+    """Archivo o directorio pendiente de borrar por el recolector en segundo plano.
+
+    Se crea en la misma transacción que borra las filas que lo referencian; las tareas de GC
+    lo eliminan del disco en lotes y borran el registro cuando lo consiguen.
+    """
+    class Kind(models.TextChoices):
+        FILE = 'FIL', 'Archivo del storage'
+        DIRECTORY = 'DIR', 'Directorio de trabajo'
+
+    name = models.CharField(
+        max_length=500,
+        help_text="Nombre en el storage (archivos) o ruta absoluta (directorios)"
+    )
+    kind = models.CharField(max_length=3, choices=Kind.choices, default=Kind.FILE)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Borrado de archivo pendiente"
+        verbose_name_plural = "Borrados de archivos pendientes"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.name}"
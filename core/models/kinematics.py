@@ -0,0 +1,22 @@
+from django.db import models
+
+class ExperimentKinematics(models.Model):
+    # Igual que el resto de modelos: referencia por ID en lugar de ForeignKey
+    experiment_id = models.IntegerField(unique=True, help_text="ID del experimento relacionado")
+    units = models.CharField(max_length=2, default='px', help_text="Unidades de distancia (cm o px)")
+    distance_travelled = models.FloatField(default=0.0)
+    mean_speed = models.FloatField(null=True, blank=True)
+    max_speed = models.FloatField(null=True, blank=True)
+    body_length = models.FloatField(null=True, blank=True, help_text="Mediana de la longitud corporal")
+    immobility_time = models.FloatField(default=0.0, help_text="Tiempo total inmóvil en segundos")
+    immobility_bouts = models.IntegerField(default=0)
+    summary = models.JSONField(default=dict, blank=True, help_text="Resumen completo de KinematicsAnalyzer")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Cinemática de Experimento"
+        verbose_name_plural = "Cinemáticas de Experimento"
+        ordering = ['experiment_id']
+
+    def __str__(self):
+        return f"Cinemática del experimento {self.experiment_id}"
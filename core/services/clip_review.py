@@ -0,0 +1,82 @@
+import logging
+from typing import Dict, List
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, F, When, BooleanField, IntegerField
+from core.services.exploration_totals import ExplorationTotalsService
+
+logger = logging.getLogger(__name__)
+
+class ClipReviewService:
+    """Revisión masiva de clips: validez y comportamiento de miles de clips en una petición"""
+
+    def review(self, experiment_id: int, changes: List[Dict]) -> Dict:
+        """Aplica los cambios [{'clip_id', 'valid'?, 'behavior_id'?}] con un único UPDATE.
+
+        Los totales de exploración se ajustan con la diferencia entre el estado anterior y el
+        nuevo de los clips, en la misma transacción.
+        """
+        Clip = apps.get_model('core', 'Clip')
+        changes_by_id = {change['clip_id']: change for change in changes}
+
+        with transaction.atomic():
+            clips = Clip.objects.select_for_update().filter(
+                experiment_id=experiment_id,
+                id__in=list(changes_by_id)
+            )
+            before = list(clips.values('id', *ExplorationTotalsService.CLIP_FIELDS))
+            after = []
+            for row in before:
+                change = changes_by_id[row['id']]
+                new_row = dict(row)
+                if 'valid' in change:
+                    new_row['valid'] = change['valid']
+                if 'behavior_id' in change:
+                    new_row['behavior_id'] = change['behavior_id']
+                if new_row != row:
+                    after.append(new_row)
+
+            changed = {row['id'] for row in after}
+            before = [row for row in before if row['id'] in changed]
+            updated = Clip.objects.filter(id__in=changed).update(**self._case_updates(after)) if after else 0
+            ExplorationTotalsService.clips_changed(before, after)
+
+        logger.info(f"Revisión de {updated} clips del experimento {experiment_id}")
+        return {
+            'experiment_id': experiment_id,
+            'updated_clips': updated,
+            **self.totals(experiment_id)
+        }
+
+    @staticmethod
+    def _case_updates(rows: List[Dict]) -> Dict:
+        """Expresiones CASE agrupadas por valor nuevo: un solo UPDATE para todos los clips"""
+        updates = {}
+        for field, output_field in (('valid', BooleanField()), ('behavior_id', IntegerField())):
+            ids_by_value = {}
+            for row in rows:
+                ids_by_value.setdefault(row[field], []).append(row['id'])
+            updates[field] = Case(
+                *[When(id__in=ids, then=value) for value, ids in ids_by_value.items()],
+                default=F(field),
+                output_field=output_field
+            )
+        return updates
+
+    @staticmethod
+    def totals(experiment_id: int) -> Dict:
+        Experiment = apps.get_model('core', 'Experiment')
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        exploration_time = Experiment.objects.filter(id=experiment_id).values_list(
+            'exploration_time', flat=True
+        ).first() or 0.0
+        return {
+            'exploration_time': round(exploration_time, 2),
+            'objects': [
+                {'id': obj['id'], 'reference': obj['reference'], 'time_object': round(obj['time'], 2)}
+                for obj in ExperimentObject.objects.filter(experiment_id=experiment_id).values(
+                    'id', 'reference', 'time'
+                )
+            ]
+        }
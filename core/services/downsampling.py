@@ -0,0 +1,57 @@
+import numpy as np
+
+
+def lttb(points: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets sobre puntos (n, 2); devuelve los índices elegidos.
+
+    Conserva el primer y el último punto y, en cada bucket intermedio, el punto que forma el
+    triángulo de mayor área con el punto elegido en el bucket anterior y la media del siguiente.
+    """
+    n = len(points)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.linspace(0, n - 1, max(n_out, 0)).astype(np.int64)
+
+    # Límites de los n_out - 2 buckets intermedios sobre los puntos 1..n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    # Media de cada bucket (la usa el bucket anterior como tercer vértice)
+    sums = np.add.reduceat(points[:n - 1], edges[:-1], axis=0)
+    means = sums / np.diff(edges)[:, None]
+    next_means = np.vstack([means[1:], points[-1:]])
+
+    previous = points[0]
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        candidates = points[lo:hi]
+        target = next_means[b]
+        area = np.abs(
+            (previous[0] - target[0]) * (candidates[:, 1] - previous[1])
+            - (previous[0] - candidates[:, 0]) * (target[1] - previous[1])
+        )
+        best = lo + int(np.argmax(area))
+        selected[b + 1] = best
+        previous = points[best]
+    return selected
+
+
+def minmax(points: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices del primer y último punto y de los extremos de cada columna por bucket"""
+    n, dims = points.shape
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = max(n_out // (2 * dims + 2), 1)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    lengths = np.diff(edges)
+    bucket = np.repeat(np.arange(n_buckets), lengths)
+
+    selected = [edges[:-1], edges[1:] - 1]
+    for d in range(dims):
+        # Orden estable por (bucket, valor): el primero y el último de cada bucket son min y max
+        order = np.lexsort((points[:, d], bucket))
+        selected.append(order[edges[:-1]])
+        selected.append(order[edges[1:] - 1])
+    return np.unique(np.concatenate(selected))
@@ -0,0 +1,147 @@
+import os
+import numpy as np
+from typing import Dict, Optional
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.trajectory_store import TrajectoryStore
+from core.services.trajectory_service import TrajectoryService
+
+
+class Ethogram:
+    """Línea temporal de comportamiento por frame codificada por tramos (run-length).
+
+    Cada tramo cubre los frames [start, end) con una misma clase; NO_DETECTION marca frames
+    sin detección. Los huecos en la numeración de frames cortan el tramo.
+    """
+    NO_DETECTION = -1
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, classes: np.ndarray, fps: float):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.classes = np.asarray(classes, dtype=np.int16)
+        self.fps = float(fps)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @classmethod
+    def from_frames(cls, frames: np.ndarray, class_ids: np.ndarray, fps: float) -> "Ethogram":
+        frames = np.asarray(frames, dtype=np.int64)
+        classes = np.where(np.isfinite(class_ids), class_ids, cls.NO_DETECTION).astype(np.int16)
+        if not len(frames):
+            return cls(np.array([]), np.array([]), np.array([]), fps)
+
+        breaks = np.flatnonzero((np.diff(classes) != 0) | (np.diff(frames) != 1)) + 1
+        run_starts = np.concatenate([[0], breaks])
+        run_ends = np.concatenate([breaks, [len(frames)]]) - 1
+        return cls(frames[run_starts], frames[run_ends] + 1, classes[run_starts], fps)
+
+    @classmethod
+    def from_store(cls, store: TrajectoryStore, fps: float) -> "Ethogram":
+        return cls.from_frames(np.asarray(store.frames), store.class_ids(), fps)
+
+    def save(self, path: str) -> str:
+        np.savez(path, starts=self.starts, ends=self.ends, classes=self.classes, fps=np.array(self.fps))
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Ethogram":
+        with np.load(path) as data:
+            return cls(data['starts'], data['ends'], data['classes'], float(data['fps']))
+
+    def window(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> "Ethogram":
+        """Tramos que solapan [start_frame, end_frame), recortados a la ventana"""
+        if start_frame is None:
+            start_frame = int(self.starts[0]) if len(self) else 0
+        if end_frame is None:
+            end_frame = int(self.ends[-1]) if len(self) else 0
+        first = int(np.searchsorted(self.ends, start_frame, side='right'))
+        last = int(np.searchsorted(self.starts, end_frame, side='left'))
+        return Ethogram(
+            np.maximum(self.starts[first:last], start_frame),
+            np.minimum(self.ends[first:last], end_frame),
+            self.classes[first:last],
+            self.fps
+        )
+
+    def merge_short(self, min_frames: int) -> "Ethogram":
+        """Absorbe los tramos más cortos que min_frames en el tramo largo anterior y une vecinos iguales"""
+        if len(self) == 0 or min_frames <= 1:
+            return self._coalesce(self.starts, self.ends, self.classes)
+
+        lengths = self.ends - self.starts
+        keep = lengths >= min_frames
+        if not keep.any():
+            # Ningún tramo alcanza la resolución: la ventana se resume con la clase dominante
+            totals = {c: lengths[self.classes == c].sum() for c in np.unique(self.classes)}
+            dominant = max(totals, key=totals.get)
+            return Ethogram(self.starts[:1], self.ends[-1:], np.array([dominant]), self.fps)
+
+        kept = np.flatnonzero(keep)
+        starts = self.starts[kept].copy()
+        classes = self.classes[kept]
+        # Cada tramo conservado se extiende hasta el inicio del siguiente conservado
+        ends = np.append(starts[1:], self.ends[-1])
+        starts[0] = self.starts[0]
+        return self._coalesce(starts, ends, classes)
+
+    def _coalesce(self, starts: np.ndarray, ends: np.ndarray, classes: np.ndarray) -> "Ethogram":
+        if not len(starts):
+            return Ethogram(starts, ends, classes, self.fps)
+        new_run = np.concatenate([[True], (classes[1:] != classes[:-1]) | (starts[1:] != ends[:-1])])
+        run_index = np.flatnonzero(new_run)
+        last_in_run = np.append(run_index[1:], len(starts)) - 1
+        return Ethogram(starts[run_index], ends[last_in_run], classes[run_index], self.fps)
+
+    def totals(self) -> Dict[int, float]:
+        """Segundos por clase"""
+        lengths = self.ends - self.starts
+        return {
+            int(c): round(float(lengths[self.classes == c].sum() / self.fps), 3)
+            for c in np.unique(self.classes)
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'start': np.round(self.starts / self.fps, 3).tolist(),
+            'end': np.round(self.ends / self.fps, 3).tolist(),
+            'class_id': self.classes.astype(int).tolist()
+        }
+
+
+class EthogramService:
+    """Etograma del experimento guardado como ethogram.npz junto al almacén de trayectoria"""
+
+    def get_ethogram(self, experiment) -> Ethogram:
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+        if os.path.exists(artifacts.ethogram):
+            return Ethogram.load(artifacts.ethogram)
+
+        trajectories = TrajectoryService()
+        store = trajectories.get_store(experiment)
+        ethogram = Ethogram.from_store(store, trajectories.fps(experiment, store))
+        ethogram.save(artifacts.ethogram)
+        return ethogram
+
+    def build(self, experiment, start: Optional[float] = None, end: Optional[float] = None,
+              resolution: float = 0.0) -> Dict:
+        from core.services.video_processing import VideoProcessingService
+
+        ethogram = self.get_ethogram(experiment)
+        fps = ethogram.fps
+        window = ethogram.window(
+            None if start is None else int(round(start * fps)),
+            None if end is None else int(round(end * fps))
+        )
+        merged = window.merge_short(int(round(resolution * fps)))
+
+        return {
+            'experiment_id': experiment.id,
+            'fps': fps,
+            'resolution': resolution,
+            'classes': {
+                str(class_id): name for class_id, name in VideoProcessingService.BEHAVIOR_MAPPING.items()
+            },
+            'totals': {str(k): v for k, v in window.totals().items()},
+            'segment_count': len(merged),
+            'segments': merged.to_dict()
+        }
@@ -0,0 +1,72 @@
+import os
+import glob
+from typing import Optional
+
+class ExperimentArtifacts:
+    """Rutas de los artefactos intermedios de un experimento (processing/<experiment_id>)"""
+    PREDICTIONS_CSV = "predictions.csv"
+    TRAJECTORY_STORE = "predictions.trj"
+    PROVIDED_ROIS_JSON = "provided_rois.json"
+    DETECTED_ROIS_PATTERN = "rois_frame_*.json"
+    CLIPS_DIR = "clips"
+    TIMECOURSE_NPZ = "timecourse.npz"
+    ETHOGRAM_NPZ = "ethogram.npz"
+
+    def __init__(self, video_path: str, experiment_id: int):
+        self.video_path = video_path
+        self.experiment_id = experiment_id
+        self.workdir = os.path.join(os.path.dirname(video_path), "processing", str(experiment_id))
+
+    @classmethod
+    def for_experiment(cls, experiment) -> "ExperimentArtifacts":
+        return cls(experiment.video_file.path, experiment.id)
+
+    @classmethod
+    def for_workdir(cls, video_path: str, workdir: str) -> "ExperimentArtifacts":
+        """Artefactos de un directorio de trabajo arbitrario (pipeline fuera de un experimento)"""
+        artifacts = cls(video_path, os.path.basename(os.path.normpath(workdir)))
+        artifacts.workdir = workdir
+        return artifacts
+
+    def ensure_workdir(self) -> str:
+        os.makedirs(self.workdir, exist_ok=True)
+        return self.workdir
+
+    @property
+    def predictions_csv(self) -> str:
+        return os.path.join(self.workdir, self.PREDICTIONS_CSV)
+
+    @property
+    def trajectory_store(self) -> str:
+        return os.path.join(self.workdir, self.TRAJECTORY_STORE)
+
+    @property
+    def predictions_path(self) -> str:
+        """Predicciones por frame: el almacén compacto si existe, si no el CSV original"""
+        if os.path.exists(self.trajectory_store):
+            return self.trajectory_store
+        return self.predictions_csv
+
+    @property
+    def clips_dir(self) -> str:
+        return os.path.join(self.workdir, self.CLIPS_DIR)
+
+    @property
+    def timecourse(self) -> str:
+        return os.path.join(self.workdir, self.TIMECOURSE_NPZ)
+
+    @property
+    def ethogram(self) -> str:
+        return os.path.join(self.workdir, self.ETHOGRAM_NPZ)
+
+    @property
+    def rois_json(self) -> Optional[str]:
+        """ROIs usadas en el análisis: las proporcionadas tienen prioridad sobre las detectadas"""
+        provided = os.path.join(self.workdir, self.PROVIDED_ROIS_JSON)
+        if os.path.exists(provided):
+            return provided
+        detected = sorted(glob.glob(os.path.join(self.workdir, self.DETECTED_ROIS_PATTERN)))
+        return detected[0] if detected else None
+
+    def has_predictions(self) -> bool:
+        return os.path.exists(self.predictions_path) and self.rois_json is not None
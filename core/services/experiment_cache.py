@@ -0,0 +1,80 @@
+import time
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional
+from django.apps import apps
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+class ExperimentCacheService:
+    """Versiones de los experimentos y caché de las respuestas de lectura (detalle y listado).
+
+    Cada experimento guarda un contador `version` que se incrementa en toda mutación; el
+    listado usa un contador global en caché. Las respuestas se guardan con clave
+    (experimento, versión, usuario, URL), así que no hace falta invalidarlas: una versión
+    nueva simplemente deja de encontrar las antiguas, que caducan solas.
+    """
+    DETAIL_KEY = "experiment:{experiment_id}:v{version}:{digest}"
+    LIST_KEY = "experiments:list:v{version}:{digest}"
+    LIST_VERSION_KEY = "experiments:list:version"
+    TIMEOUT = 60 * 60
+
+    @classmethod
+    def bump(cls, experiment_id: int):
+        """Nueva versión del experimento (y del listado) tras una mutación"""
+        cls.bump_many([experiment_id])
+
+    @classmethod
+    def bump_many(cls, experiment_ids: Iterable[int]):
+        Experiment = apps.get_model('core', 'Experiment')
+        Experiment.objects.filter(id__in=list(experiment_ids)).update(version=F('version') + 1)
+        # El listado vive en caché, fuera de la transacción: se incrementa tras el commit
+        transaction.on_commit(cls.bump_list)
+
+    @classmethod
+    def bump_list(cls):
+        try:
+            cache.incr(cls.LIST_VERSION_KEY)
+        except ValueError:
+            # Sin contador (caché vaciada): se parte de un valor que no puede repetir uno anterior
+            cache.add(cls.LIST_VERSION_KEY, time.time_ns(), timeout=None)
+
+    @classmethod
+    def list_version(cls) -> int:
+        version = cache.get(cls.LIST_VERSION_KEY)
+        if version is None:
+            cache.add(cls.LIST_VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(cls.LIST_VERSION_KEY)
+        return int(version)
+
+    @staticmethod
+    def experiment_version(experiment_id: int) -> Optional[int]:
+        Experiment = apps.get_model('core', 'Experiment')
+        return Experiment.objects.filter(id=experiment_id).values_list('version', flat=True).first()
+
+    @staticmethod
+    def _digest(user_id: Optional[int], url: str) -> str:
+        return hashlib.sha1(f"{user_id or 'anon'}|{url}".encode('utf-8')).hexdigest()
+
+    @classmethod
+    def detail_key(cls, experiment_id: int, version: int, user_id: Optional[int], url: str) -> str:
+        return cls.DETAIL_KEY.format(experiment_id=experiment_id, version=version, digest=cls._digest(user_id, url))
+
+    @classmethod
+    def list_key(cls, version: int, user_id: Optional[int], url: str) -> str:
+        return cls.LIST_KEY.format(version=version, digest=cls._digest(user_id, url))
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return '"' + hashlib.sha1(key.encode('utf-8')).hexdigest() + '"'
+
+    @classmethod
+    def get(cls, key: str) -> Optional[Dict]:
+        return cache.get(key)
+
+    @classmethod
+    def set(cls, key: str, payload: Dict):
+        cache.set(key, payload, timeout=cls.TIMEOUT)
@@ -2,15 +2,19 @@ from django.core.exceptions import ValidationError
 import logging
 from django.apps import apps
 from django.core.files.storage import default_storage
+from django.db import transaction
 from core.services.video_processing import VideoProcessingService
+from core.services.experiment_status import ExperimentStatusService
+from core.services.experiment_cache import ExperimentCacheService
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 class ExperimentService:
-    def __init__(self, file_storage, video_processor):
+    def __init__(self, file_storage, video_processor, progress_publisher=None):
         self.storage = file_storage
         self.processor = video_processor
+        self.progress = progress_publisher
         self.video_processing = VideoProcessingService(
             model_path=settings.VIDEO_PIPELINE_MODEL_PATH,
             segmenter_path=settings.VIDEO_PIPELINE_SEGMENTER_PATH
@@ -37,6 +41,7 @@ class ExperimentService:
                 status='UPL'
             )
             experiment.save()
+            ExperimentCacheService.bump_list()
             
             # 3. Procesar video de forma asíncrona
             self.processor.process(experiment.id)
@@ -55,7 +60,10 @@ class ExperimentService:
         try:
             # 1. Actualizar estado
             experiment.status = 'PRO'
-            experiment.save()
+            experiment.save(update_fields=['status'])
+            ExperimentCacheService.bump(experiment_id)
+            ExperimentStatusService.invalidate(experiment_id)
+            self._publish_progress(experiment_id, 'started', status='PRO')
             
             # 2. Obtener ruta del video
             video_path = experiment.video_file.path
@@ -63,17 +71,87 @@ class ExperimentService:
             # 3. Procesar video
             processing_result = self.video_processing.process(
                 video_path=video_path,
-                experiment_id=experiment_id
+                experiment_id=experiment_id,
+                progress_callback=lambda stage, current, total: self._publish_progress(
+                    experiment_id, stage, current, total
+                )
             )
             
             # 4. Actualizar estado
             experiment.status = 'COM'
-            experiment.save()
+            experiment.analysis_params = processing_result['analyzer_params']
+            # update_fields: un save completo pisaría la versión y los totales actualizados con F()
+            experiment.save(update_fields=['status', 'analysis_params'])
+            ExperimentCacheService.bump(experiment_id)
+            ExperimentStatusService.invalidate(experiment_id)
+            self._publish_progress(experiment_id, 'completed', status='COM')
             
             return processing_result
             
         except Exception as e:
             experiment.status = 'ERR'
-            experiment.save()
+            experiment.save(update_fields=['status'])
+            ExperimentCacheService.bump(experiment_id)
+            ExperimentStatusService.invalidate(experiment_id)
+            self._publish_progress(experiment_id, 'failed', status='ERR')
             logger.error(f"Error procesando experimento {experiment_id}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def update_object_label(self, experiment_id, reference, new_label, new_name=None):
+        """Cambia la etiqueta (y opcionalmente el nombre) de un objeto del experimento"""
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        with transaction.atomic():
+            obj = ExperimentObject.objects.select_for_update().get(
+                experiment_id=experiment_id,
+                reference=reference
+            )
+            obj.label = new_label
+            if new_name:
+                obj.name = new_name
+            try:
+                obj.save()
+            except ValidationError as e:
+                raise ValueError("; ".join(e.messages))
+            ExperimentCacheService.bump(experiment_id)
+        return obj
+
+    def reanalyze_experiment(self, experiment_id, analyzer_params):
+        """Re-analiza un experimento con nuevos parámetros reutilizando sus predicciones"""
+        from core.services.reanalysis_service import ReanalysisService
+        Experiment = apps.get_model('core', 'Experiment')
+
+        # Reemplaza el 'completed' del análisis anterior, que seguiría en el snapshot
+        self._publish_progress(experiment_id, 'started', status='PRO')
+        try:
+            result = ReanalysisService(self.video_processing).reanalyze(
+                experiment_id,
+                analyzer_params,
+                progress_callback=lambda stage, current, total: self._publish_progress(
+                    experiment_id, stage, current, total
+                )
+            )
+        except Exception:
+            # El re-análisis fallido restaura el estado anterior del experimento
+            status = Experiment.objects.filter(id=experiment_id).values_list('status', flat=True).first()
+            self._publish_progress(experiment_id, 'failed', status=status)
+            raise
+        self._publish_progress(experiment_id, 'completed', status='COM')
+        return result
+
+    def request_reanalysis(self, experiment_id, analyzer_params):
+        """Encola el re-análisis de un experimento completado"""
+        Experiment = apps.get_model('core', 'Experiment')
+        experiment = Experiment.objects.only('status').get(id=experiment_id)
+        if experiment.status != 'COM':
+            raise ValueError("Solo se pueden re-analizar experimentos completados")
+        return self.processor.reanalyze(experiment_id, analyzer_params)
+
+    def _publish_progress(self, experiment_id, stage, current=None, total=None, status=None):
+        if self.progress is None:
+            return
+        try:
+            self.progress.publish(experiment_id, stage, current=current, total=total, status=status)
+        except Exception as e:
+            # El progreso es informativo: nunca debe interrumpir el procesamiento
+            logger.warning(f"No se pudo publicar el progreso de {experiment_id}: {str(e)}")
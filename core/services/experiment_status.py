@@ -0,0 +1,62 @@
+import logging
+from typing import Dict, Iterable, Optional
+from django.apps import apps
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+class ExperimentStatusService:
+    """Estado ligero de un experimento servido desde caché y el progreso publicado"""
+    CACHE_KEY = "experiment:{experiment_id}:status"
+    TERMINAL_STATUSES = ('COM', 'ERR')
+    ACTIVE_TIMEOUT = 5
+    TERMINAL_TIMEOUT = 60 * 60
+
+    def __init__(self, progress_publisher=None):
+        self.progress = progress_publisher
+
+    @classmethod
+    def cache_key(cls, experiment_id: int) -> str:
+        return cls.CACHE_KEY.format(experiment_id=experiment_id)
+
+    @classmethod
+    def invalidate(cls, experiment_id: int):
+        cache.delete(cls.cache_key(experiment_id))
+
+    @classmethod
+    def invalidate_many(cls, experiment_ids: Iterable[int]):
+        cache.delete_many([cls.cache_key(experiment_id) for experiment_id in experiment_ids])
+
+    def get_status(self, experiment_id: int) -> Optional[Dict]:
+        """Devuelve el estado del experimento o None si no existe"""
+        key = self.cache_key(experiment_id)
+        data = cache.get(key)
+        if data is None:
+            data = self._load_from_db(experiment_id)
+            if data is None:
+                return None
+            timeout = (
+                self.TERMINAL_TIMEOUT
+                if data['processing_status'] in self.TERMINAL_STATUSES
+                else self.ACTIVE_TIMEOUT
+            )
+            cache.set(key, data, timeout=timeout)
+
+        data = dict(data)
+        snapshot = self.progress.get_snapshot(experiment_id) if self.progress else None
+        data['progress'] = snapshot
+        return data
+
+    def _load_from_db(self, experiment_id: int) -> Optional[Dict]:
+        Experiment = apps.get_model('core', 'Experiment')
+        Clip = apps.get_model('core', 'Clip')
+
+        status = Experiment.objects.filter(id=experiment_id).values_list('status', flat=True).first()
+        if status is None:
+            return None
+
+        return {
+            "experiment_id": experiment_id,
+            "processing_status": status,
+            "clips_count": Clip.objects.filter(experiment_id=experiment_id).count()
+        }
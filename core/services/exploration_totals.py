@@ -0,0 +1,155 @@
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from core.services.file_gc import FileGarbageCollector
+
+logger = logging.getLogger(__name__)
+
+class ExplorationTotalsService:
+    """Mantiene ExperimentObject.time y Experiment.exploration_time.
+
+    Cada total es la suma de la duración de los clips válidos cuyo comportamiento es de
+    exploración (behavior_type='EXP'). Crear, borrar o revisar clips aplica el incremento
+    con F() en la misma transacción (y sube la versión del experimento); rebuild() los
+    recalcula desde los clips.
+    """
+    CLIP_FIELDS = ('experiment_id', 'experiment_object_id', 'behavior_id', 'duration', 'valid')
+
+    @staticmethod
+    def exploration_behavior_ids() -> set:
+        Behavior = apps.get_model('core', 'Behavior')
+        return set(Behavior.objects.filter(behavior_type='EXP').values_list('id', flat=True))
+
+    @classmethod
+    def _deltas(cls, clips: Iterable[Dict], sign: float, exploration_ids: set):
+        by_object, by_experiment = defaultdict(float), defaultdict(float)
+        for clip in clips:
+            if not clip['valid'] or clip['behavior_id'] not in exploration_ids:
+                continue
+            duration = sign * (clip['duration'] or 0.0)
+            by_experiment[clip['experiment_id']] += duration
+            if clip['experiment_object_id']:
+                by_object[clip['experiment_object_id']] += duration
+        return by_object, by_experiment
+
+    @staticmethod
+    def _bump_versions(experiment_ids: Iterable[int]):
+        from core.services.experiment_cache import ExperimentCacheService
+        experiment_ids = set(experiment_ids)
+        if experiment_ids:
+            ExperimentCacheService.bump_many(experiment_ids)
+
+    @staticmethod
+    def _clip_count_changed(experiment_ids: Iterable[int]):
+        """El estado en caché incluye clips_count: se invalida tras el commit"""
+        from core.services.experiment_status import ExperimentStatusService
+        experiment_ids = set(experiment_ids)
+        if experiment_ids:
+            transaction.on_commit(lambda: ExperimentStatusService.invalidate_many(experiment_ids))
+
+    @classmethod
+    def _apply(cls, by_object: Dict[int, float], by_experiment: Dict[int, float]):
+        Experiment = apps.get_model('core', 'Experiment')
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        # Greatest evita totales negativos por el redondeo acumulado de los float
+        for object_id, delta in by_object.items():
+            ExperimentObject.objects.filter(id=object_id).update(
+                time=Greatest(F('time') + delta, Value(0.0))
+            )
+        for experiment_id, delta in by_experiment.items():
+            Experiment.objects.filter(id=experiment_id).update(
+                exploration_time=Greatest(F('exploration_time') + delta, Value(0.0))
+            )
+
+    @classmethod
+    def clips_added(cls, clips: List, exploration_ids: Optional[set] = None):
+        """Suma a los totales los clips recién creados (instancias de Clip)"""
+        if not clips:
+            return
+        if exploration_ids is None:
+            exploration_ids = cls.exploration_behavior_ids()
+        rows = [{field: getattr(clip, field) for field in cls.CLIP_FIELDS} for clip in clips]
+        cls._apply(*cls._deltas(rows, 1.0, exploration_ids))
+        cls._bump_versions(row['experiment_id'] for row in rows)
+        cls._clip_count_changed(row['experiment_id'] for row in rows)
+
+    @classmethod
+    def clips_changed(cls, before: List[Dict], after: List[Dict]):
+        """Ajusta los totales por clips modificados (filas con CLIP_FIELDS antes y después)"""
+        exploration_ids = cls.exploration_behavior_ids()
+        by_object, by_experiment = defaultdict(float), defaultdict(float)
+        for sign, rows in ((-1.0, before), (1.0, after)):
+            object_deltas, experiment_deltas = cls._deltas(rows, sign, exploration_ids)
+            for object_id, delta in object_deltas.items():
+                by_object[object_id] += delta
+            for experiment_id, delta in experiment_deltas.items():
+                by_experiment[experiment_id] += delta
+        # Solo se actualizan las filas cuyo total cambia de verdad
+        cls._apply(
+            {k: v for k, v in by_object.items() if v},
+            {k: v for k, v in by_experiment.items() if v}
+        )
+        cls._bump_versions(row['experiment_id'] for row in before)
+
+    @classmethod
+    def delete_clips(cls, queryset) -> int:
+        """Borra los clips del queryset descontándolos de los totales; devuelve cuántos se borraron.
+
+        Sus archivos se encolan para el GC en la misma transacción (se borran en segundo plano).
+        """
+        with transaction.atomic():
+            rows = list(queryset.select_for_update().values(
+                *cls.CLIP_FIELDS, *FileGarbageCollector.CLIP_FILE_FIELDS
+            ))
+            deleted_count, _ = queryset.delete()
+            FileGarbageCollector.enqueue_clip_files(rows)
+            cls._apply(*cls._deltas(rows, -1.0, cls.exploration_behavior_ids()))
+            cls._bump_versions(row['experiment_id'] for row in rows)
+            cls._clip_count_changed(row['experiment_id'] for row in rows)
+        return deleted_count
+
+    @classmethod
+    def rebuild(cls, experiment_ids: Optional[Iterable[int]] = None) -> int:
+        """Recalcula los totales con un agregado agrupado; devuelve el número de experimentos"""
+        Clip = apps.get_model('core', 'Clip')
+        Behavior = apps.get_model('core', 'Behavior')
+        Experiment = apps.get_model('core', 'Experiment')
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        experiments = Experiment.objects.all()
+        if experiment_ids is not None:
+            experiments = experiments.filter(id__in=list(experiment_ids))
+        ids = list(experiments.values_list('id', flat=True))
+
+        exploration = Clip.objects.filter(
+            experiment_id__in=ids,
+            valid=True,
+            behavior_id__in=Behavior.objects.filter(behavior_type='EXP').values('id')
+        ).order_by()
+        by_object = dict(
+            exploration.exclude(experiment_object_id=None)
+            .values_list('experiment_object_id').annotate(total=Sum('duration'))
+        )
+        by_experiment = dict(
+            exploration.values_list('experiment_id').annotate(total=Sum('duration'))
+        )
+
+        with transaction.atomic():
+            objects = list(ExperimentObject.objects.filter(experiment_id__in=ids).only('id', 'time'))
+            for obj in objects:
+                obj.time = by_object.get(obj.id) or 0.0
+            ExperimentObject.objects.bulk_update(objects, ['time'], batch_size=500)
+
+            rows = list(experiments.only('id', 'exploration_time'))
+            for experiment in rows:
+                experiment.exploration_time = by_experiment.get(experiment.id) or 0.0
+            Experiment.objects.bulk_update(rows, ['exploration_time'], batch_size=500)
+            cls._bump_versions(ids)
+
+        logger.info(f"Totales de exploración recalculados para {len(ids)} experimentos")
+        return len(ids)
@@ -0,0 +1,243 @@
+import os
+import time
+import shutil
+import logging
+from typing import Dict, Iterable, List, Optional
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from core.services.experiment_artifacts import ExperimentArtifacts
+
+logger = logging.getLogger(__name__)
+
+class FileGarbageCollector:
+    """Borrado diferido de archivos de clips y limpieza de directorios de trabajo.
+
+    En la petición solo se registran los archivos a borrar (PendingFileDeletion) en la misma
+    transacción que las filas; las tareas de Celery los eliminan en lotes. Un barrido periódico
+    recoge además archivos de clips huérfanos, workdirs de experimentos que ya no existen y los
+    artefactos intermedios regenerables de workdirs que superan el tamaño máximo.
+    """
+    CLIP_FILE_FIELDS = ('video_clip', 'poster', 'sprite')
+    CLIPS_ROOT = "experiments"
+    PROCESSING_DIR = os.path.join("experiments", "processing")
+    MAX_ATTEMPTS = 5
+    # Artefactos que se pueden regenerar, por orden de borrado cuando un workdir es demasiado grande
+    REGENERABLE_ARTIFACTS = (
+        ExperimentArtifacts.CLIPS_DIR,
+        "heatmaps",
+        ExperimentArtifacts.ETHOGRAM_NPZ,
+        ExperimentArtifacts.TIMECOURSE_NPZ,
+    )
+
+    def __init__(self, batch_size: Optional[int] = None, grace_seconds: Optional[int] = None,
+                 max_workdir_bytes: Optional[int] = None):
+        self.batch_size = batch_size or getattr(settings, 'FILE_GC_BATCH_SIZE', 500)
+        # Los archivos recién escritos pueden pertenecer a un pipeline que aún no ha creado sus clips
+        self.grace_seconds = grace_seconds if grace_seconds is not None else \
+            getattr(settings, 'FILE_GC_GRACE_SECONDS', 6 * 60 * 60)
+        self.max_workdir_bytes = max_workdir_bytes or getattr(settings, 'FILE_GC_MAX_WORKDIR_BYTES', 512 * 1024 ** 2)
+
+    # ------------------------------------------------------------------
+    # Encolado (camino de la petición)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def enqueue(cls, names: Iterable[str], kind: str = 'FIL'):
+        """Registra los borrados y lanza la tarea de GC cuando la transacción se confirma"""
+        PendingFileDeletion = apps.get_model('core', 'PendingFileDeletion')
+        rows = [PendingFileDeletion(name=name, kind=kind) for name in dict.fromkeys(names) if name]
+        if not rows:
+            return
+        PendingFileDeletion.objects.bulk_create(rows, batch_size=500)
+        transaction.on_commit(cls._schedule)
+
+    @classmethod
+    def enqueue_clip_files(cls, clips: Iterable[Dict]):
+        """Archivos de filas de Clip (values() con CLIP_FILE_FIELDS)"""
+        cls.enqueue(clip[field] for clip in clips for field in cls.CLIP_FILE_FIELDS)
+
+    @staticmethod
+    def _schedule():
+        from core.tasks.file_gc_tasks import process_file_deletions_task
+        try:
+            process_file_deletions_task.delay()
+        except Exception as e:
+            # Sin broker los borrados quedan pendientes hasta el siguiente barrido periódico
+            logger.warning(f"No se pudo encolar el GC de archivos: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # Borrado en lotes (tarea)
+    # ------------------------------------------------------------------
+
+    def process_pending(self) -> Dict:
+        """Procesa un lote de borrados pendientes; 'remaining' indica si quedan más"""
+        PendingFileDeletion = apps.get_model('core', 'PendingFileDeletion')
+
+        batch = list(
+            PendingFileDeletion.objects.filter(attempts__lt=self.MAX_ATTEMPTS)
+            .order_by('id')[:self.batch_size]
+        )
+        referenced = self._referenced_names([row.name for row in batch if row.kind == 'FIL'])
+
+        done, failed = [], []
+        for row in batch:
+            try:
+                if row.kind == 'DIR':
+                    if os.path.isdir(row.name):
+                        shutil.rmtree(row.name)
+                elif row.name not in referenced:
+                    # Un clip nuevo puede haber reutilizado el nombre: entonces solo se olvida el registro
+                    default_storage.delete(row.name)
+                done.append(row.id)
+            except Exception as e:
+                logger.warning(f"No se pudo borrar {row.name}: {str(e)}")
+                failed.append(row.id)
+                PendingFileDeletion.objects.filter(id=row.id).update(
+                    attempts=F('attempts') + 1,
+                    last_error=str(e)[:1000]
+                )
+
+        PendingFileDeletion.objects.filter(id__in=done).delete()
+        return {
+            'deleted': len(done),
+            'failed': len(failed),
+            'remaining': len(batch) == self.batch_size
+        }
+
+    def _referenced_names(self, names: List[str]) -> set:
+        Clip = apps.get_model('core', 'Clip')
+        referenced = set()
+        if not names:
+            return referenced
+        for field in self.CLIP_FILE_FIELDS:
+            referenced.update(
+                Clip.objects.filter(**{f"{field}__in": names}).values_list(field, flat=True)
+            )
+        return referenced
+
+    # ------------------------------------------------------------------
+    # Barrido periódico
+    # ------------------------------------------------------------------
+
+    def _is_old(self, modified_time: float) -> bool:
+        return time.time() - modified_time > self.grace_seconds
+
+    def sweep_orphan_clip_files(self) -> int:
+        """Encola archivos de experiments/<id>/clips que ninguna fila de Clip referencia"""
+        Clip = apps.get_model('core', 'Clip')
+        if not default_storage.exists(self.CLIPS_ROOT):
+            return 0
+
+        directories, _ = default_storage.listdir(self.CLIPS_ROOT)
+        orphans = []
+        for directory in sorted(d for d in directories if d.isdigit()):
+            clips_dir = os.path.join(self.CLIPS_ROOT, directory, "clips")
+            if not default_storage.exists(clips_dir):
+                continue
+            _, files = default_storage.listdir(clips_dir)
+            referenced = set()
+            for names in Clip.objects.filter(experiment_id=int(directory)).values_list(*self.CLIP_FILE_FIELDS):
+                referenced.update(names)
+            candidates = [
+                name for name in (os.path.join(clips_dir, filename).replace('\\', '/') for filename in files)
+                if name not in referenced and self._is_old(default_storage.get_modified_time(name).timestamp())
+            ]
+            orphans.extend(self._not_pending(candidates))
+            if len(orphans) >= self.batch_size:
+                break
+
+        if orphans:
+            with transaction.atomic():
+                self.enqueue(orphans)
+        logger.info(f"GC: {len(orphans)} archivos de clips huérfanos encolados")
+        return len(orphans)
+
+    @staticmethod
+    def _not_pending(names: List[str]) -> List[str]:
+        """Descarta lo que ya está encolado de un barrido anterior"""
+        PendingFileDeletion = apps.get_model('core', 'PendingFileDeletion')
+        pending = set(PendingFileDeletion.objects.filter(name__in=names).values_list('name', flat=True))
+        return [name for name in names if name not in pending]
+
+    def _processing_root(self) -> Optional[str]:
+        try:
+            return default_storage.path(self.PROCESSING_DIR)
+        except NotImplementedError:
+            # Los workdirs solo existen en storage local
+            return None
+
+    def sweep_stale_workdirs(self) -> int:
+        """Encola los workdirs processing/<id> de experimentos que ya no existen"""
+        Experiment = apps.get_model('core', 'Experiment')
+        root = self._processing_root()
+        if not root or not os.path.isdir(root):
+            return 0
+
+        candidates = {
+            int(entry.name): entry.path for entry in os.scandir(root)
+            if entry.is_dir() and entry.name.isdigit() and self._is_old(entry.stat().st_mtime)
+        }
+        existing = set(Experiment.objects.filter(id__in=list(candidates)).values_list('id', flat=True))
+        stale = self._not_pending(
+            [path for experiment_id, path in sorted(candidates.items()) if experiment_id not in existing]
+        )
+        if stale:
+            with transaction.atomic():
+                self.enqueue(stale, kind='DIR')
+        logger.info(f"GC: {len(stale)} directorios de trabajo obsoletos encolados")
+        return len(stale)
+
+    @staticmethod
+    def _size(path: str) -> int:
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        total = 0
+        for directory, _, files in os.walk(path):
+            for filename in files:
+                try:
+                    total += os.path.getsize(os.path.join(directory, filename))
+                except OSError:
+                    pass
+        return total
+
+    def enforce_workdir_retention(self) -> int:
+        """Borra artefactos regenerables de workdirs de experimentos terminados que superan el máximo.
+
+        Devuelve los bytes liberados. Se conservan el almacén de trayectoria y las ROIs, que
+        son lo que necesita el re-análisis; el CSV solo se borra si ya existe el almacén.
+        """
+        Experiment = apps.get_model('core', 'Experiment')
+        freed = 0
+        experiments = Experiment.objects.filter(status__in=['COM', 'ERR']).only('id', 'video_file')
+        for experiment in experiments.iterator(chunk_size=self.batch_size):
+            try:
+                artifacts = ExperimentArtifacts.for_experiment(experiment)
+            except (ValueError, NotImplementedError):
+                continue
+            if not os.path.isdir(artifacts.workdir):
+                continue
+
+            size = self._size(artifacts.workdir)
+            if size <= self.max_workdir_bytes:
+                continue
+
+            removable = [os.path.join(artifacts.workdir, name) for name in self.REGENERABLE_ARTIFACTS]
+            if os.path.exists(artifacts.trajectory_store):
+                removable.append(artifacts.predictions_csv)
+            for path in removable:
+                if size <= self.max_workdir_bytes:
+                    break
+                if not os.path.exists(path):
+                    continue
+                path_size = self._size(path)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                size -= path_size
+                freed += path_size
+                logger.info(f"GC: eliminado {path} ({path_size} bytes) del experimento {experiment.id}")
+        return freed
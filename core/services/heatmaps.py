@@ -0,0 +1,212 @@
+import os
+import json
+import glob
+import shutil
+import hashlib
+import logging
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.trajectory_store import TrajectoryStore
+from core.services.timecourse import ExplorationTimeCourse, TimeCourseService
+
+logger = logging.getLogger(__name__)
+
+class HeatmapService:
+    """Mapas de ocupación (centro del cuerpo) y de posición de la nariz con np.histogram2d.
+
+    Los resultados se guardan en heatmaps/<firma>/ como .npz y .png; la firma incluye el almacén
+    de trayectoria (y el timecourse cuando se separa por ROI o episodio), así que cualquier
+    cambio en las predicciones o en los episodios invalida la caché automáticamente.
+    """
+    HEATMAPS_DIR = "heatmaps"
+    DEFAULT_GRID = 64
+    KINDS = ('occupancy', 'nose')
+    SPLITS = ('none', 'roi', 'episode')
+    PNG_MIN_WIDTH = 256
+
+    def __init__(self, artifacts: ExperimentArtifacts):
+        self.artifacts = artifacts
+        self._store = None
+        self._experiment = None
+
+    @classmethod
+    def for_experiment(cls, experiment) -> "HeatmapService":
+        from core.services.trajectory_service import TrajectoryService
+        service = cls(ExperimentArtifacts.for_experiment(experiment))
+        # Convierte el CSV de experimentos antiguos si aún no tienen almacén compacto
+        service._store = TrajectoryService().get_store(experiment)
+        # El timecourse (para split=roi|episode) se genera al pedirlo, como en su endpoint
+        service._experiment = experiment
+        return service
+
+    @property
+    def store(self) -> TrajectoryStore:
+        if self._store is None:
+            if not os.path.exists(self.artifacts.trajectory_store):
+                raise FileNotFoundError(f"No hay trayectoria guardada en {self.artifacts.workdir}")
+            self._store = TrajectoryStore.open(self.artifacts.trajectory_store)
+        return self._store
+
+    @property
+    def fps(self) -> float:
+        if self.store.fps:
+            return float(self.store.fps)
+        cap = cv2.VideoCapture(self.artifacts.video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        return float(fps)
+
+    def frame_size(self) -> Tuple[int, int]:
+        rois_json = self.artifacts.rois_json
+        if rois_json:
+            with open(rois_json) as f:
+                for roi in json.load(f).values():
+                    if roi.get("frame_width") and roi.get("frame_height"):
+                        return int(roi["frame_width"]), int(roi["frame_height"])
+        cap = cv2.VideoCapture(self.artifacts.video_path)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        if width <= 0 or height <= 0:
+            raise ValueError(f"No se pudo obtener la resolución del video: {self.artifacts.video_path}")
+        return width, height
+
+    def _signature(self, split: str) -> str:
+        parts = [self.store.signature]
+        if split != 'none':
+            if not os.path.exists(self.artifacts.timecourse) and self._experiment is not None:
+                TimeCourseService().get_timecourse(self._experiment)
+            if not os.path.exists(self.artifacts.timecourse):
+                raise FileNotFoundError("La separación por ROI o episodio requiere el timecourse del experimento")
+            parts.append(str(os.stat(self.artifacts.timecourse).st_mtime_ns))
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def _cache_path(self, kind: str, grid: int, split: str, extension: str, name: Optional[str] = None) -> str:
+        directory = os.path.join(self.artifacts.workdir, self.HEATMAPS_DIR, self._signature(split))
+        suffix = f"_{name}" if name else ""
+        return os.path.join(directory, f"{kind}_{grid}_{split}{suffix}.{extension}")
+
+    def _positions(self, kind: str) -> np.ndarray:
+        if kind == 'nose':
+            return self.store.keypoints(names=['nariz'])[:, 0, :]
+        neck, tail = np.moveaxis(self.store.keypoints(names=['cuello', 'base_cola']), 1, 0)
+        return (neck + tail) / 2.0
+
+    def _frame_masks(self, split: str) -> Dict[str, np.ndarray]:
+        """Máscaras por fila del almacén para cada mapa de la separación pedida"""
+        if split == 'none':
+            return {'all': np.ones(len(self.store), dtype=bool)}
+
+        timecourse = ExplorationTimeCourse.load(self.artifacts.timecourse)
+        frames = np.asarray(self.store.frames, dtype=np.int64)
+        in_range = frames < timecourse.total_frames
+        per_roi = {}
+        for r, roi_name in enumerate(timecourse.roi_names):
+            exploring = np.diff(timecourse.prefixes['exploration'][r]).astype(bool)
+            mask = np.zeros(len(frames), dtype=bool)
+            mask[in_range] = exploring[frames[in_range]]
+            per_roi[roi_name] = mask
+
+        if split == 'roi':
+            return per_roi
+        in_episode = np.logical_or.reduce(list(per_roi.values())) if per_roi else np.zeros(len(frames), dtype=bool)
+        return {'in_episode': in_episode, 'outside_episode': ~in_episode}
+
+    def compute(self, kind: str = 'occupancy', grid: int = DEFAULT_GRID, split: str = 'none') -> Dict:
+        width, height = self.frame_size()
+        grid_x = int(grid)
+        grid_y = max(int(round(grid * height / width)), 1)
+        positions = self._positions(kind).astype(np.float64)
+        valid = np.isfinite(positions).all(axis=1)
+        fps = self.fps
+
+        maps = {}
+        for name, mask in self._frame_masks(split).items():
+            selected = positions[valid & mask]
+            counts, _, _ = np.histogram2d(
+                selected[:, 1], selected[:, 0],
+                bins=[grid_y, grid_x],
+                range=[[0, height], [0, width]]
+            )
+            # Filas = eje y de la imagen; valores en segundos
+            maps[name] = (counts / fps).astype(np.float32)
+
+        return {
+            'kind': kind,
+            'grid': [grid_x, grid_y],
+            'split': split,
+            'frame_size': [width, height],
+            'cell_size': [width / grid_x, height / grid_y],
+            'maps': maps
+        }
+
+    def get(self, kind: str = 'occupancy', grid: int = DEFAULT_GRID, split: str = 'none') -> Dict:
+        """Mapas desde la caché en disco, calculándolos la primera vez"""
+        path = self._cache_path(kind, grid, split, 'npz')
+        if os.path.exists(path):
+            with np.load(path) as data:
+                meta = json.loads(str(data['meta']))
+                meta['maps'] = {name: data[f"map_{name}"] for name in meta.pop('names')}
+            return meta
+
+        result = self.compute(kind, grid, split)
+        self._prune_stale_signatures(os.path.dirname(path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {k: v for k, v in result.items() if k != 'maps'}
+        meta['names'] = list(result['maps'])
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            meta=np.array(json.dumps(meta)),
+            **{f"map_{name}": values for name, values in result['maps'].items()}
+        )
+        os.replace(tmp_path, path)
+        return result
+
+    def png(self, kind: str = 'occupancy', grid: int = DEFAULT_GRID, split: str = 'none',
+            name: Optional[str] = None) -> bytes:
+        result = self.get(kind, grid, split)
+        name = name or next(iter(result['maps']))
+        if name not in result['maps']:
+            raise KeyError(name)
+        path = self._cache_path(kind, grid, split, 'png', name=name)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+        values = result['maps'][name]
+        # Escala logarítmica: la ocupación suele concentrarse en pocas celdas
+        scaled = np.log1p(values)
+        peak = scaled.max()
+        normalized = (scaled / peak * 255).astype(np.uint8) if peak > 0 else np.zeros_like(values, dtype=np.uint8)
+        image = cv2.applyColorMap(normalized, cv2.COLORMAP_INFERNO)
+        factor = max(int(np.ceil(self.PNG_MIN_WIDTH / image.shape[1])), 1)
+        image = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_NEAREST)
+        ok, encoded = cv2.imencode('.png', image)
+        if not ok:
+            raise ValueError("No se pudo codificar el heatmap como PNG")
+
+        data = encoded.tobytes()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return data
+
+    def _prune_stale_signatures(self, current_dir: str):
+        for directory in glob.glob(os.path.join(self.artifacts.workdir, self.HEATMAPS_DIR, '*')):
+            if os.path.abspath(directory) != os.path.abspath(current_dir) and \
+                    not self._is_current(os.path.basename(directory)):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _is_current(self, signature: str) -> bool:
+        current = {self._signature('none')}
+        if os.path.exists(self.artifacts.timecourse):
+            current.add(self._signature('roi'))
+        return signature in current
+
+    def precompute(self, grid: int = DEFAULT_GRID):
+        """Calcula los mapas por defecto para que el dashboard no toque datos por frame"""
+        splits = ['none'] + (['roi', 'episode'] if os.path.exists(self.artifacts.timecourse) else [])
+        for kind in self.KINDS:
+            for split in splits:
+                self.png(kind, grid, split)
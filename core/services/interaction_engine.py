@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+KEYPOINT_NAMES = ["cabeza", "nariz", "oreja_izq", "oreja_der", "cuello", "base_cola"]
+
+# Reglas equivalentes al análisis original: nariz cerca de objetos de clase 0, dentro del resto
+DEFAULT_INTERACTION_RULES = [
+    {"name": "nariz_cerca", "keypoints": ["nariz"], "roi_class_ids": [0]},
+    {"name": "nariz_dentro", "keypoints": ["nariz"], "inside": True, "exclude_roi_class_ids": [0]},
+]
+
+
+class InteractionEngine:
+    """Evalúa todas las reglas de interacción sobre el tensor frames x keypoints x ROIs.
+    
+    Las distancias de todos los keypoints a todas las ROIs se obtienen con un único lookup
+    vectorizado sobre los campos de distancia apilados; añadir keypoints a una regla solo
+    cambia qué columnas del tensor se combinan.
+    
+    Claves de una regla:
+        keypoints: keypoints evaluados (por defecto ["nariz"])
+        max_distance / max_distance_cm: umbral en píxeles o centímetros (por defecto proximity_threshold)
+        inside: exige que el keypoint esté dentro de la ROI en lugar de cerca
+        min_visibility: visibilidad mínima del keypoint (0 = no se filtra)
+        aggregate: "any", "all" o "weighted" (suma de visibilidades >= min_score)
+        facing: {"from": "cuello", "to": "nariz", "max_angle": 45} orientación hacia la ROI
+        roi_class_ids / exclude_roi_class_ids: ROIs a las que aplica la regla
+    """
+
+    def __init__(self, rois: Dict[str, dict], pixels_per_cm: Optional[float] = None,
+                 keypoint_names: Optional[List[str]] = None):
+        self.rois = rois
+        self.roi_names = list(rois)
+        self.pixels_per_cm = pixels_per_cm
+        self.keypoint_names = keypoint_names or KEYPOINT_NAMES
+        self._prepared_for = None
+
+    def prepare(self, df: pd.DataFrame):
+        """Construye coordenadas, visibilidades y el tensor de distancias (una vez por DataFrame)"""
+        if self._prepared_for is df:
+            return
+        n_frames = len(df)
+        n_kpts = len(self.keypoint_names)
+        self.coords = np.full((n_frames, n_kpts, 2), np.nan)
+        self.visibility = np.full((n_frames, n_kpts), np.nan)
+        for k, name in enumerate(self.keypoint_names):
+            for axis, suffix in enumerate(("x", "y")):
+                if f"{name}_{suffix}" in df.columns:
+                    self.coords[:, k, axis] = df[f"{name}_{suffix}"].to_numpy(dtype=float)
+            if f"{name}_v" in df.columns:
+                self.visibility[:, k] = df[f"{name}_v"].to_numpy(dtype=float)
+
+        x = self.coords[..., 0].ravel()
+        y = self.coords[..., 1].ravel()
+        # Tensores (F, K, R) de distancia exterior y con signo
+        self.distances = np.empty((n_frames, n_kpts, len(self.roi_names)), dtype=np.float64)
+        self.signed = np.empty_like(self.distances)
+        for r, roi_name in enumerate(self.roi_names):
+            field = self.rois[roi_name]["field"]
+            self.distances[..., r] = field.lookup(x, y).reshape(n_frames, n_kpts)
+            self.signed[..., r] = field.signed_lookup(x, y).reshape(n_frames, n_kpts)
+        self._prepared_for = df
+
+    def _keypoint_indices(self, names: List[str]) -> List[int]:
+        missing = [name for name in names if name not in self.keypoint_names]
+        if missing:
+            raise ValueError(f"Keypoints desconocidos en la regla: {missing}")
+        return [self.keypoint_names.index(name) for name in names]
+
+    def _rule_threshold(self, rule: Dict, proximity_threshold: float) -> float:
+        if rule.get("max_distance_cm") is not None:
+            if not self.pixels_per_cm:
+                raise ValueError("max_distance_cm requiere pixels_per_cm")
+            return float(rule["max_distance_cm"]) * self.pixels_per_cm
+        if rule.get("max_distance") is not None:
+            return float(rule["max_distance"])
+        return float(proximity_threshold)
+
+    def _applies_to(self, rule: Dict, roi_name: str) -> bool:
+        roi_class = self.rois[roi_name]["class_id"]
+        included = rule.get("roi_class_ids")
+        excluded = rule.get("exclude_roi_class_ids") or []
+        return (included is None or roi_class in included) and roi_class not in excluded
+
+    def _keypoint_hits(self, rule: Dict, r: int, kpt_idx: List[int], threshold: float) -> np.ndarray:
+        """Aciertos (F, k) de los keypoints de la regla sobre la ROI r"""
+        field = self.rois[self.roi_names[r]]["field"]
+        x = self.coords[:, kpt_idx, 0].ravel()
+        y = self.coords[:, kpt_idx, 1].ravel()
+        shape = (len(self.coords), len(kpt_idx))
+        if rule.get("inside"):
+            return field.contains(x, y, signed=self.signed[:, kpt_idx, r].ravel()).reshape(shape)
+        return field.within(x, y, threshold, distances=self.distances[:, kpt_idx, r].ravel()).reshape(shape)
+
+    def _aggregate(self, rule: Dict, hits: np.ndarray, kpt_idx: List[int]) -> np.ndarray:
+        min_visibility = float(rule.get("min_visibility", 0.0))
+        visibility = self.visibility[:, kpt_idx]
+        if min_visibility > 0:
+            hits = hits & (visibility >= min_visibility)
+
+        aggregate = rule.get("aggregate", "any")
+        if aggregate == "any":
+            return hits.any(axis=1)
+        if aggregate == "all":
+            return hits.all(axis=1)
+        if aggregate == "weighted":
+            weights = np.nan_to_num(visibility, nan=0.0)
+            total = weights.sum(axis=1)
+            score = np.divide((weights * hits).sum(axis=1), total, out=np.zeros(len(total)), where=total > 0)
+            return score >= float(rule.get("min_score", 0.5))
+        raise ValueError(f"Agregación desconocida: {aggregate}")
+
+    def _facing_mask(self, facing: Dict) -> np.ndarray:
+        """(F, R): el vector from->to apunta hacia el centroide de cada ROI"""
+        origin_idx, tip_idx = self._keypoint_indices([facing.get("from", "cuello"), facing.get("to", "nariz")])
+        origin = self.coords[:, origin_idx, :]
+        tip = self.coords[:, tip_idx, :]
+        heading = tip - origin
+        centroids = np.array([self.rois[name]["field"].centroid for name in self.roi_names])
+        to_roi = centroids[None, :, :] - tip[:, None, :]
+
+        dot = np.einsum('fd,frd->fr', heading, to_roi)
+        norms = np.linalg.norm(heading, axis=1)[:, None] * np.linalg.norm(to_roi, axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cos_angle = dot / norms
+        max_cos = np.cos(np.deg2rad(float(facing.get("max_angle", 45))))
+        # Con la punta sobre el centroide se considera orientado
+        return (cos_angle >= max_cos) | (np.linalg.norm(to_roi, axis=2) < 1e-6)
+
+    def evaluate(self, df: pd.DataFrame, rules: Optional[List[Dict]] = None,
+                 proximity_threshold: float = 40) -> Dict[str, np.ndarray]:
+        """Máscara booleana de interacción por ROI (una regla satisfecha basta)"""
+        self.prepare(df)
+        rules = rules or DEFAULT_INTERACTION_RULES
+        n_frames = len(df)
+        result = np.zeros((n_frames, len(self.roi_names)), dtype=bool)
+
+        for rule in rules:
+            kpt_idx = self._keypoint_indices(rule.get("keypoints", ["nariz"]))
+            threshold = self._rule_threshold(rule, proximity_threshold)
+            facing = self._facing_mask(rule["facing"]) if rule.get("facing") else None
+            for r, roi_name in enumerate(self.roi_names):
+                if not self._applies_to(rule, roi_name):
+                    continue
+                hits = self._aggregate(rule, self._keypoint_hits(rule, r, kpt_idx, threshold), kpt_idx)
+                if facing is not None:
+                    hits &= facing[:, r]
+                result[:, r] |= hits
+
+        return {roi_name: result[:, r] for r, roi_name in enumerate(self.roi_names)}
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+
+class KinematicsAnalyzer:
+    """Métricas de locomoción a partir de los keypoints cuello, base_cola y nariz.
+
+    La posición del animal es el punto medio entre cuello y base_cola; la orientación es el
+    vector cuello -> nariz y la longitud corporal la distancia nariz -> base_cola. Las
+    unidades son centímetros si se indica pixels_per_cm y píxeles en caso contrario.
+    """
+    SPEED_BINS = 40
+    # Velocidad por debajo de la cual el animal se considera inmóvil (cm/s o px/s)
+    DEFAULT_IMMOBILITY_SPEED = {'cm': 1.0, 'px': 5.0}
+    # Velocidad por encima de la cual un desplazamiento se trata como salto de detección. Una rata
+    # no supera ~2 m/s en campo abierto; en píxeles se asume una arena de ~15 px/cm
+    DEFAULT_MAX_SPEED = {'cm': 250.0, 'px': 4000.0}
+
+    def __init__(self, df: pd.DataFrame, fps: float, pixels_per_cm: Optional[float] = None,
+                 immobility_speed: Optional[float] = None, min_immobility_seconds: float = 1.0,
+                 max_speed: Optional[float] = None, chunk_size: int = 250_000):
+        self.df = df
+        self.fps = float(fps)
+        self.pixels_per_cm = pixels_per_cm
+        self.units = 'cm' if pixels_per_cm else 'px'
+        self.scale = 1.0 / pixels_per_cm if pixels_per_cm else 1.0
+        self.immobility_speed = immobility_speed if immobility_speed is not None \
+            else self.DEFAULT_IMMOBILITY_SPEED[self.units]
+        self.min_immobility_seconds = min_immobility_seconds
+        self.max_speed = max_speed if max_speed is not None else self.DEFAULT_MAX_SPEED[self.units]
+        self.chunk_size = chunk_size
+
+    def _columns(self) -> Dict[str, np.ndarray]:
+        names = [f"{kp}_{axis}" for kp in ("cuello", "base_cola", "nariz") for axis in ("x", "y")]
+        return {
+            name: self.df[name].to_numpy(dtype=float) if name in self.df.columns else np.full(len(self.df), np.nan)
+            for name in names
+        }
+
+    def per_frame(self) -> Dict[str, np.ndarray]:
+        """Series por frame (velocidad, orientación, longitud corporal), calculadas por bloques"""
+        n = len(self.df)
+        frames = self.df['frame'].to_numpy(dtype=float)
+        speed = np.full(n, np.nan)
+        step = np.full(n, np.nan)
+        heading = np.full(n, np.nan)
+        body_length = np.full(n, np.nan)
+
+        columns = self._columns()
+        prev_position = np.array([np.nan, np.nan])
+        prev_frame = np.nan
+        for start in range(0, n, self.chunk_size):
+            end = min(start + self.chunk_size, n)
+            neck, tail, nose = (
+                np.stack([columns[f"{kp}_x"][start:end], columns[f"{kp}_y"][start:end]], axis=1)
+                for kp in ("cuello", "base_cola", "nariz")
+            )
+            chunk_frames = frames[start:end]
+
+            position = (neck + tail) / 2.0
+            # El último punto del bloque anterior enlaza el desplazamiento entre bloques
+            positions = np.vstack([prev_position[None, :], position])
+            frame_gaps = np.diff(np.concatenate([[prev_frame], chunk_frames]))
+            displacement = np.linalg.norm(np.diff(positions, axis=0), axis=1) * self.scale
+
+            step[start:end] = displacement
+            with np.errstate(invalid='ignore', divide='ignore'):
+                speed[start:end] = displacement / (frame_gaps / self.fps)
+
+            orientation = nose - neck
+            heading[start:end] = np.degrees(np.arctan2(orientation[:, 1], orientation[:, 0]))
+            body_length[start:end] = np.linalg.norm(nose - tail, axis=1) * self.scale
+
+            prev_position = position[-1]
+            prev_frame = chunk_frames[-1] if len(chunk_frames) else prev_frame
+
+        # Saltos imposibles (errores de detección) no suman distancia
+        outliers = speed > self.max_speed
+        speed[outliers] = np.nan
+        step[outliers] = np.nan
+
+        return {'frame': frames, 'speed': speed, 'step': step, 'heading': heading, 'body_length': body_length}
+
+    def _immobility_bouts(self, frames: np.ndarray, speed: np.ndarray) -> Dict:
+        immobile = np.nan_to_num(speed, nan=np.inf) < self.immobility_speed
+        edges = np.diff(np.concatenate([[0], immobile.astype(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        if len(starts):
+            durations = (frames[ends] - frames[starts] + 1) / self.fps
+        else:
+            durations = np.array([])
+        bouts = durations[durations >= self.min_immobility_seconds]
+        session = (frames[-1] - frames[0] + 1) / self.fps if len(frames) else 0.0
+        return {
+            'bouts': int(len(bouts)),
+            'total_seconds': round(float(bouts.sum()), 3),
+            'mean_bout_seconds': round(float(bouts.mean()), 3) if len(bouts) else 0.0,
+            'fraction': round(float(bouts.sum() / session), 4) if session > 0 else 0.0
+        }
+
+    @staticmethod
+    def _stat(values: np.ndarray, func) -> Optional[float]:
+        return round(float(func(values)), 4) if len(values) else None
+
+    def summarize(self) -> Dict:
+        """Resumen por experimento listo para serializar a JSON"""
+        series = self.per_frame()
+        frames = series['frame']
+        speed = series['speed'][np.isfinite(series['speed'])]
+        body_length = series['body_length'][np.isfinite(series['body_length'])]
+        heading = np.radians(series['heading'][np.isfinite(series['heading'])])
+
+        # Diferencia angular envuelta a [-180, 180) para no contar el salto de -180 a 180
+        turning = (np.diff(np.radians(series['heading'])) + np.pi) % (2 * np.pi) - np.pi
+        frame_gaps = np.diff(frames)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            turning_rate = np.abs(np.degrees(turning)) / (frame_gaps / self.fps)
+        turning_rate = turning_rate[np.isfinite(turning_rate)]
+
+        upper = float(np.percentile(speed, 99)) if len(speed) else 1.0
+        counts, edges = np.histogram(speed, bins=self.SPEED_BINS, range=(0.0, max(upper, 1e-6)))
+
+        return {
+            'units': self.units,
+            'fps': self.fps,
+            'frames': int(len(frames)),
+            'valid_frames': int(len(speed)),
+            'duration_seconds': round(float((frames[-1] - frames[0] + 1) / self.fps), 3) if len(frames) else 0.0,
+            'distance_travelled': round(float(np.nansum(series['step'])), 3),
+            'mean_speed': self._stat(speed, np.mean),
+            'median_speed': self._stat(speed, np.median),
+            'p95_speed': self._stat(speed, lambda v: np.percentile(v, 95)),
+            'max_speed': self._stat(speed, np.max),
+            'speed_histogram': {
+                'edges': np.round(edges, 4).tolist(),
+                'counts': counts.tolist()
+            },
+            'mean_heading_deg': round(float(np.degrees(np.arctan2(np.sin(heading).mean(), np.cos(heading).mean()))), 2)
+            if len(heading) else None,
+            'heading_concentration': round(float(np.hypot(np.sin(heading).mean(), np.cos(heading).mean())), 4)
+            if len(heading) else None,
+            'mean_turning_rate_deg_s': self._stat(turning_rate, np.mean),
+            'body_length_mean': self._stat(body_length, np.mean),
+            'body_length_median': self._stat(body_length, np.median),
+            'immobility': self._immobility_bouts(frames, series['speed'])
+        }
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import platform
+import resource
+import subprocess
+import multiprocessing
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+from core.services.synthetic_video import (
+    SyntheticArenaVideo,
+    StubPoseModel,
+    StubSegmenterModel,
+    build_random_yolo
+)
+from infrastructure.metrics import PIPELINE_STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+class PipelineBenchmark:
+    """Rendimiento de VideoProcessingPipeline de extremo a extremo sobre videos sintéticos.
+
+    Cada configuración (duración, resolución, FPS) se ejecuta en un proceso hijo: el pico de
+    memoria (ru_maxrss) es el de esa configuración y no arrastra el de las anteriores. Los
+    tiempos por etapa son los que el propio pipeline registra en PIPELINE_STAGE_DURATION.
+
+    Modelos:
+        stub: sustitutos con la salida de ultralytics a partir de la verdad de terreno; miden
+              decodificación, análisis, clips y heatmaps con detecciones realistas.
+        yolo: YOLOv8n con pesos aleatorios; mide la inferencia real en CPU, pero sin
+              detecciones útiles el análisis posterior queda casi vacío.
+    """
+    STAGES = ('rois', 'keypoints', 'analysis', 'kinematics', 'clips', 'heatmaps')
+    MODELS = ('stub', 'yolo')
+
+    def __init__(self, workdir: str, model: str = 'stub', export_clips: bool = True,
+                 analyzer_params: Optional[Dict] = None, seed: int = 0):
+        from core.services.video_processing import VideoProcessingService
+
+        if model not in self.MODELS:
+            raise ValueError(f"Modelo desconocido: {model}")
+        self.workdir = workdir
+        self.model = model
+        self.export_clips = export_clips
+        self.analyzer_params = {**VideoProcessingService.DEFAULT_ANALYZER_PARAMS, **(analyzer_params or {})}
+        self.clip_params = VideoProcessingService.DEFAULT_CLIP_PARAMS
+        self.seed = seed
+
+    @staticmethod
+    def environment() -> Dict:
+        """Datos para comparar resultados entre commits y máquinas"""
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                cwd=os.path.dirname(os.path.abspath(__file__))
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        import torch
+        return {
+            'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'opencv': cv2.__version__,
+            'torch': torch.__version__,
+            'torch_threads': torch.get_num_threads(),
+        }
+
+    def run(self, configurations: List[Dict]) -> Dict:
+        results = []
+        for configuration in configurations:
+            logger.info(f"Benchmark del pipeline: {configuration}")
+            results.append(self._run_isolated(configuration))
+        return {'model': self.model, 'environment': self.environment(), 'results': results}
+
+    def _run_isolated(self, configuration: Dict) -> Dict:
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            # Sin fork (Windows) se mide en el propio proceso; el pico de memoria es acumulado
+            return self.run_configuration(**configuration)
+
+        queue = context.Queue()
+        process = context.Process(target=self._child, args=(queue, configuration))
+        process.start()
+        result = queue.get()
+        process.join()
+        if 'error' in result:
+            raise RuntimeError(f"Configuración {configuration}: {result['error']}")
+        return result
+
+    def _child(self, queue, configuration: Dict):
+        try:
+            queue.put(self.run_configuration(**configuration))
+        except Exception as e:
+            logger.exception("Error en el benchmark del pipeline")
+            queue.put({'error': f"{type(e).__name__}: {e}"})
+
+    @staticmethod
+    def _stage_totals() -> Dict[str, float]:
+        totals = {}
+        for metric in PIPELINE_STAGE_DURATION.collect():
+            for sample in metric.samples:
+                if sample.name.endswith('_sum'):
+                    totals[sample.labels['stage']] = sample.value
+        return totals
+
+    @staticmethod
+    def _peak_rss_mb() -> float:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss está en KiB en Linux y en bytes en macOS
+        return round(peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024, 1)
+
+    def _models(self, video: SyntheticArenaVideo, directory: str):
+        if self.model == 'stub':
+            return StubPoseModel(video, seed=self.seed), StubSegmenterModel(video)
+        pose = build_random_yolo(
+            'pose', os.path.join(directory, 'pose.pt'),
+            nc=len(video.BEHAVIOR_CLASSES), kpt_shape=[len(video.KEYPOINT_OFFSETS), 3]
+        )
+        segmenter = build_random_yolo('detect', os.path.join(directory, 'segmenter.pt'), nc=len(video.OBJECT_CLASSES))
+        return pose, segmenter
+
+    def run_configuration(self, seconds: float, width: int, height: int, fps: float = 30.0) -> Dict:
+        from core.services.pipeline_total_v2 import detect_rois
+        from core.services.video_behavior_pipeline import VideoProcessingPipeline
+
+        name = f"{int(seconds)}s_{width}x{height}_{int(fps)}fps"
+        directory = os.path.join(self.workdir, name)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+        render_start = time.perf_counter()
+        video = SyntheticArenaVideo(width=width, height=height, fps=fps, seconds=seconds, seed=self.seed)
+        video_path = video.render(os.path.join(directory, 'video.mp4'))
+        render_seconds = time.perf_counter() - render_start
+        pose_model, segmenter_model = self._models(video, directory)
+
+        pipeline = VideoProcessingPipeline(
+            model_path=pose_model,
+            workdir=os.path.join(directory, 'processing'),
+            segmenter_model_path=segmenter_model,
+            analyzer_params=self.analyzer_params,
+            clip_params=self.clip_params,
+            segmenter_params={'frame_index': 20, 'max_objects': 2}
+        )
+        rois, rois_seconds = None, None
+        if self.model == 'yolo':
+            # Con pesos aleatorios no se detectan objetos: la inferencia del detector se mide
+            # aparte y el pipeline recibe las ROIs reales de la arena
+            start = time.perf_counter()
+            detect_rois(video_path, segmenter_model, os.path.join(directory, 'segmenter'))
+            rois_seconds = time.perf_counter() - start
+            rois = video.rois()
+
+        before = self._stage_totals()
+        start = time.perf_counter()
+        result = pipeline.run(video_path=video_path, rois=rois, export_clips=self.export_clips)
+        total_seconds = time.perf_counter() - start + (rois_seconds or 0.0)
+        after = self._stage_totals()
+
+        stages = {stage: round(after.get(stage, 0.0) - before.get(stage, 0.0), 3) for stage in self.STAGES}
+        if rois_seconds is not None:
+            stages['rois'] = round(rois_seconds, 3)
+        return {
+            'name': name,
+            'seconds': seconds,
+            'width': width,
+            'height': height,
+            'fps': fps,
+            'frames': video.frames,
+            'render_seconds': round(render_seconds, 3),
+            'total_seconds': round(total_seconds, 3),
+            'frames_per_second': round(video.frames / total_seconds, 1) if total_seconds else None,
+            'keypoints_frames_per_second': round(video.frames / stages['keypoints'], 1) if stages['keypoints'] else None,
+            'stages': stages,
+            'episodes': len(result['episodes']),
+            'clips': len(result['generated_clips']),
+            'peak_rss_mb': self._peak_rss_mb(),
+        }
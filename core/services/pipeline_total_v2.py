@@ -5,12 +5,14 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from ultralytics import YOLO
-from shapely.geometry import Point, box as BoundingBox
-from typing import Dict, List, Union, Optional
+from typing import Callable, Dict, List, Union, Optional
 import logging
 from collections import defaultdict
-from math import sqrt
+from itertools import product
 from tqdm import tqdm
+from .roi_distance_field import ROIDistanceField
+from .interaction_engine import InteractionEngine, KEYPOINT_NAMES
+from .trajectory_store import TrajectoryStore
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -20,9 +22,19 @@ logger = logging.getLogger(__name__)
 # PRIMERA PARTE: Detección de ROIs (Modelo 1)
 # ==============================================
 
-def detect_rois(video_path: str, model_path: str, output_dir: str, target_frame: int = 20) -> str:
-    """Detecta ROIs en un frame específico del video."""
-    model = YOLO(model_path)
+def _load_model(model_path):
+    """Carga el YOLO de una ruta; un modelo ya construido (p. ej. un sustituto de benchmark) se usa tal cual"""
+    if isinstance(model_path, (str, os.PathLike)):
+        return YOLO(model_path)
+    return model_path
+
+def detect_rois(video_path: str, model_path: str, output_dir: str, target_frame: int = 20,
+                max_objects: int = 2) -> str:
+    """Detecta ROIs en un frame específico del video.
+    
+    Si el modelo es de segmentación se guarda además el contorno ("polygon") de cada objeto.
+    """
+    model = _load_model(model_path)
     Path(output_dir).mkdir(exist_ok=True)
     
     CLASS_NAMES = {
@@ -45,20 +57,24 @@ def detect_rois(video_path: str, model_path: str, output_dir: str, target_frame:
     
     results = model(frame)
     rois_data = {}
+    frame_height, frame_width = frame.shape[:2]
     
-    detections = sorted(results[0].boxes, key=lambda x: float(x.conf), reverse=True)
-    selected_detections = []
+    boxes = results[0].boxes
+    masks = getattr(results[0], 'masks', None)
+    order = sorted(range(len(boxes)), key=lambda idx: float(boxes[idx].conf), reverse=True)
+    selected_indices = []
     class_ids_seen = set()
     
-    for detection in detections:
-        class_id = int(detection.cls)
+    for idx in order:
+        class_id = int(boxes[idx].cls)
         if class_id not in class_ids_seen:
-            selected_detections.append(detection)
+            selected_indices.append(idx)
             class_ids_seen.add(class_id)
-            if len(selected_detections) == 2:
+            if len(selected_indices) == max_objects:
                 break
     
-    for i, detection in enumerate(selected_detections):
+    for i, idx in enumerate(selected_indices):
+        detection = boxes[idx]
         bbox = detection.xyxy[0].tolist()
         class_id = int(detection.cls)
         
@@ -73,8 +89,12 @@ def detect_rois(video_path: str, model_path: str, output_dir: str, target_frame:
                 "y2": bbox[3]
             },
             "box_normalized": normalize_coordinates(bbox, cap.get(3), cap.get(4)),
-            "frame": target_frame
+            "frame": target_frame,
+            "frame_width": frame_width,
+            "frame_height": frame_height
         }
+        if masks is not None and len(masks.xy) > idx and len(masks.xy[idx]) >= 3:
+            rois_data[f"roi_{i}"]["polygon"] = masks.xy[idx].tolist()
     
     output_json = Path(output_dir) / f"rois_frame_{target_frame}.json"
     with open(output_json, 'w') as f:
@@ -91,15 +111,29 @@ def detect_rois(video_path: str, model_path: str, output_dir: str, target_frame:
 # SEGUNDA PARTE: Detección de Keypoints (Modelo 2)
 # ==============================================
 
-def detect_keypoints(video_path: str, model_path: str, output_csv: str = "predicciones_completas.csv") -> str:
-    """Detecta keypoints conservando siempre una detección por frame (la mejor) sin filtrado por confianza."""
-    model = YOLO(model_path)
-    keypoints_names = ["cabeza", "nariz", "oreja_izq", "oreja_der", "cuello", "base_cola"]
+def detect_keypoints(video_path: str, model_path: str, output_csv: str = "predicciones_completas.csv",
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     output_store: Optional[str] = None) -> str:
+    """Detecta keypoints conservando siempre una detección por frame (la mejor) sin filtrado por confianza.
+    
+    progress_callback(frames_procesados, total_frames) se invoca tras cada frame.
+    output_store: si se indica, escribe además las predicciones en formato TrajectoryStore.
+    """
+    model = _load_model(model_path)
+    keypoints_names = KEYPOINT_NAMES
+    
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or None
+    cap.release()
     
     results = model.predict(source=video_path, stream=True, verbose=False)
     all_data = []
     
     for frame_idx, result in enumerate(tqdm(results, desc="Procesando video")):
+        if progress_callback is not None:
+            progress_callback(frame_idx + 1, max(total_frames, frame_idx + 1))
+        
         boxes = result.boxes
         keypoints = result.keypoints
         
@@ -157,6 +191,9 @@ def detect_keypoints(video_path: str, model_path: str, output_csv: str = "predic
     
     df.to_csv(output_csv, index=False)
     logger.info(f"Resultados guardados en: {output_csv}")
+    if output_store:
+        TrajectoryStore.write(df, output_store, keypoint_names=keypoints_names, fps=video_fps)
+        logger.info(f"Trayectoria compacta guardada en: {output_store}")
     logger.info(f"Total frames procesados: {len(df)}")
     logger.info(f"Frames con detecciones: {len(df[df['class_id'].notna()])}")
     return output_csv
@@ -170,18 +207,30 @@ class ROIAnalyzer:
                 min_interaction_frames: int = 4, 
                 max_gap_frames: int = 3,
                 max_class_change_frames: int = 3,
-                proximity_threshold: int = 40):
-        self.df = pd.read_csv(data_path)
+                proximity_threshold: int = 40,
+                interaction_rules: Optional[List[Dict]] = None,
+                pixels_per_cm: Optional[float] = None):
+        """interaction_rules: reglas de InteractionEngine (None reproduce el criterio de la nariz)"""
+        self.df = self._read_predictions(data_path)
         self._process_dataframe()
+        self.video_path = video_path
         self.rois = self._load_rois(json_path)
         self.min_interaction_frames = min_interaction_frames
         self.max_gap_frames = max_gap_frames
         self.max_class_change_frames = max_class_change_frames
         self.proximity_threshold = proximity_threshold
-        self.video_path = video_path
+        self.interaction_rules = interaction_rules
+        self.interaction_engine = InteractionEngine(self.rois, pixels_per_cm=pixels_per_cm)
         self.video_fps = self._get_video_fps()
         logger.info(f"FPS detectado para análisis: {self.video_fps}")
     
+    @staticmethod
+    def _read_predictions(data_path: str) -> pd.DataFrame:
+        """Lee las predicciones del almacén compacto (.trj) o del CSV."""
+        if str(data_path).endswith(TrajectoryStore.EXTENSION):
+            return TrajectoryStore.open(data_path).to_dataframe()
+        return pd.read_csv(data_path)
+    
     def _get_video_fps(self) -> float:
         """Obtiene el FPS real del video con verificación robusta."""
         cap = cv2.VideoCapture(self.video_path)
@@ -205,7 +254,7 @@ class ROIAnalyzer:
     def _process_dataframe(self):
         """Procesamiento del DataFrame sin filtrado por confianza."""
         required_columns = ['frame', 'class_id', 'confidence'] + \
-                        [f"{name}_x" for name in ["cabeza", "nariz", "oreja_izq", "oreja_der", "cuello", "base_cola"]]
+                        [f"{name}_x" for name in KEYPOINT_NAMES]
         
         for col in required_columns:
             if col not in self.df.columns:
@@ -233,112 +282,158 @@ class ROIAnalyzer:
             dup_frames = self.df['frame'][self.df['frame'].duplicated()].unique()
             logger.warning(f"¡Advertencia: Frames duplicados encontrados y procesados: {dup_frames}")
     
+    def _get_frame_size(self, roi_data: dict) -> tuple:
+        """Resolución del video: del JSON de ROIs si existe, si no de los metadatos del video."""
+        if roi_data.get("frame_width") and roi_data.get("frame_height"):
+            return int(roi_data["frame_width"]), int(roi_data["frame_height"])
+        cap = cv2.VideoCapture(self.video_path)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        if width <= 0 or height <= 0:
+            raise ValueError(f"No se pudo obtener la resolución del video: {self.video_path}")
+        return width, height
+    
     def _load_rois(self, json_path: str) -> Dict[str, dict]:
+        """Carga las ROIs (caja, polígono o máscara) y rasteriza su campo de distancias."""
         rois = {}
+        frame_size = None
         with open(json_path) as f:
             data = json.load(f)
-            for roi_key, roi_data in data.items():
-                box_data = roi_data["box"]
-                rois[roi_data["name"]] = {
-                    "bbox": BoundingBox(float(box_data["x1"]), float(box_data["y1"]), 
-                                      float(box_data["x2"]), float(box_data["y2"])),
-                    "class_id": roi_data["class_id"]
-                }
-        return rois
-    
-    def _is_point_in_roi(self, x: float, y: float, roi: BoundingBox) -> bool:
-        if pd.isna(x) or pd.isna(y):
-            return False
-        return roi.contains(Point(x, y))
-    
-    def _is_point_near_roi(self, x: float, y: float, roi: BoundingBox) -> bool:
-        if pd.isna(x) or pd.isna(y):
-            return False
+        
+        for roi_key, roi_data in data.items():
+            if frame_size is None:
+                frame_size = self._get_frame_size(roi_data)
+            width, height = frame_size
             
-        point = Point(x, y)
-        if roi.contains(point):
-            return True
+            if roi_data.get("polygon"):
+                field = ROIDistanceField.from_polygon(roi_data["polygon"], width, height)
+            elif roi_data.get("mask_path"):
+                mask_path = Path(json_path).parent / roi_data["mask_path"]
+                mask = cv2.imread(str(mask_path), cv2.IMREAD_GRAYSCALE)
+                if mask is None:
+                    raise ValueError(f"No se pudo leer la máscara de ROI: {mask_path}")
+                field = ROIDistanceField.from_mask(mask, width, height)
+            else:
+                box_data = roi_data["box"]
+                field = ROIDistanceField.from_box(
+                    float(box_data["x1"]), float(box_data["y1"]),
+                    float(box_data["x2"]), float(box_data["y2"]),
+                    width, height
+                )
             
-        min_x, min_y, max_x, max_y = roi.bounds
-        closest_x = max(min_x, min(x, max_x))
-        closest_y = max(min_y, min(y, max_y))
-        distance = sqrt((x - closest_x)**2 + (y - closest_y)**2)
-        
-        return distance <= self.proximity_threshold
+            rois[roi_data["name"]] = {
+                "geometry": field.geometry,
+                "field": field,
+                "class_id": roi_data["class_id"]
+            }
+        return rois
     
-    def _detect_interactions(self) -> pd.DataFrame:
+    def _detect_interactions(self, proximity_threshold: Optional[float] = None) -> pd.DataFrame:
         df = self.df.copy()
+        threshold = self.proximity_threshold if proximity_threshold is None else proximity_threshold
         
-        for roi_name, roi_info in self.rois.items():
-            roi_bbox = roi_info["bbox"]
-            roi_class = roi_info["class_id"]
-            x_col, y_col = 'nariz_x', 'nariz_y'
-            
-            if x_col in df.columns and y_col in df.columns:
-                if roi_class == 0:
-                    df[f'interaction_{roi_name}'] = df.apply(
-                        lambda r: self._is_point_near_roi(r[x_col], r[y_col], roi_bbox), 
-                        axis=1
-                    )
-                else:
-                    df[f'interaction_{roi_name}'] = df.apply(
-                        lambda r: self._is_point_in_roi(r[x_col], r[y_col], roi_bbox), 
-                        axis=1
-                    )
-            else:
-                df[f'interaction_{roi_name}'] = False
+        # El tensor frames x keypoints x ROIs se calcula una vez y se reutiliza entre umbrales
+        masks = self.interaction_engine.evaluate(self.df, self.interaction_rules, proximity_threshold=threshold)
+        for roi_name, interacting in masks.items():
+            df[f'interaction_{roi_name}'] = interacting
         
         return df
     
+    @staticmethod
+    def _interaction_streaks(interacting: np.ndarray) -> np.ndarray:
+        """Número de frames consecutivos con interacción que terminan en cada frame."""
+        idx = np.arange(len(interacting))
+        last_idle = np.maximum.accumulate(np.where(interacting, -1, idx))
+        return idx - last_idle
+    
+    @staticmethod
+    def _window_mode(values: np.ndarray):
+        """Moda ignorando NaN; en empate gana el menor valor (igual que Series.mode()[0])."""
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return np.float64(np.nan)
+        uniques, counts = np.unique(values, return_counts=True)
+        return uniques[np.argmax(counts)]
+    
     def _find_episodes(self, frame_series: pd.Series, interaction_series: pd.Series, 
-                      class_series: pd.Series) -> List[Dict]:
+                      class_series: pd.Series, min_interaction_frames: Optional[int] = None,
+                      max_gap_frames: Optional[int] = None,
+                      max_class_change_frames: Optional[int] = None) -> List[Dict]:
+        interacting = interaction_series.to_numpy(dtype=bool)
+        return self._scan_episodes(
+            frames=frame_series.to_numpy(),
+            interacting=interacting,
+            classes=class_series.to_numpy(dtype=float),
+            streaks=self._interaction_streaks(interacting),
+            min_interaction_frames=self.min_interaction_frames if min_interaction_frames is None else min_interaction_frames,
+            max_gap_frames=self.max_gap_frames if max_gap_frames is None else max_gap_frames,
+            max_class_change_frames=self.max_class_change_frames if max_class_change_frames is None else max_class_change_frames
+        )
+    
+    def _scan_episodes(self, frames: np.ndarray, interacting: np.ndarray, classes: np.ndarray,
+                       streaks: np.ndarray, min_interaction_frames: int, max_gap_frames: int,
+                       max_class_change_frames: int) -> List[Dict]:
+        """Máquina de estados de episodios sobre arrays.
+        
+        Mientras no hay episodio abierto se salta directamente al siguiente frame en el que
+        se completan `min_interaction_frames` interacciones consecutivas; solo los frames con
+        un episodio abierto se recorren uno a uno.
+        """
         episodes = []
-        current_episode = None
-        consecutive_interaction = 0
-        remaining_gap_tolerance = self.max_gap_frames
-        current_class = None
+        n = len(frames)
+        if n == 0:
+            return episodes
+        
+        min_frames = max(int(min_interaction_frames), 1)
+        openings = np.flatnonzero(streaks >= min_frames)
+        interacting_list = interacting.tolist()
+        classes_list = classes.tolist()
+        
+        remaining_gap_tolerance = max_gap_frames
         class_change_counter = 0
+        i = 0
         
-        for i, (frame, is_interacting, class_id) in enumerate(zip(
-            frame_series, interaction_series, class_series
-        )):
-            if current_episode is not None:
-                if class_id == current_class:
+        while i < n:
+            # Sin episodio abierto: siguiente ventana completa de interacción desde i
+            pos = np.searchsorted(openings, i + min_frames - 1)
+            if pos == len(openings):
+                break
+            open_idx = int(openings[pos])
+            start_idx = open_idx - min_frames + 1
+            current_class = self._window_mode(classes[start_idx:open_idx + 1])
+            episode = {
+                'start_frame': frames[start_idx],
+                'class_id': current_class,
+            }
+            
+            i = open_idx + 1
+            closed = False
+            while i < n:
+                if classes_list[i] == current_class:
                     class_change_counter = 0
                 else:
                     class_change_counter += 1
-                    if class_change_counter > self.max_class_change_frames:
-                        self._finalize_episode(episodes, current_episode, frame_series.iloc[i-1])
-                        current_episode = None
-                        consecutive_interaction = 0
-                        remaining_gap_tolerance = self.max_gap_frames
-                        current_class = None
-                        continue
+                    if class_change_counter > max_class_change_frames:
+                        self._finalize_episode(episodes, episode, frames[i - 1])
+                        remaining_gap_tolerance = max_gap_frames
+                        i += 1
+                        closed = True
+                        break
                 
-                if is_interacting:
-                    remaining_gap_tolerance = self.max_gap_frames
+                if interacting_list[i]:
+                    remaining_gap_tolerance = max_gap_frames
+                elif remaining_gap_tolerance > 0:
+                    remaining_gap_tolerance -= 1
                 else:
-                    if remaining_gap_tolerance > 0:
-                        remaining_gap_tolerance -= 1
-                    else:
-                        self._finalize_episode(episodes, current_episode, frame_series.iloc[i-1])
-                        current_episode = None
+                    self._finalize_episode(episodes, episode, frames[i - 1])
+                    i += 1
+                    closed = True
+                    break
+                i += 1
             
-            if current_episode is None:
-                if is_interacting:
-                    consecutive_interaction += 1
-                    if consecutive_interaction >= self.min_interaction_frames:
-                        current_episode = {
-                            'start_frame': frame_series.iloc[i - consecutive_interaction + 1],
-                            'class_id': class_series.iloc[i - consecutive_interaction + 1:i+1].mode()[0],
-                        }
-                        current_class = current_episode['class_id']
-                        consecutive_interaction = 0
-                else:
-                    consecutive_interaction = 0
-        
-        if current_episode is not None:
-            self._finalize_episode(episodes, current_episode, frame_series.iloc[-1])
+            if not closed:
+                self._finalize_episode(episodes, episode, frames[-1])
+                break
         
         return [ep for ep in episodes if ep['duration'] > 0]
     
@@ -349,6 +444,8 @@ class ROIAnalyzer:
     
     def analyze(self) -> Dict[str, pd.DataFrame]:
         df = self._detect_interactions()
+        # Se conserva para artefactos derivados por frame (timecourse)
+        self.interactions = df
         episodes = []
         
         for roi_name in self.rois:
@@ -370,6 +467,63 @@ class ROIAnalyzer:
             'aggregated': aggregated_metrics
         }
     
+    def sweep(self, param_grid: Dict[str, List]) -> pd.DataFrame:
+        """Evalúa una rejilla de parámetros y devuelve las métricas agregadas por combinación.
+        
+        Las máscaras de interacción se calculan una sola vez por `proximity_threshold` y se
+        reutilizan para todas las combinaciones de duración, gap y cambio de clase.
+        """
+        grid = {
+            'min_interaction_frames': [self.min_interaction_frames],
+            'max_gap_frames': [self.max_gap_frames],
+            'max_class_change_frames': [self.max_class_change_frames],
+            'proximity_threshold': [self.proximity_threshold],
+            **{k: list(v) for k, v in param_grid.items()}
+        }
+        
+        frames = self.df['frame'].to_numpy()
+        classes = self.df['class_id'].to_numpy(dtype=float)
+        rows = []
+        
+        for proximity in grid['proximity_threshold']:
+            df = self._detect_interactions(proximity_threshold=proximity)
+            masks = {}
+            for roi_name in self.rois:
+                interacting = df[f'interaction_{roi_name}'].to_numpy(dtype=bool)
+                masks[roi_name] = (interacting, self._interaction_streaks(interacting))
+            
+            for min_frames, max_gap, max_class_change in product(
+                grid['min_interaction_frames'],
+                grid['max_gap_frames'],
+                grid['max_class_change_frames']
+            ):
+                episodes = []
+                for roi_name, (interacting, streaks) in masks.items():
+                    roi_episodes = self._scan_episodes(
+                        frames, interacting, classes, streaks,
+                        min_interaction_frames=min_frames,
+                        max_gap_frames=max_gap,
+                        max_class_change_frames=max_class_change
+                    )
+                    for ep in roi_episodes:
+                        ep['object_roi'] = roi_name
+                    episodes.extend(roi_episodes)
+                
+                params = {
+                    'min_interaction_frames': min_frames,
+                    'max_gap_frames': max_gap,
+                    'max_class_change_frames': max_class_change,
+                    'proximity_threshold': proximity,
+                    'episodes_all_classes': len(episodes)
+                }
+                aggregated = self._calculate_aggregated_metrics(episodes)
+                if aggregated.empty:
+                    rows.append(params)
+                for record in aggregated.to_dict('records'):
+                    rows.append({**params, **record})
+        
+        return pd.DataFrame(rows)
+    
     def _calculate_aggregated_metrics(self, episodes: List[Dict]) -> pd.DataFrame:
         metrics = defaultdict(lambda: {
             'total_episodes': 0,
@@ -392,7 +546,7 @@ class ROIAnalyzer:
                 **v
             }
             for k, v in metrics.items()
-        ])
+        ], columns=['class_id', 'object_roi', 'total_episodes', 'sum_frames', 'total_time_seconds'])
         
         return agg_df.sort_values(['class_id', 'object_roi'])
     
@@ -410,9 +564,16 @@ class ROIAnalyzer:
 # ==============================================
 
 class VideoClipExtractor:
+    POSTER_SUFFIX = "_poster.jpg"
+    SPRITE_SUFFIX = "_sprite.jpg"
+    
     def __init__(self, video_path: str, episodes_data: List[Dict], 
                  output_dir: str, margin_frames: int = 5,
-                 fps: Optional[float] = None):
+                 fps: Optional[float] = None,
+                 thumbnails: bool = True,
+                 sprite_frames: int = 10,
+                 sprite_width: int = 160,
+                 poster_width: int = 480):
         """Inicializa el extractor de clips.
         
         Args:
@@ -421,11 +582,21 @@ class VideoClipExtractor:
             output_dir: Carpeta de salida para los clips
             margin_frames: Frames de margen a añadir
             fps: FPS del video (None para auto-detectar)
+            thumbnails: Generar póster y sprite sheet con los frames ya decodificados
+            sprite_frames: Número de frames en la tira del sprite sheet
+            sprite_width: Ancho de cada frame del sprite sheet
+            poster_width: Ancho del póster JPEG
         """
         self.video_path = video_path
         self.output_dir = output_dir
         self.margin_frames = margin_frames
         self.fps = fps 
+        self.thumbnails = thumbnails
+        self.sprite_frames = sprite_frames
+        self.sprite_width = sprite_width
+        self.poster_width = poster_width
+        # Miniaturas generadas por clip: {ruta_clip: {'poster', 'sprite', 'sprite_frames'}}
+        self.thumbnails_by_clip = {}
         
         if isinstance(episodes_data, pd.DataFrame):
             self.episodes = episodes_data.to_dict('records')
@@ -466,6 +637,29 @@ class VideoClipExtractor:
         object_roi = episode.get('object_roi', 'unknown')
         return f"clip_{episode_id}_class_{class_id}_roi_{object_roi}.mp4"
     
+    @classmethod
+    def poster_path(cls, clip_path: str) -> str:
+        return os.path.splitext(clip_path)[0] + cls.POSTER_SUFFIX
+    
+    @classmethod
+    def sprite_path(cls, clip_path: str) -> str:
+        return os.path.splitext(clip_path)[0] + cls.SPRITE_SUFFIX
+    
+    @staticmethod
+    def _resize_to_width(frame: np.ndarray, width: int) -> np.ndarray:
+        height = max(int(round(frame.shape[0] * width / frame.shape[1])), 1)
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    
+    def _write_thumbnails(self, output_path: str, poster: Optional[np.ndarray], sprite: List[np.ndarray]):
+        """Escribe el póster y el sprite sheet (tira horizontal) junto al clip."""
+        info = {'poster': None, 'sprite': None, 'sprite_frames': 0}
+        if poster is not None and cv2.imwrite(self.poster_path(output_path), poster, [cv2.IMWRITE_JPEG_QUALITY, 80]):
+            info['poster'] = self.poster_path(output_path)
+        if sprite and cv2.imwrite(self.sprite_path(output_path), np.hstack(sprite), [cv2.IMWRITE_JPEG_QUALITY, 70]):
+            info['sprite'] = self.sprite_path(output_path)
+            info['sprite_frames'] = len(sprite)
+        self.thumbnails_by_clip[output_path] = info
+    
     def _get_adjusted_frames(self, start_frame: int, end_frame: int) -> tuple[int, int]:
         new_start = max(0, start_frame - self.margin_frames)
         new_end = min(self.total_frames - 1, end_frame + self.margin_frames)
@@ -488,6 +682,12 @@ class VideoClipExtractor:
 
         self.cap.set(cv2.CAP_PROP_POS_FRAMES, adjusted_start)
         
+        # Póster y sprite salen de los mismos frames que se escriben en el clip (sin decodificar de nuevo)
+        poster_frame = (start_frame + end_frame) // 2
+        sprite_targets = set(np.linspace(adjusted_start, adjusted_end, self.sprite_frames).round().astype(int).tolist()) \
+            if self.thumbnails and self.sprite_frames > 0 else set()
+        poster, sprite = None, []
+        
         frames_written = 0
         for frame_num in range(adjusted_start, adjusted_end + 1):
             ret, frame = self.cap.read()
@@ -496,12 +696,20 @@ class VideoClipExtractor:
                 break
             out.write(frame)
             frames_written += 1
+            if self.thumbnails:
+                if frame_num == poster_frame or poster is None and frame_num == adjusted_start:
+                    poster = self._resize_to_width(frame, self.poster_width)
+                if frame_num in sprite_targets:
+                    sprite.append(self._resize_to_width(frame, self.sprite_width))
         
         out.release()
+        if self.thumbnails:
+            self._write_thumbnails(output_path, poster, sprite)
         logger.debug(f"Clip {episode_id}: Esperados {adjusted_end-adjusted_start+1} frames, escritos {frames_written}")
         return output_path
     
-    def extract_all_clips(self, show_progress: bool = True) -> List[str]:
+    def extract_all_clips(self, show_progress: bool = True,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> List[str]:
         generated_clips = []
         
         iterator = enumerate(self.episodes)
@@ -514,6 +722,8 @@ class VideoClipExtractor:
                 generated_clips.append(clip_path)
             except Exception as e:
                 logger.error(f"Error procesando episodio {idx}: {str(e)}")
+            if progress_callback is not None:
+                progress_callback(idx + 1, len(self.episodes))
         
         return generated_clips
     
@@ -0,0 +1,187 @@
+import os
+import shutil
+import logging
+import tempfile
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+from django.apps import apps
+from django.db import transaction
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.experiment_status import ExperimentStatusService
+from core.services.experiment_cache import ExperimentCacheService
+from core.services.exploration_totals import ExplorationTotalsService
+from core.services.kinematics import KinematicsAnalyzer
+from core.services.timecourse import ExplorationTimeCourse
+from core.services.heatmaps import HeatmapService
+from core.services.video_processing import VideoProcessingService
+
+logger = logging.getLogger(__name__)
+
+class ReanalysisService:
+    """Re-ejecuta ROIAnalyzer sobre las predicciones guardadas sin repetir la inferencia"""
+    ANALYZER_PARAM_NAMES = tuple(VideoProcessingService.DEFAULT_ANALYZER_PARAMS) + ('interaction_rules', 'pixels_per_cm')
+
+    def __init__(self, video_processing: VideoProcessingService):
+        self.video_processing = video_processing
+
+    def reanalyze(self, experiment_id: int, analyzer_params: Dict,
+                  progress_callback: Optional[Callable[[str, Optional[int], Optional[int]], None]] = None) -> Dict:
+        """Recalcula los episodios y reemplaza solo los clips cuya ventana cambió"""
+        from core.services.pipeline_total_v2 import ROIAnalyzer, VideoClipExtractor
+
+        Experiment = apps.get_model('core', 'Experiment')
+        experiment = Experiment.objects.get(id=experiment_id)
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+
+        if not artifacts.has_predictions():
+            raise ValueError(f"El experimento {experiment_id} no tiene predicciones guardadas")
+
+        params = {
+            **VideoProcessingService.DEFAULT_ANALYZER_PARAMS,
+            **(experiment.analysis_params or {}),
+            **{k: v for k, v in analyzer_params.items() if k in self.ANALYZER_PARAM_NAMES}
+        }
+        previous_status = experiment.status
+        experiment.status = 'PRO'
+        experiment.save(update_fields=['status'])
+        ExperimentCacheService.bump(experiment_id)
+        ExperimentStatusService.invalidate(experiment_id)
+
+        def report(stage: str, current: Optional[int] = None, total: Optional[int] = None):
+            if progress_callback is not None:
+                progress_callback(stage, current, total)
+
+        try:
+            report('analysis')
+            analyzer = ROIAnalyzer(
+                data_path=artifacts.predictions_path,
+                json_path=artifacts.rois_json,
+                video_path=artifacts.video_path,
+                **params
+            )
+            episodes = analyzer.analyze()['episodes'].to_dict('records')
+            ExplorationTimeCourse.from_analyzer(analyzer, episodes).save(artifacts.timecourse)
+            if os.path.exists(artifacts.trajectory_store):
+                HeatmapService(artifacts).precompute()
+            fps = self.video_processing._get_video_fps(artifacts.video_path)
+
+            kept_ids, to_delete, to_create = self._diff_clips(experiment_id, episodes, fps)
+
+            # Directorio propio por re-análisis: los nombres de los clips empiezan otra vez en
+            # clip_0_* y no deben pisar archivos de ejecuciones anteriores
+            clips_dir = tempfile.mkdtemp(prefix='reanalysis_', dir=artifacts.ensure_workdir())
+            try:
+                generated_clips, clip_thumbnails = [], []
+                if to_create:
+                    extractor = VideoClipExtractor(
+                        video_path=artifacts.video_path,
+                        episodes_data=to_create,
+                        output_dir=clips_dir,
+                        **VideoProcessingService.DEFAULT_CLIP_PARAMS
+                    )
+                    try:
+                        generated_clips = extractor.extract_all_clips(
+                            show_progress=False,
+                            progress_callback=lambda current, total: report('clips', current, total)
+                        )
+                    finally:
+                        extractor.close()
+                    clip_thumbnails = [extractor.thumbnails_by_clip.get(path, {}) for path in generated_clips]
+
+                Clip = apps.get_model('core', 'Clip')
+                with transaction.atomic():
+                    deleted_count = ExplorationTotalsService.delete_clips(Clip.objects.filter(
+                        experiment_id=experiment_id,
+                        id__in=to_delete
+                    ))
+                    created = self.video_processing._process_pipeline_results(
+                        {'generated_clips': generated_clips, 'clip_thumbnails': clip_thumbnails, 'episodes': to_create},
+                        artifacts.video_path,
+                        experiment_id
+                    )
+                    # La calibración (pixels_per_cm) puede haber cambiado: se recalcula la cinemática
+                    self.video_processing._save_kinematics(
+                        experiment_id,
+                        KinematicsAnalyzer(analyzer.df, fps=analyzer.video_fps,
+                                           pixels_per_cm=params.get('pixels_per_cm')).summarize()
+                    )
+                    experiment.analysis_params = params
+                    experiment.status = 'COM'
+                    experiment.save(update_fields=['analysis_params', 'status'])
+                    ExperimentCacheService.bump(experiment_id)
+            finally:
+                shutil.rmtree(clips_dir, ignore_errors=True)
+        except Exception:
+            experiment.status = previous_status
+            experiment.save(update_fields=['status'])
+            ExperimentCacheService.bump(experiment_id)
+            raise
+        finally:
+            ExperimentStatusService.invalidate(experiment_id)
+
+        logger.info(
+            f"Re-análisis de {experiment_id}: {len(kept_ids)} clips conservados, "
+            f"{deleted_count} eliminados, {created['total_clips']} nuevos"
+        )
+        return {
+            'experiment_id': experiment_id,
+            'analyzer_params': params,
+            'kept_clips': len(kept_ids),
+            'deleted_clips': deleted_count,
+            'created_clips': created['total_clips'],
+            'total_episodes': len(episodes)
+        }
+
+    def sweep(self, experiment_id: int, param_grid: Dict[str, List]):
+        """Evalúa una rejilla de parámetros sobre las predicciones guardadas (sin tocar clips)"""
+        from core.services.pipeline_total_v2 import ROIAnalyzer
+
+        Experiment = apps.get_model('core', 'Experiment')
+        experiment = Experiment.objects.get(id=experiment_id)
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+
+        if not artifacts.has_predictions():
+            raise ValueError(f"El experimento {experiment_id} no tiene predicciones guardadas")
+
+        analyzer = ROIAnalyzer(
+            data_path=artifacts.predictions_path,
+            json_path=artifacts.rois_json,
+            video_path=artifacts.video_path,
+            **{**VideoProcessingService.DEFAULT_ANALYZER_PARAMS, **(experiment.analysis_params or {})}
+        )
+        return analyzer.sweep(param_grid)
+
+    def _diff_clips(self, experiment_id: int, episodes: List[Dict], fps: float):
+        """Empareja episodios con clips existentes por (objeto, comportamiento, ventana)"""
+        Clip = apps.get_model('core', 'Clip')
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        objects_by_reference = dict(
+            ExperimentObject.objects.filter(experiment_id=experiment_id).values_list('reference', 'id')
+        )
+
+        existing = defaultdict(list)
+        for clip in Clip.objects.filter(experiment_id=experiment_id).values(
+            'id', 'experiment_object_id', 'behavior_id', 'start_time', 'end_time'
+        ):
+            key = (clip['experiment_object_id'], clip['behavior_id'], clip['start_time'], clip['end_time'])
+            existing[key].append(clip['id'])
+
+        behavior_ids = self.video_processing._behavior_ids()
+        kept_ids, to_create = [], []
+        for episode in episodes:
+            metadata = self.video_processing._extract_clip_metadata(episode, fps)
+            reference = self.video_processing._extract_object_reference(metadata['object_roi'])
+            key = (
+                objects_by_reference.get(reference),
+                self.video_processing._resolve_behavior_id(behavior_ids, episode.get('class_id')),
+                metadata['start_time'],
+                metadata['end_time']
+            )
+            if existing.get(key):
+                kept_ids.append(existing[key].pop())
+            else:
+                to_create.append(episode)
+
+        to_delete = [clip_id for ids in existing.values() for clip_id in ids]
+        return kept_ids, to_delete, to_create
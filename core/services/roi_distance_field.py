@@ -0,0 +1,104 @@
+import cv2
+import numpy as np
+import shapely
+from typing import Optional, Sequence, Tuple
+
+class ROIDistanceField:
+    """ROI rasterizada una sola vez a resolución de video.
+    
+    Guarda, para cada píxel, la distancia euclídea a la ROI (fuera) y al borde (dentro), de modo
+    que contención y proximidad se resuelven con un lookup por punto. Si la ROI tiene geometría
+    vectorial, solo los puntos a menos de REFINE_BAND píxeles del umbral se recalculan de forma
+    exacta, así el resultado coincide con la geometría sin recorrer todos los puntos.
+    """
+    SUBPIXEL_SHIFT = 4
+    REFINE_BAND = 2.0
+
+    def __init__(self, mask: np.ndarray, geometry=None):
+        self.mask = np.ascontiguousarray(mask > 0)
+        self.geometry = geometry
+        self.height, self.width = self.mask.shape
+        inside = self.mask.astype(np.uint8)
+        if self.mask.any():
+            self.distance = cv2.distanceTransform(1 - inside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+            self.inner_distance = cv2.distanceTransform(inside, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        else:
+            self.distance = np.full(self.mask.shape, np.inf, dtype=np.float32)
+            self.inner_distance = np.zeros(self.mask.shape, dtype=np.float32)
+        ys, xs = np.nonzero(self.mask)
+        self.centroid = (float(xs.mean()), float(ys.mean())) if len(xs) else (np.nan, np.nan)
+        if self.geometry is not None:
+            shapely.prepare(self.geometry)
+
+    @classmethod
+    def from_polygon(cls, points: Sequence[Sequence[float]], width: int, height: int,
+                     geometry=None) -> "ROIDistanceField":
+        mask = np.zeros((height, width), dtype=np.uint8)
+        scale = 1 << cls.SUBPIXEL_SHIFT
+        # Se desplaza medio píxel para que se rellenen los píxeles cuyo centro cae dentro
+        pts = np.round((np.asarray(points, dtype=np.float64) - 0.5) * scale).astype(np.int32)
+        cv2.fillPoly(mask, [pts.reshape(-1, 1, 2)], 1, lineType=cv2.LINE_8, shift=cls.SUBPIXEL_SHIFT)
+        return cls(mask, geometry if geometry is not None else shapely.Polygon(points))
+
+    @classmethod
+    def from_box(cls, x1: float, y1: float, x2: float, y2: float, width: int, height: int) -> "ROIDistanceField":
+        return cls.from_polygon(
+            [(x1, y1), (x2, y1), (x2, y2), (x1, y2)], width, height,
+            geometry=shapely.box(x1, y1, x2, y2)
+        )
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray, width: int, height: int) -> "ROIDistanceField":
+        if mask.shape[:2] != (height, width):
+            mask = cv2.resize(mask.astype(np.uint8), (width, height), interpolation=cv2.INTER_NEAREST)
+        return cls(mask)
+
+    def _pixel_indices(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = np.isfinite(x) & np.isfinite(y)
+        xs = np.where(valid, x, 0.0)
+        ys = np.where(valid, y, 0.0)
+        cols = np.clip(np.floor(xs), 0, self.width - 1)
+        rows = np.clip(np.floor(ys), 0, self.height - 1)
+        # Puntos fuera del frame: se suma la distancia al borde (cota superior)
+        outside = np.hypot(xs - np.clip(xs, 0, self.width - 1), ys - np.clip(ys, 0, self.height - 1))
+        return rows.astype(np.intp), cols.astype(np.intp), outside, valid
+
+    def lookup(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Distancia aproximada a la ROI por punto (0 dentro, inf para coordenadas ausentes)"""
+        rows, cols, outside, valid = self._pixel_indices(x, y)
+        return np.where(valid, self.distance[rows, cols] + outside, np.inf)
+
+    def signed_lookup(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Distancia con signo al borde (negativa dentro, inf para coordenadas ausentes)"""
+        rows, cols, outside, valid = self._pixel_indices(x, y)
+        signed = self.distance[rows, cols] + outside - self.inner_distance[rows, cols]
+        return np.where(valid, signed, np.inf)
+
+    def within(self, x: np.ndarray, y: np.ndarray, threshold: float,
+               distances: Optional[np.ndarray] = None) -> np.ndarray:
+        """Puntos a distancia <= threshold de la ROI (incluye los de dentro)"""
+        distances = self.lookup(x, y) if distances is None else distances
+        result = distances <= threshold
+        if self.geometry is not None:
+            ambiguous = np.isfinite(distances) & (np.abs(distances - threshold) <= self.REFINE_BAND)
+            if ambiguous.any():
+                points = shapely.points(np.asarray(x, dtype=float)[ambiguous], np.asarray(y, dtype=float)[ambiguous])
+                result[ambiguous] = shapely.distance(self.geometry, points) <= threshold
+        return result
+
+    def contains(self, x: np.ndarray, y: np.ndarray, signed: Optional[np.ndarray] = None) -> np.ndarray:
+        """Puntos estrictamente dentro de la ROI"""
+        signed = self.signed_lookup(x, y) if signed is None else signed
+        result = signed < 0
+        if self.geometry is not None:
+            ambiguous = np.isfinite(signed) & (np.abs(signed) <= self.REFINE_BAND + 1)
+            if ambiguous.any():
+                result[ambiguous] = shapely.contains_xy(
+                    self.geometry,
+                    np.asarray(x, dtype=float)[ambiguous],
+                    np.asarray(y, dtype=float)[ambiguous]
+                )
+        return result
+
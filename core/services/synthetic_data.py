@@ -0,0 +1,327 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import cv2
+import numpy as np
+import pandas as pd
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.interaction_engine import KEYPOINT_NAMES
+from core.services.trajectory_store import TrajectoryStore
+
+logger = logging.getLogger(__name__)
+
+class SyntheticDataGenerator:
+    """Datos sintéticos a escala para pruebas de carga y benchmarks.
+
+    Los experimentos se generan por lotes: tiempos, comportamientos y validez de todos los
+    clips del lote se sortean con numpy, experimentos y objetos se insertan con bulk_create y
+    los clips con un único INSERT parametrizado (executemany), sin instanciar modelos. Los
+    totales de exploración se calculan en memoria antes de insertar, así que quedan
+    coherentes sin pasar por ExplorationTotalsService.
+
+    Sin `media` los clips apuntan a archivos que no existen; con `media` se enlazan a un video
+    y un póster mínimos compartidos (hardlinks, o copia si el sistema no los admite).
+    """
+    MOUSE_NAMES = ['M001', 'M002', 'M003', 'M004', 'M005', 'M006', 'M007', 'M008']
+    STATUSES = ('COM', 'ERR', 'UPL', 'PRO')
+    STATUS_WEIGHTS = (0.85, 0.05, 0.05, 0.05)
+    VIDEO_SECONDS = 600.0
+    VALID_RATE = 0.9
+    # Episodios lognormales (mediana ~1 s, cola de varios segundos); el objeto novel se explora más
+    BOUT_MEDIAN_SECONDS = 1.0
+    BOUT_SIGMA = 0.8
+    MAX_BOUT_SECONDS = 15.0
+    NOVEL_BIAS = 1.3
+    # Los comportamientos de exploración se sortean con más peso que el resto
+    EXPLORATION_WEIGHT = 3.0
+    CLIP_COLUMNS = (
+        'experiment_id', 'experiment_object_id', 'behavior_id', 'video_clip', 'poster', 'sprite',
+        'sprite_frames', 'duration', 'valid', 'start_time', 'end_time', 'created_at'
+    )
+    INSERT_CHUNK = 20000
+    PLACEHOLDER_DIR = os.path.join("experiments", "synthetic")
+    ROI_BOXES = (
+        {"x1": 950, "y1": 450, "x2": 1050, "y2": 560},
+        {"x1": 200, "y1": 120, "x2": 330, "y2": 230},
+    )
+    FRAME_SIZE = (1280, 720)
+
+    def __init__(self, seed: int = 0, batch_size: int = 500, behaviors: Optional[int] = None,
+                 media: bool = False):
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.behavior_count = behaviors
+        self.media = media
+        # Prefijo de la ejecución: varias generaciones no comparten nombres de archivo
+        self.run = uuid.uuid4().hex[:6]
+        self._placeholders = None
+        self._directories = set()
+
+    # ------------------------------------------------------------------
+    # Comportamientos
+    # ------------------------------------------------------------------
+
+    def behaviors(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ids, pesos de sorteo e ids de exploración de los comportamientos usados.
+
+        Con `behaviors` se usan los N primeros por class_id, creando comportamientos
+        sintéticos (tipo 'OTH') si hay menos de N.
+        """
+        Behavior = apps.get_model('core', 'Behavior')
+        behaviors = list(Behavior.objects.order_by('class_id', 'id').values('id', 'behavior_type', 'class_id'))
+        if not behaviors:
+            raise ValueError("No hay comportamientos en la base de datos. Ejecuta las migraciones primero.")
+
+        if self.behavior_count and self.behavior_count > len(behaviors):
+            next_class = max(b['class_id'] or 0 for b in behaviors) + 1
+            created = Behavior.objects.bulk_create([
+                Behavior(name=f"Sintético {class_id}", behavior_type='OTH', class_id=class_id)
+                for class_id in range(next_class, next_class + self.behavior_count - len(behaviors))
+            ])
+            behaviors += [{'id': b.id, 'behavior_type': b.behavior_type, 'class_id': b.class_id} for b in created]
+        if self.behavior_count:
+            behaviors = behaviors[:self.behavior_count]
+
+        ids = np.array([b['id'] for b in behaviors])
+        exploration = np.array([b['behavior_type'] == 'EXP' for b in behaviors])
+        weights = np.where(exploration, self.EXPLORATION_WEIGHT, 1.0)
+        return ids, weights / weights.sum(), ids[exploration]
+
+    # ------------------------------------------------------------------
+    # Experimentos, objetos y clips
+    # ------------------------------------------------------------------
+
+    def create_experiments(self, count: int, clips_per_object: int) -> Dict:
+        """Crea `count` experimentos con dos objetos y `clips_per_object` clips por objeto"""
+        from core.services.experiment_cache import ExperimentCacheService
+
+        behaviors = self.behaviors()
+        created = {'experiments': 0, 'objects': 0, 'clips': 0}
+        for offset in range(0, count, self.batch_size):
+            _, batch = self._create_batch(min(self.batch_size, count - offset), offset, clips_per_object, behaviors)
+            for key, value in batch.items():
+                created[key] += value
+        transaction.on_commit(ExperimentCacheService.bump_list)
+        logger.info(
+            f"Datos sintéticos: {created['experiments']} experimentos, "
+            f"{created['objects']} objetos, {created['clips']} clips"
+        )
+        return created
+
+    def _clip_times(self, objects: int, clips_per_object: int, scale: np.ndarray):
+        """Inicios y duraciones (objetos x clips) de episodios que no se solapan dentro del video"""
+        durations = self.rng.lognormal(np.log(self.BOUT_MEDIAN_SECONDS), self.BOUT_SIGMA, (objects, clips_per_object))
+        durations = np.clip(durations * scale[:, None], 0.1, self.MAX_BOUT_SECONDS)
+        # Si los episodios no caben en el video se encogen hasta ocupar como mucho el 80 %
+        total = durations.sum(axis=1, keepdims=True)
+        durations = np.round(durations * np.minimum(1.0, 0.8 * self.VIDEO_SECONDS / total), 2)
+
+        # El tiempo libre se reparte al azar entre los huecos antes, entre y después de los episodios
+        gaps = self.rng.exponential(1.0, (objects, clips_per_object + 1))
+        free = self.VIDEO_SECONDS - durations.sum(axis=1, keepdims=True)
+        gaps = gaps / gaps.sum(axis=1, keepdims=True) * free
+        starts = np.cumsum(gaps[:, :-1], axis=1) + np.cumsum(durations, axis=1) - durations
+        return np.round(starts, 2), durations
+
+    def _create_batch(self, count: int, offset: int, clips_per_object: int, behaviors) -> Tuple[List, Dict]:
+        Experiment = apps.get_model('core', 'Experiment')
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+        behavior_ids, weights, exploration_ids = behaviors
+
+        shape = (2 * count, clips_per_object)
+        starts, durations = self._clip_times(shape[0], clips_per_object, np.tile([self.NOVEL_BIAS, 1.0], count))
+        clip_behaviors = self.rng.choice(behavior_ids, size=shape, p=weights)
+        valid = self.rng.random(shape) < self.VALID_RATE
+        explored = np.where(valid & np.isin(clip_behaviors, exploration_ids), durations, 0.0).sum(axis=1)
+
+        statuses = self.rng.choice(len(self.STATUSES), size=count, p=self.STATUS_WEIGHTS)
+        mice = self.rng.integers(len(self.MOUSE_NAMES), size=count)
+        days = self.rng.integers(0, 365, size=count)
+        today = date.today()
+
+        with transaction.atomic():
+            experiments = Experiment.objects.bulk_create([
+                Experiment(
+                    name=f"Sintético {offset + i + 1}",
+                    mouse_name=self.MOUSE_NAMES[mice[i]],
+                    date=today - timedelta(days=int(days[i])),
+                    status=self.STATUSES[statuses[i]],
+                    video_file=f"experiments/synthetic_{self.run}_{offset + i + 1}.mp4",
+                    exploration_time=round(float(explored[2 * i] + explored[2 * i + 1]), 2)
+                )
+                for i in range(count)
+            ], batch_size=self.batch_size)
+            objects = ExperimentObject.objects.bulk_create([
+                ExperimentObject(
+                    experiment_id=experiment.id,
+                    reference=reference,
+                    name=f"objeto_{reference}",
+                    label='NOV' if reference == 1 else 'FAM',
+                    time=round(float(explored[2 * i + reference - 1]), 2)
+                )
+                for i, experiment in enumerate(experiments)
+                for reference in (1, 2)
+            ], batch_size=self.batch_size)
+
+            experiment_ids = np.repeat([e.id for e in experiments], 2 * clips_per_object).tolist()
+            object_ids = np.repeat([o.id for o in objects], clips_per_object).tolist()
+            numbers = np.tile(np.arange(clips_per_object), shape[0]).tolist()
+            video_clips = [
+                f"experiments/{e}/clips/clip_{o}_{n}.mp4" for e, o, n in zip(experiment_ids, object_ids, numbers)
+            ]
+            posters = [name[:-4] + "_poster.jpg" for name in video_clips] if self.media else [''] * len(video_clips)
+            ends = np.round(starts + durations, 2)
+            self._insert_clips(zip(
+                experiment_ids, object_ids, clip_behaviors.ravel().tolist(), video_clips, posters,
+                [''] * len(video_clips), [0] * len(video_clips), durations.ravel().tolist(),
+                valid.ravel().tolist(), starts.ravel().tolist(), ends.ravel().tolist(),
+                [connection.ops.adapt_datetimefield_value(timezone.now())] * len(video_clips)
+            ))
+
+        if self.media:
+            self._write_media([e.video_file.name for e in experiments], video_clips, posters)
+        return experiments, {'experiments': len(experiments), 'objects': len(objects), 'clips': len(video_clips)}
+
+    def _insert_clips(self, rows):
+        """INSERT por lotes sin instanciar Clip: el coste de bulk_create es compilar cada fila"""
+        Clip = apps.get_model('core', 'Clip')
+        quote = connection.ops.quote_name
+        columns = ", ".join(quote(Clip._meta.get_field(name).column) for name in self.CLIP_COLUMNS)
+        placeholders = ", ".join(["%s"] * len(self.CLIP_COLUMNS))
+        sql = f"INSERT INTO {quote(Clip._meta.db_table)} ({columns}) VALUES ({placeholders})"
+
+        rows = iter(rows)
+        with connection.cursor() as cursor:
+            while True:
+                chunk = [row for _, row in zip(range(self.INSERT_CHUNK), rows)]
+                if not chunk:
+                    break
+                cursor.executemany(sql, chunk)
+
+    # ------------------------------------------------------------------
+    # Archivos de relleno
+    # ------------------------------------------------------------------
+
+    def _placeholder_files(self) -> Tuple[str, str]:
+        """Video y póster mínimos que comparten todos los archivos sintéticos"""
+        if self._placeholders is None:
+            try:
+                directory = default_storage.path(self.PLACEHOLDER_DIR)
+            except NotImplementedError:
+                raise ValueError("Los archivos de relleno requieren almacenamiento local")
+            os.makedirs(directory, exist_ok=True)
+            video = self.write_placeholder_video(os.path.join(directory, "placeholder.mp4"), 10.0, size=(32, 32))
+            poster = os.path.join(directory, "placeholder.jpg")
+            cv2.imwrite(poster, np.zeros((32, 32, 3), dtype=np.uint8))
+            self._placeholders = (video, poster)
+        return self._placeholders
+
+    def _link(self, source: str, name: str):
+        path = default_storage.path(name)
+        directory = os.path.dirname(path)
+        if directory not in self._directories:
+            os.makedirs(directory, exist_ok=True)
+            self._directories.add(directory)
+        try:
+            os.link(source, path)
+        except FileExistsError:
+            pass
+        except OSError:
+            shutil.copyfile(source, path)
+
+    def _write_media(self, videos: List[str], clips: List[str], posters: List[str]):
+        video, poster = self._placeholder_files()
+        for name in videos + clips:
+            self._link(video, name)
+        for name in posters:
+            self._link(poster, name)
+
+
+    # ------------------------------------------------------------------
+    # Experimento con artefactos de análisis
+    # ------------------------------------------------------------------
+
+    def predictions(self, frames: int) -> pd.DataFrame:
+        """Predicciones por frame con el esquema del CSV del pipeline (ratón que recorre la arena)"""
+        t = np.arange(frames)
+        width, height = self.FRAME_SIZE
+        cx = width / 2 + 0.3 * width * np.sin(t / 150.0)
+        cy = height / 2 + 0.33 * height * np.sin(t / 97.0)
+        heading = np.arctan2(np.gradient(cy), np.gradient(cx))
+
+        # Comportamiento por tramos de duración geométrica, como en un etograma real
+        run_lengths = self.rng.geometric(1 / 45, size=frames // 10 + 1)
+        run_classes = self.rng.choice([0, 1, 2, 3], size=len(run_lengths), p=[0.35, 0.4, 0.15, 0.1])
+        class_id = np.repeat(run_classes, run_lengths)[:frames].astype(float)
+
+        rows = {
+            'frame': t,
+            'class_id': class_id,
+            'confidence': self.rng.uniform(0.5, 1.0, frames),
+            'bbox_xc': cx, 'bbox_yc': cy,
+            'bbox_w': np.full(frames, 80.0), 'bbox_h': np.full(frames, 60.0),
+        }
+        offsets = {'nariz': 40, 'cabeza': 30, 'oreja_izq': 20, 'oreja_der': 20, 'cuello': 0, 'base_cola': -50}
+        for name in KEYPOINT_NAMES:
+            rows[f"{name}_x"] = cx + offsets.get(name, 0) * np.cos(heading) + self.rng.normal(0, 1, frames)
+            rows[f"{name}_y"] = cy + offsets.get(name, 0) * np.sin(heading) + self.rng.normal(0, 1, frames)
+            rows[f"{name}_v"] = self.rng.uniform(0.5, 1.0, frames)
+
+        df = pd.DataFrame(rows)
+        missing = self.rng.random(frames) < 0.03
+        df.loc[missing, df.columns != 'frame'] = np.nan
+        return df
+
+    def rois(self) -> Dict:
+        width, height = self.FRAME_SIZE
+        return {
+            f"roi_{i}": {
+                "name": f"objeto_{i + 1}",
+                "class_id": i,
+                "confidence": 0.9,
+                "box": box,
+                "box_normalized": [box["x1"] / width, box["y1"] / height, box["x2"] / width, box["y2"] / height],
+                "frame": 20,
+                "frame_width": width,
+                "frame_height": height,
+            }
+            for i, box in enumerate(self.ROI_BOXES)
+        }
+
+    @staticmethod
+    def write_placeholder_video(path: str, fps: float, seconds: float = 1.0, size=(64, 36)):
+        """Video negro mínimo: el análisis solo lee de él los FPS (la resolución va en las ROIs)"""
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+        frame = np.zeros((size[1], size[0], 3), dtype=np.uint8)
+        for _ in range(max(1, int(fps * seconds))):
+            writer.write(frame)
+        writer.release()
+        return path
+
+    def create_analysis_experiment(self, frames: int = 18000, fps: float = 30.0,
+                                   clips_per_object: int = 50):
+        """Experimento completado con almacén de trayectoria y ROIs, listo para los endpoints de análisis"""
+        (experiment,), _ = self._create_batch(1, 0, clips_per_object, self.behaviors())
+
+        video_name = default_storage.get_available_name(f"experiments/synthetic_{uuid.uuid4().hex[:8]}.mp4")
+        os.makedirs(os.path.dirname(default_storage.path(video_name)), exist_ok=True)
+        self.write_placeholder_video(default_storage.path(video_name), fps)
+        experiment.video_file = video_name
+        experiment.status = 'COM'
+        experiment.save(update_fields=['video_file', 'status'])
+
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+        artifacts.ensure_workdir()
+        TrajectoryStore.write(self.predictions(frames), artifacts.trajectory_store,
+                              keypoint_names=KEYPOINT_NAMES, fps=fps)
+        with open(os.path.join(artifacts.workdir, "rois_frame_20.json"), 'w') as f:
+            json.dump(self.rois(), f)
+        return experiment
@@ -0,0 +1,270 @@
+import os
+import cv2
+import yaml
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+from core.services.interaction_engine import KEYPOINT_NAMES
+
+class SyntheticArenaVideo:
+    """Video sintético de una prueba de reconocimiento de objetos.
+
+    Arena gris con dos objetos estáticos (un círculo azul y un cuadrado naranja) y un 'ratón'
+    (elipse con cabeza) que alterna desplazamientos entre puntos al azar con pausas: junto a
+    un objeto con la nariz en su borde (exploración) o en cualquier otro sitio (acicalamiento o
+    erguido). La verdad de terreno por frame (centro, orientación y clase) es la que devuelven
+    los modelos de sustitución, así que las detecciones coinciden con la imagen.
+    """
+    BEHAVIOR_CLASSES = {0: 'exploracion', 1: 'desplazamiento', 2: 'acicalamiento', 3: 'erguido'}
+    OBJECT_CLASSES = {0: 'tapa_azul', 1: 'tapa_naranja'}
+    # Posición de cada keypoint en el sistema del ratón: (longitudinal, lateral) en longitudes de cuerpo
+    KEYPOINT_OFFSETS = {
+        'cabeza': (0.75, 0.0),
+        'nariz': (1.0, 0.0),
+        'oreja_izq': (0.55, -0.2),
+        'oreja_der': (0.55, 0.2),
+        'cuello': (0.35, 0.0),
+        'base_cola': (-0.9, 0.0),
+    }
+    BACKGROUND = (90, 90, 90)
+    MOUSE_COLOR = (35, 35, 35)
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0, seconds: float = 60.0,
+                 seed: int = 0):
+        self.width = width
+        self.height = height
+        self.fps = float(fps)
+        self.frames = int(round(seconds * fps))
+        self.rng = np.random.default_rng(seed)
+        self.body_length = 0.07 * min(width, height)
+
+        size = 0.12 * min(width, height)
+        self.objects = [
+            {'class_id': class_id, 'x1': cx - size / 2, 'y1': 0.5 * height - size / 2,
+             'x2': cx + size / 2, 'y2': 0.5 * height + size / 2}
+            for class_id, cx in ((0, 0.3 * width), (1, 0.7 * width))
+        ]
+        self._build_trajectory()
+
+    # ------------------------------------------------------------------
+    # Verdad de terreno
+    # ------------------------------------------------------------------
+
+    def _exploration_pose(self, roi: Dict):
+        """Centro y orientación para explorar un objeto: nariz justo dentro de un lado de la caja"""
+        cx, cy = (roi['x1'] + roi['x2']) / 2, (roi['y1'] + roi['y2']) / 2
+        half = (roi['x2'] - roi['x1']) / 2
+        angle = self.rng.uniform(0, 2 * np.pi)
+        direction = np.array([np.cos(angle), np.sin(angle)])
+        # Punto del borde en esa dirección (caja cuadrada) desplazado un poco hacia dentro
+        edge = np.array([cx, cy]) + direction * (half / np.abs(direction).max() - 2.0)
+        heading = angle + np.pi
+        center = edge - self.body_length * np.array([np.cos(heading), np.sin(heading)])
+        return center, heading
+
+    def _random_point(self):
+        margin = 1.5 * self.body_length
+        for _ in range(100):
+            point = self.rng.uniform([margin, margin], [self.width - margin, self.height - margin])
+            if not any(
+                roi['x1'] - margin < point[0] < roi['x2'] + margin and roi['y1'] - margin < point[1] < roi['y2'] + margin
+                for roi in self.objects
+            ):
+                return point
+        return point
+
+    def _build_trajectory(self):
+        centers, headings, classes = [], [], []
+        position = np.array([0.5 * self.width, 0.2 * self.height])
+        heading = 0.0
+        speed = 0.3 * min(self.width, self.height)  # píxeles por segundo
+
+        while len(centers) < self.frames:
+            exploring = self.rng.random() < 0.5
+            if exploring:
+                target, target_heading = self._exploration_pose(self.objects[int(self.rng.integers(2))])
+            else:
+                target, target_heading = self._random_point(), None
+
+            # Desplazamiento en línea recta hacia el objetivo
+            distance = float(np.linalg.norm(target - position))
+            steps = max(1, int(distance / speed * self.fps))
+            if distance > 0:
+                heading = float(np.arctan2(*(target - position)[::-1]))
+            path = position + np.outer(np.arange(1, steps + 1) / steps, target - position)
+            centers.extend(path)
+            headings.extend([heading] * steps)
+            classes.extend([1] * steps)
+            position = target
+
+            # Pausa: exploración del objeto, o acicalamiento / erguido
+            pause = max(1, int(self.rng.exponential(1.5) * self.fps))
+            if exploring:
+                heading = target_heading
+                behavior = 0
+            else:
+                behavior = 3 if self.rng.random() < 0.3 else 2
+            jitter = self.rng.normal(0, 0.02, pause) if behavior == 2 else np.zeros(pause)
+            centers.extend([position] * pause)
+            headings.extend((heading + jitter).tolist())
+            classes.extend([behavior] * pause)
+
+        self.centers = np.array(centers[:self.frames])
+        self.headings = np.array(headings[:self.frames])
+        self.classes = np.array(classes[:self.frames])
+
+    def keypoints(self) -> np.ndarray:
+        """Keypoints (frames x keypoints x 2) en el orden de KEYPOINT_NAMES"""
+        forward = np.stack([np.cos(self.headings), np.sin(self.headings)], axis=1)
+        lateral = np.stack([-forward[:, 1], forward[:, 0]], axis=1)
+        return np.stack([
+            self.centers + self.body_length * (self.KEYPOINT_OFFSETS[name][0] * forward
+                                               + self.KEYPOINT_OFFSETS[name][1] * lateral)
+            for name in KEYPOINT_NAMES
+        ], axis=1)
+
+    def boxes(self) -> np.ndarray:
+        """Caja envolvente (x1, y1, x2, y2) de los keypoints de cada frame"""
+        points = self.keypoints()
+        pad = 0.15 * self.body_length
+        return np.concatenate([points.min(axis=1) - pad, points.max(axis=1) + pad], axis=1)
+
+    def rois(self) -> List[Dict]:
+        """ROIs en el formato de VideoProcessingPipeline.run(rois=...)"""
+        return [
+            {'name': self.OBJECT_CLASSES[roi['class_id']], 'class_id': roi['class_id'],
+             'x1': roi['x1'], 'y1': roi['y1'], 'x2': roi['x2'], 'y2': roi['y2'],
+             'frame_width': self.width, 'frame_height': self.height}
+            for roi in self.objects
+        ]
+
+    # ------------------------------------------------------------------
+    # Render
+    # ------------------------------------------------------------------
+
+    def _background(self) -> np.ndarray:
+        frame = np.full((self.height, self.width, 3), self.BACKGROUND, dtype=np.uint8)
+        border = max(2, int(0.02 * min(self.width, self.height)))
+        cv2.rectangle(frame, (0, 0), (self.width - 1, self.height - 1), (60, 60, 60), border)
+        blue, orange = self.objects
+        center = (int((blue['x1'] + blue['x2']) / 2), int((blue['y1'] + blue['y2']) / 2))
+        cv2.circle(frame, center, int((blue['x2'] - blue['x1']) / 2), (200, 90, 30), -1)
+        cv2.rectangle(frame, (int(orange['x1']), int(orange['y1'])), (int(orange['x2']), int(orange['y2'])),
+                      (30, 130, 240), -1)
+        return frame
+
+    def render(self, path: str) -> str:
+        """Escribe el video (mp4v) y devuelve su ruta"""
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (self.width, self.height))
+        if not writer.isOpened():
+            raise ValueError(f"No se pudo crear el video: {path}")
+        background = self._background()
+        head_index = KEYPOINT_NAMES.index('cabeza')
+        heads = self.keypoints()[:, head_index]
+        axes = (int(0.9 * self.body_length), int(0.35 * self.body_length))
+        head_radius = max(1, int(0.25 * self.body_length))
+        try:
+            for center, heading, head in zip(self.centers, self.headings, heads):
+                frame = background.copy()
+                cv2.ellipse(frame, (int(center[0]), int(center[1])), axes, float(np.degrees(heading)),
+                            0, 360, self.MOUSE_COLOR, -1)
+                cv2.circle(frame, (int(head[0]), int(head[1])), head_radius, self.MOUSE_COLOR, -1)
+                writer.write(frame)
+        finally:
+            writer.release()
+        return path
+
+
+def _results(frame: np.ndarray, path: str, names: Dict[int, str], boxes: np.ndarray,
+             keypoints: Optional[np.ndarray] = None):
+    import torch
+    from ultralytics.engine.results import Results
+    return Results(
+        frame, path=path, names=names,
+        boxes=torch.as_tensor(boxes, dtype=torch.float32),
+        keypoints=None if keypoints is None else torch.as_tensor(keypoints, dtype=torch.float32)
+    )
+
+
+class StubPoseModel:
+    """Sustituto del modelo YOLO de pose: mismas salidas (ultralytics Results) sin inferencia.
+
+    predict() decodifica el video igual que el modelo real, así que la lectura sigue contando
+    en el tiempo de la etapa; las detecciones salen de la verdad de terreno con ruido y algún
+    frame sin detección.
+    """
+
+    def __init__(self, video: SyntheticArenaVideo, noise: float = 1.0, miss_rate: float = 0.02, seed: int = 0):
+        self.video = video
+        self.names = dict(video.BEHAVIOR_CLASSES)
+        rng = np.random.default_rng(seed)
+        frames = video.frames
+        self._keypoints = video.keypoints() + rng.normal(0, noise, (frames, len(KEYPOINT_NAMES), 2))
+        self._visibility = rng.uniform(0.6, 1.0, (frames, len(KEYPOINT_NAMES)))
+        self._confidence = rng.uniform(0.5, 0.99, frames)
+        self._missed = rng.random(frames) < miss_rate
+        self._boxes = video.boxes()
+
+    def predict(self, source: str, stream: bool = True, verbose: bool = False, **kwargs) -> Iterator:
+        results = self._stream(source)
+        return results if stream else list(results)
+
+    def _stream(self, source: str) -> Iterator:
+        cap = cv2.VideoCapture(source)
+        try:
+            index = 0
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if index >= self.video.frames or self._missed[index]:
+                    yield _results(frame, source, self.names, np.empty((0, 6)), np.empty((0, len(KEYPOINT_NAMES), 3)))
+                else:
+                    box = np.append(self._boxes[index], [self._confidence[index], self.video.classes[index]])
+                    keypoints = np.concatenate([self._keypoints[index], self._visibility[index][:, None]], axis=1)
+                    yield _results(frame, source, self.names, box[None], keypoints[None])
+                index += 1
+        finally:
+            cap.release()
+
+    def __call__(self, source, **kwargs):
+        return self.predict(source, stream=False)
+
+
+class StubSegmenterModel:
+    """Sustituto del modelo de detección de objetos: devuelve las cajas de los objetos de la arena"""
+
+    def __init__(self, video: SyntheticArenaVideo):
+        self.video = video
+        self.names = dict(video.OBJECT_CLASSES)
+
+    def __call__(self, frame: np.ndarray, **kwargs):
+        boxes = np.array([
+            [roi['x1'], roi['y1'], roi['x2'], roi['y2'], 0.95, roi['class_id']] for roi in self.video.objects
+        ])
+        return [_results(frame, '', self.names, boxes)]
+
+
+def build_random_yolo(task: str, path: str, nc: int, kpt_shape: Optional[List[int]] = None,
+                      scale: str = 'n') -> str:
+    """Guarda en `path` un YOLOv8 con pesos aleatorios (nada que descargar) para medir la inferencia.
+
+    task: 'pose' (keypoints) o 'detect' (objetos). Las detecciones no significan nada, pero el
+    coste por frame es el de un modelo real del mismo tamaño.
+    """
+    import ultralytics
+    from ultralytics import YOLO
+
+    config_name = 'yolov8-pose.yaml' if task == 'pose' else 'yolov8.yaml'
+    with open(os.path.join(os.path.dirname(ultralytics.__file__), 'cfg', 'models', 'v8', config_name)) as f:
+        config = yaml.safe_load(f)
+    config['nc'] = nc
+    config['scale'] = scale
+    if kpt_shape is not None:
+        config['kpt_shape'] = kpt_shape
+
+    # ultralytics deduce la escala del nombre del archivo (yolov8n-pose.yaml)
+    config_path = os.path.join(os.path.dirname(path), config_name.replace('yolov8', f'yolov8{scale}'))
+    with open(config_path, 'w') as f:
+        yaml.safe_dump(config, f)
+    YOLO(config_path, task=task).save(path)
+    return path
@@ -0,0 +1,188 @@
+import os
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+from django.apps import apps
+from core.services.experiment_artifacts import ExperimentArtifacts
+
+logger = logging.getLogger(__name__)
+
+class ExplorationTimeCourse:
+    """Sumas prefijas por frame de exploración (episodios de clase 0) e interacción por ROI.
+
+    prefix[r, f] es el número de frames con exploración de la ROI r antes del frame f, de modo
+    que cualquier ventana [a, b) se responde con prefix[:, b] - prefix[:, a].
+    """
+    SOURCES = ('exploration', 'interaction')
+    # Tope de bins por respuesta: bins más finos se ensanchan hasta cubrir la ventana con MAX_BINS
+    MAX_BINS = 2000
+
+    def __init__(self, roi_names: List[str], fps: float, prefixes: Dict[str, np.ndarray]):
+        self.roi_names = list(roi_names)
+        self.fps = float(fps)
+        self.prefixes = prefixes
+
+    @property
+    def total_frames(self) -> int:
+        return self.prefixes['exploration'].shape[1] - 1
+
+    @staticmethod
+    def _prefix(per_frame: np.ndarray) -> np.ndarray:
+        prefix = np.zeros((per_frame.shape[0], per_frame.shape[1] + 1), dtype=np.int32)
+        np.cumsum(per_frame, axis=1, out=prefix[:, 1:])
+        return prefix
+
+    @classmethod
+    def from_analysis(cls, frames: np.ndarray, interaction_masks: Dict[str, np.ndarray],
+                      episodes: List[Dict], fps: float) -> "ExplorationTimeCourse":
+        roi_names = list(interaction_masks)
+        frames = np.asarray(frames, dtype=np.int64)
+        n_frames = int(frames.max()) + 1 if len(frames) else 0
+
+        interaction = np.zeros((len(roi_names), n_frames), dtype=np.int8)
+        # Marcas +1/-1 en los límites de cada episodio; la suma acumulada da la cobertura
+        coverage = np.zeros((len(roi_names), n_frames + 1), dtype=np.int32)
+        for r, roi_name in enumerate(roi_names):
+            interaction[r, frames] = np.asarray(interaction_masks[roi_name], dtype=bool)
+            roi_episodes = [ep for ep in episodes if ep['object_roi'] == roi_name and ep['class_id'] == 0]
+            starts = np.array([ep['start_frame'] for ep in roi_episodes], dtype=np.int64)
+            ends = np.array([ep['end_frame'] for ep in roi_episodes], dtype=np.int64) + 1
+            np.add.at(coverage[r], starts, 1)
+            np.add.at(coverage[r], ends, -1)
+        exploration = (np.cumsum(coverage[:, :-1], axis=1) > 0).astype(np.int8)
+
+        return cls(roi_names, fps, {
+            'exploration': cls._prefix(exploration),
+            'interaction': cls._prefix(interaction)
+        })
+
+    @classmethod
+    def from_analyzer(cls, analyzer, episodes: List[Dict]) -> "ExplorationTimeCourse":
+        interactions = analyzer.interactions
+        return cls.from_analysis(
+            interactions['frame'].to_numpy(),
+            {roi_name: interactions[f'interaction_{roi_name}'].to_numpy() for roi_name in analyzer.rois},
+            episodes,
+            analyzer.video_fps
+        )
+
+    def save(self, path: str) -> str:
+        np.savez(
+            path,
+            roi_names=np.array(self.roi_names),
+            fps=np.array(self.fps),
+            **{f'prefix_{source}': self.prefixes[source] for source in self.SOURCES}
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "ExplorationTimeCourse":
+        with np.load(path) as data:
+            return cls(
+                [str(name) for name in data['roi_names']],
+                float(data['fps']),
+                {source: data[f'prefix_{source}'] for source in cls.SOURCES}
+            )
+
+    def bins(self, bin_seconds: float, start: Optional[float] = None, end: Optional[float] = None,
+             source: str = 'exploration') -> Dict:
+        """Segundos por bin y curvas acumuladas por ROI en O(bins); como mucho MAX_BINS bins"""
+        prefix = self.prefixes[source]
+        start_frame = min(max(int(round((start or 0) * self.fps)), 0), self.total_frames)
+        end_frame = self.total_frames if end is None else min(int(round(end * self.fps)), self.total_frames)
+        end_frame = max(end_frame, start_frame)
+        bin_frames = max(int(round(bin_seconds * self.fps)), 1, -(-(end_frame - start_frame) // self.MAX_BINS))
+
+        edges = np.append(np.arange(start_frame, end_frame, bin_frames), end_frame)
+        per_bin = (prefix[:, edges[1:]] - prefix[:, edges[:-1]]) / self.fps
+        cumulative = (prefix[:, edges[1:]] - prefix[:, [start_frame]]) / self.fps
+
+        return {
+            'bin_seconds': round(bin_frames / self.fps, 6),
+            'edges': np.round(edges / self.fps, 3).tolist(),
+            'seconds': {roi: np.round(per_bin[r], 3).tolist() for r, roi in enumerate(self.roi_names)},
+            'cumulative': {roi: np.round(cumulative[r], 3).tolist() for r, roi in enumerate(self.roi_names)}
+        }
+
+    @staticmethod
+    def discrimination_index(novel: List[float], familiar: List[float]) -> List[Optional[float]]:
+        """(N - F) / (N + F) por bin; None cuando no hay exploración"""
+        novel, familiar = np.asarray(novel, dtype=float), np.asarray(familiar, dtype=float)
+        total = novel + familiar
+        with np.errstate(invalid='ignore', divide='ignore'):
+            index = (novel - familiar) / total
+        return [round(float(v), 4) if t > 0 else None for v, t in zip(index, total)]
+
+
+class TimeCourseService:
+    """Curvas temporales por objeto a partir del artefacto timecourse.npz del experimento"""
+
+    def get_timecourse(self, experiment) -> ExplorationTimeCourse:
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+        if os.path.exists(artifacts.timecourse):
+            return ExplorationTimeCourse.load(artifacts.timecourse)
+        if not artifacts.has_predictions():
+            raise FileNotFoundError(f"El experimento {experiment.id} no tiene datos de análisis")
+
+        # Experimentos procesados antes de existir el artefacto: se calcula una vez y se guarda
+        from core.services.pipeline_total_v2 import ROIAnalyzer
+        from core.services.video_processing import VideoProcessingService
+        logger.info(f"Generando timecourse para el experimento {experiment.id}")
+        analyzer = ROIAnalyzer(
+            data_path=artifacts.predictions_path,
+            json_path=artifacts.rois_json,
+            video_path=artifacts.video_path,
+            **{**VideoProcessingService.DEFAULT_ANALYZER_PARAMS, **(experiment.analysis_params or {})}
+        )
+        episodes = analyzer.analyze()['episodes'].to_dict('records')
+        timecourse = ExplorationTimeCourse.from_analyzer(analyzer, episodes)
+        timecourse.save(artifacts.timecourse)
+        return timecourse
+
+    @staticmethod
+    def _object_reference(roi_name: str) -> Optional[int]:
+        try:
+            return int(roi_name.split('_')[-1])
+        except (IndexError, ValueError):
+            return None
+
+    def build(self, experiment, bin_seconds: float, start: Optional[float] = None,
+              end: Optional[float] = None, source: str = 'exploration') -> Dict:
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+        timecourse = self.get_timecourse(experiment)
+        binned = timecourse.bins(bin_seconds, start=start, end=end, source=source)
+
+        objects_by_reference = {
+            obj.reference: obj for obj in ExperimentObject.objects.filter(experiment_id=experiment.id)
+        }
+        objects = []
+        for roi_name in timecourse.roi_names:
+            obj = objects_by_reference.get(self._object_reference(roi_name))
+            objects.append({
+                'roi': roi_name,
+                'reference': obj.reference if obj else None,
+                'name': obj.name if obj else roi_name,
+                'label': obj.label if obj else None,
+                'seconds': binned['seconds'][roi_name],
+                'cumulative': binned['cumulative'][roi_name]
+            })
+
+        novel = next((o for o in objects if o['label'] == ExperimentObject.Label.NOVEL), None)
+        familiar = next((o for o in objects if o['label'] == ExperimentObject.Label.FAMILIAR), None)
+        discrimination, cumulative_discrimination = None, None
+        if novel and familiar:
+            discrimination = ExplorationTimeCourse.discrimination_index(novel['seconds'], familiar['seconds'])
+            cumulative_discrimination = ExplorationTimeCourse.discrimination_index(
+                novel['cumulative'], familiar['cumulative']
+            )
+
+        return {
+            'experiment_id': experiment.id,
+            'source': source,
+            'fps': timecourse.fps,
+            'bin_seconds': binned['bin_seconds'],
+            'edges': binned['edges'],
+            'objects': objects,
+            'discrimination_index': discrimination,
+            'cumulative_discrimination_index': cumulative_discrimination
+        }
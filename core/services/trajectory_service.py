@@ -0,0 +1,74 @@
+import os
+import cv2
+import hashlib
+import logging
+import numpy as np
+from typing import Dict, Optional
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.trajectory_store import TrajectoryStore
+from core.services.downsampling import lttb, minmax
+
+logger = logging.getLogger(__name__)
+
+class TrajectoryService:
+    """Trayectorias de keypoints por ventana de tiempo, submuestreadas en el servidor"""
+    DOWNSAMPLERS = {'lttb': lttb, 'minmax': minmax}
+
+    def get_store(self, experiment) -> TrajectoryStore:
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+        if not os.path.exists(artifacts.trajectory_store):
+            if not os.path.exists(artifacts.predictions_csv):
+                raise FileNotFoundError(f"El experimento {experiment.id} no tiene predicciones guardadas")
+            # Experimentos anteriores al almacén compacto: se convierte el CSV una sola vez
+            logger.info(f"Convirtiendo predicciones del experimento {experiment.id} a TrajectoryStore")
+            TrajectoryStore.from_csv(
+                artifacts.predictions_csv,
+                artifacts.trajectory_store,
+                fps=self._video_fps(artifacts.video_path)
+            )
+        return TrajectoryStore.open(artifacts.trajectory_store)
+
+    @staticmethod
+    def _video_fps(video_path: str) -> float:
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        cap.release()
+        return float(fps)
+
+    def fps(self, experiment, store: TrajectoryStore) -> float:
+        return float(store.fps) if store.fps else self._video_fps(experiment.video_file.path)
+
+    @staticmethod
+    def etag(store: TrajectoryStore, params: Dict) -> str:
+        key = store.signature + '|' + '|'.join(f"{k}={params.get(k)}" for k in sorted(params))
+        return '"' + hashlib.sha1(key.encode('utf-8')).hexdigest() + '"'
+
+    def get_track(self, experiment, store: TrajectoryStore, keypoint: str = 'nariz',
+                  start: Optional[float] = None, end: Optional[float] = None,
+                  points: int = 1000, method: str = 'lttb') -> Dict:
+        fps = self.fps(experiment, store)
+        start_frame = None if start is None else int(round(start * fps))
+        end_frame = None if end is None else int(round(end * fps))
+        i, j = store.frame_range(start_frame, end_frame)
+
+        coords = store.keypoints(i, j, names=[keypoint])[:, 0, :]
+        frames = np.asarray(store.frames[i:j])
+        # Los frames sin detección no forman parte del trazo
+        valid = np.isfinite(coords).all(axis=1)
+        coords, frames = coords[valid], frames[valid]
+
+        selected = self.DOWNSAMPLERS[method](coords.astype(np.float64), points)
+        coords, frames = coords[selected], frames[selected]
+
+        return {
+            'experiment_id': experiment.id,
+            'keypoint': keypoint,
+            'method': method,
+            'fps': fps,
+            'window_points': int(valid.sum()),
+            'points': int(len(selected)),
+            'frame': frames.tolist(),
+            't': np.round(frames / fps, 3).tolist(),
+            'x': np.round(coords[:, 0].astype(np.float64), 2).tolist(),
+            'y': np.round(coords[:, 1].astype(np.float64), 2).tolist()
+        }
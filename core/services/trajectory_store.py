@@ -0,0 +1,217 @@
+import os
+import json
+import struct
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from .interaction_engine import KEYPOINT_NAMES
+
+
+class TrajectoryStore:
+    """Almacén compacto y mapeable en memoria de las predicciones por frame.
+
+    Formato: MAGIC + longitud de cabecera (uint32) + cabecera JSON, seguidos de arrays
+    alineados a 64 bytes. Keypoints y cajas en punto fijo int16 (valor * scale), visibilidad
+    y confianza en uint8 (0..254, 255 = ausente) y clase en uint8 (255 = sin detección).
+    La lectura usa np.memmap, de modo que cortar un rango de frames no lee el archivo entero.
+    """
+    MAGIC = b'RTRJ'
+    VERSION = 1
+    EXTENSION = '.trj'
+    ALIGNMENT = 64
+    MISSING_INT16 = np.iinfo(np.int16).min
+    MISSING_UINT8 = 255
+    MAX_SCALE = 16
+    BBOX_COLUMNS = ['bbox_xc', 'bbox_yc', 'bbox_w', 'bbox_h']
+
+    def __init__(self, path: str, header: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.keypoint_names = header['keypoints']
+        self.scale = float(header['scale'])
+
+    def __len__(self) -> int:
+        return self.header['n_frames']
+
+    @property
+    def fps(self) -> Optional[float]:
+        return self.header.get('fps')
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self.arrays['frame']
+
+    @property
+    def signature(self) -> str:
+        """Identifica el contenido (para ETags y cachés derivadas)"""
+        stat = os.stat(self.path)
+        return f"{self.header['n_frames']}-{stat.st_size}-{int(stat.st_mtime_ns)}"
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _choose_scale(cls, *values: np.ndarray) -> float:
+        """Mayor potencia de 2 (hasta MAX_SCALE) que cabe en int16; menor que 1 si hay valores > 32766"""
+        max_abs = max((np.nanmax(np.abs(v)) for v in values if np.isfinite(v).any()), default=0.0)
+        if max_abs <= 0:
+            return float(cls.MAX_SCALE)
+        scale = 2.0 ** int(np.floor(np.log2((np.iinfo(np.int16).max - 1) / max_abs)))
+        return float(min(scale, cls.MAX_SCALE))
+
+    @classmethod
+    def _to_fixed(cls, values: np.ndarray, scale: float) -> np.ndarray:
+        fixed = np.full(values.shape, cls.MISSING_INT16, dtype=np.int16)
+        valid = np.isfinite(values)
+        fixed[valid] = np.round(values[valid] * scale).astype(np.int16)
+        return fixed
+
+    @classmethod
+    def _to_unit_uint8(cls, values: np.ndarray) -> np.ndarray:
+        quantized = np.full(values.shape, cls.MISSING_UINT8, dtype=np.uint8)
+        valid = np.isfinite(values)
+        quantized[valid] = np.round(np.clip(values[valid], 0.0, 1.0) * 254).astype(np.uint8)
+        return quantized
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, path: str, keypoint_names: Optional[List[str]] = None,
+              fps: Optional[float] = None) -> str:
+        """Escribe el DataFrame de predicciones (mismo esquema que el CSV) en formato compacto"""
+        keypoint_names = keypoint_names or KEYPOINT_NAMES
+        # Mismo criterio que ROIAnalyzer._process_dataframe: primera aparición en el origen, luego orden
+        df = df.drop_duplicates('frame', keep='first').sort_values('frame')
+
+        def column(name):
+            return df[name].to_numpy(dtype=float) if name in df.columns else np.full(len(df), np.nan)
+
+        keypoints = np.stack([
+            np.stack([column(f"{name}_x"), column(f"{name}_y")], axis=1) for name in keypoint_names
+        ], axis=1) if len(keypoint_names) else np.empty((len(df), 0, 2))
+        visibility = np.stack([column(f"{name}_v") for name in keypoint_names], axis=1)
+        bbox = np.stack([column(name) for name in cls.BBOX_COLUMNS], axis=1)
+        class_id = column('class_id')
+        scale = cls._choose_scale(keypoints, bbox)
+
+        class_uint8 = np.full(len(df), cls.MISSING_UINT8, dtype=np.uint8)
+        valid_class = np.isfinite(class_id)
+        class_uint8[valid_class] = class_id[valid_class].astype(np.uint8)
+
+        arrays = {
+            'frame': column('frame').astype(np.int32),
+            'keypoints': cls._to_fixed(keypoints, scale),
+            'visibility': cls._to_unit_uint8(visibility),
+            'class_id': class_uint8,
+            'confidence': cls._to_unit_uint8(column('confidence')),
+            'bbox': cls._to_fixed(bbox, scale),
+        }
+
+        # La cabecera se calcula dos veces: los offsets dependen de su propia longitud
+        layout, header_bytes = {}, b''
+        for _ in range(2):
+            offset = cls._align(len(cls.MAGIC) + 4 + len(header_bytes))
+            for name, array in arrays.items():
+                layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+                offset = cls._align(offset + array.nbytes)
+            header = {
+                'version': cls.VERSION,
+                'n_frames': int(len(df)),
+                'keypoints': list(keypoint_names),
+                'scale': scale,
+                'fps': fps,
+                'arrays': layout
+            }
+            header_bytes = json.dumps(header).encode('utf-8')
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(cls.MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(layout[name]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def from_csv(cls, csv_path: str, path: str, fps: Optional[float] = None) -> str:
+        return cls.write(pd.read_csv(csv_path), path, fps=fps)
+
+    @classmethod
+    def _align(cls, offset: int) -> int:
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def open(cls, path: str) -> "TrajectoryStore":
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"Archivo de trayectoria inválido: {path}")
+            header_length, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_length).decode('utf-8'))
+
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            shape = tuple(spec['shape'])
+            if 0 in shape:
+                arrays[name] = np.empty(shape, dtype=np.dtype(spec['dtype']))
+                continue
+            arrays[name] = np.memmap(path, dtype=np.dtype(spec['dtype']), mode='r',
+                                     offset=spec['offset'], shape=shape)
+        return cls(path, header, arrays)
+
+    def frame_range(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> Tuple[int, int]:
+        """Índices [i, j) de las filas con start_frame <= frame < end_frame"""
+        frames = self.frames
+        i = 0 if start_frame is None else int(np.searchsorted(frames, start_frame, side='left'))
+        j = len(self) if end_frame is None else int(np.searchsorted(frames, end_frame, side='left'))
+        return i, max(i, j)
+
+    def _from_fixed(self, values: np.ndarray) -> np.ndarray:
+        result = values.astype(np.float32) / np.float32(self.scale)
+        result[values == self.MISSING_INT16] = np.nan
+        return result
+
+    def _from_unit_uint8(self, values: np.ndarray) -> np.ndarray:
+        result = values.astype(np.float32) / np.float32(254)
+        result[values == self.MISSING_UINT8] = np.nan
+        return result
+
+    def keypoints(self, i: int = 0, j: Optional[int] = None, names: Optional[List[str]] = None) -> np.ndarray:
+        """Coordenadas (n, K, 2) en píxeles de las filas [i, j)"""
+        idx = slice(None) if names is None else [self.keypoint_names.index(name) for name in names]
+        return self._from_fixed(self.arrays['keypoints'][i:j][:, idx])
+
+    def visibility(self, i: int = 0, j: Optional[int] = None) -> np.ndarray:
+        return self._from_unit_uint8(self.arrays['visibility'][i:j])
+
+    def class_ids(self, i: int = 0, j: Optional[int] = None) -> np.ndarray:
+        values = self.arrays['class_id'][i:j]
+        result = values.astype(np.float64)
+        result[values == self.MISSING_UINT8] = np.nan
+        return result
+
+    def to_dataframe(self, start_frame: Optional[int] = None, end_frame: Optional[int] = None) -> pd.DataFrame:
+        """DataFrame con el esquema del CSV de predicciones para el rango de frames pedido"""
+        i, j = self.frame_range(start_frame, end_frame)
+        bbox = self._from_fixed(self.arrays['bbox'][i:j]).astype(np.float64)
+        keypoints = self.keypoints(i, j).astype(np.float64)
+        visibility = self.visibility(i, j).astype(np.float64)
+
+        data = {
+            'frame': np.asarray(self.frames[i:j], dtype=np.int64),
+            'class_id': self.class_ids(i, j),
+            'confidence': self._from_unit_uint8(self.arrays['confidence'][i:j]).astype(np.float64),
+        }
+        for c, name in enumerate(self.BBOX_COLUMNS):
+            data[name] = bbox[:, c]
+        for k, name in enumerate(self.keypoint_names):
+            data[f"{name}_x"] = keypoints[:, k, 0]
+            data[f"{name}_y"] = keypoints[:, k, 1]
+            data[f"{name}_v"] = visibility[:, k]
+        return pd.DataFrame(data)
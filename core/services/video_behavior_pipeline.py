@@ -1,6 +1,8 @@
 import os
+import json
+import time
 import logging
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from pathlib import Path
 import pandas as pd
 from .pipeline_total_v2 import (
@@ -9,6 +11,19 @@ from .pipeline_total_v2 import (
     ROIAnalyzer,
     VideoClipExtractor
 )
+from .kinematics import KinematicsAnalyzer
+from .timecourse import ExplorationTimeCourse
+from .experiment_artifacts import ExperimentArtifacts
+from .heatmaps import HeatmapService
+from .ethogram import Ethogram
+from .trajectory_store import TrajectoryStore
+from infrastructure.metrics import (
+    PIPELINE_STAGE_DURATION,
+    INFERENCE_FRAMES,
+    INFERENCE_FPS,
+    CLIPS_ENCODED,
+    CLIP_ENCODE_RATE
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +35,8 @@ class VideoProcessingPipeline:
         segmenter_model_path: str,
         analyzer_params: Dict,
         clip_params: Dict,
-        segmenter_params: Dict
+        segmenter_params: Dict,
+        progress_callback: Optional[Callable[[str, Optional[int], Optional[int]], None]] = None
     ):
         self.model_path = model_path
         self.workdir = workdir
@@ -28,6 +44,11 @@ class VideoProcessingPipeline:
         self.analyzer_params = analyzer_params
         self.clip_params = clip_params
         self.segmenter_params = segmenter_params
+        self.progress_callback = progress_callback
+
+    def _report(self, stage: str, current: Optional[int] = None, total: Optional[int] = None):
+        if self.progress_callback is not None:
+            self.progress_callback(stage, current, total)
 
     def run(
         self,
@@ -56,37 +77,66 @@ class VideoProcessingPipeline:
         roi_json_path = None
         if rois is None and autosegment_if_missing:
             logger.info("Detectando ROIs automáticamente...")
-            roi_json_path = detect_rois(
-                video_path=video_path,
-                model_path=self.segmenter_model_path,
-                output_dir=self.workdir,
-                target_frame=self.segmenter_params.get('frame_index', 20)
-            )
+            self._report('rois')
+            with PIPELINE_STAGE_DURATION.labels(stage='rois').time():
+                roi_json_path = detect_rois(
+                    video_path=video_path,
+                    model_path=self.segmenter_model_path,
+                    output_dir=self.workdir,
+                    target_frame=self.segmenter_params.get('frame_index', 20),
+                    max_objects=self.segmenter_params.get('max_objects', 2)
+                )
         elif rois is not None:
             # Guardar ROIs proporcionadas como JSON
             roi_json_path = self._save_provided_rois(rois)
         
         # 2. Detección de keypoints
         logger.info("Detectando keypoints...")
-        keypoints_csv = os.path.join(self.workdir, "predictions.csv")
+        keypoints_csv = os.path.join(self.workdir, ExperimentArtifacts.PREDICTIONS_CSV)
+        trajectory_store = os.path.join(self.workdir, ExperimentArtifacts.TRAJECTORY_STORE)
+        keypoints_start = time.perf_counter()
         detect_keypoints(
             video_path=video_path,
             model_path=self.model_path,
-            output_csv=keypoints_csv
+            output_csv=keypoints_csv,
+            output_store=trajectory_store,
+            progress_callback=lambda current, total: self._report('keypoints', current, total)
         )
+        keypoints_elapsed = time.perf_counter() - keypoints_start
+        PIPELINE_STAGE_DURATION.labels(stage='keypoints').observe(keypoints_elapsed)
         
         # 3. Análisis de interacciones
         logger.info("Analizando interacciones...")
-        analyzer = ROIAnalyzer(
-            data_path=keypoints_csv,
-            json_path=roi_json_path,
-            video_path=video_path,
-            **self.analyzer_params
-        )
-        analysis_results = analyzer.analyze()
+        self._report('analysis')
+        with PIPELINE_STAGE_DURATION.labels(stage='analysis').time():
+            analyzer = ROIAnalyzer(
+                data_path=trajectory_store,
+                json_path=roi_json_path,
+                video_path=video_path,
+                **self.analyzer_params
+            )
+            analysis_results = analyzer.analyze()
+            Ethogram.from_store(TrajectoryStore.open(trajectory_store), analyzer.video_fps).save(
+                os.path.join(self.workdir, ExperimentArtifacts.ETHOGRAM_NPZ)
+            )
+            timecourse_path = ExplorationTimeCourse.from_analyzer(
+                analyzer, analysis_results['episodes'].to_dict('records')
+            ).save(os.path.join(self.workdir, ExperimentArtifacts.TIMECOURSE_NPZ))
+        
+        with PIPELINE_STAGE_DURATION.labels(stage='kinematics').time():
+            kinematics = KinematicsAnalyzer(
+                analyzer.df,
+                fps=analyzer.video_fps,
+                pixels_per_cm=self.analyzer_params.get('pixels_per_cm')
+            ).summarize()
+        
+        INFERENCE_FRAMES.inc(len(analyzer.df))
+        if keypoints_elapsed > 0:
+            INFERENCE_FPS.set(len(analyzer.df) / keypoints_elapsed)
         
         # 4. Extracción de clips (si se solicita)
         generated_clips = []
+        clip_thumbnails = []
         if export_clips:
             logger.info("Extrayendo clips de interacción...")
             clips_dir = os.path.join(self.workdir, "clips")
@@ -97,18 +147,35 @@ class VideoProcessingPipeline:
                 **self.clip_params
             )
             
+            clips_start = time.perf_counter()
             try:
-                generated_clips = extractor.extract_all_clips(show_progress=True)
+                generated_clips = extractor.extract_all_clips(
+                    show_progress=True,
+                    progress_callback=lambda current, total: self._report('clips', current, total)
+                )
             finally:
                 extractor.close()
+            clip_thumbnails = [extractor.thumbnails_by_clip.get(path, {}) for path in generated_clips]
+            clips_elapsed = time.perf_counter() - clips_start
+            PIPELINE_STAGE_DURATION.labels(stage='clips').observe(clips_elapsed)
+            CLIPS_ENCODED.inc(len(generated_clips))
+            if clips_elapsed > 0:
+                CLIP_ENCODE_RATE.set(len(generated_clips) / clips_elapsed)
+        
+        with PIPELINE_STAGE_DURATION.labels(stage='heatmaps').time():
+            HeatmapService(ExperimentArtifacts.for_workdir(video_path, self.workdir)).precompute()
         
         # Preparar resultados
         result = {
             'episodes': analysis_results['episodes'].to_dict('records'),
             'aggregated_metrics': analysis_results['aggregated'].to_dict('records'),
+            'kinematics': kinematics,
             'generated_clips': generated_clips,
+            'clip_thumbnails': clip_thumbnails,
             'roi_detection_path': roi_json_path,
-            'keypoints_detection_path': keypoints_csv
+            'keypoints_detection_path': keypoints_csv,
+            'trajectory_store_path': trajectory_store,
+            'timecourse_path': timecourse_path
         }
         
         if return_predictions_df:
@@ -117,30 +184,36 @@ class VideoProcessingPipeline:
         return result
 
     def _save_provided_rois(self, rois: List[Dict]) -> str:
-        """Guarda las ROIs proporcionadas como un archivo JSON."""
+        """Guarda las ROIs proporcionadas (cajas o polígonos) como un archivo JSON."""
         roi_data = {}
         for i, roi in enumerate(rois):
+            if roi.get("polygon"):
+                xs = [p[0] for p in roi["polygon"]]
+                ys = [p[1] for p in roi["polygon"]]
+                box = {"x1": min(xs), "y1": min(ys), "x2": max(xs), "y2": max(ys)}
+            else:
+                box = {"x1": roi["x1"], "y1": roi["y1"], "x2": roi["x2"], "y2": roi["y2"]}
+            
             roi_data[f"roi_{i}"] = {
                 "name": roi.get("name", f"roi_{i}"),
                 "class_id": roi.get("class_id", 0),
                 "confidence": 1.0,
-                "box": {
-                    "x1": roi["x1"],
-                    "y1": roi["y1"],
-                    "x2": roi["x2"],
-                    "y2": roi["y2"]
-                },
+                "box": box,
                 "box_normalized": [
-                    roi["x1"] / roi["frame_width"],
-                    roi["y1"] / roi["frame_height"],
-                    roi["x2"] / roi["frame_width"],
-                    roi["y2"] / roi["frame_height"]
+                    box["x1"] / roi["frame_width"],
+                    box["y1"] / roi["frame_height"],
+                    box["x2"] / roi["frame_width"],
+                    box["y2"] / roi["frame_height"]
                 ],
-                "frame": roi.get("frame", 0)
+                "frame": roi.get("frame", 0),
+                "frame_width": roi["frame_width"],
+                "frame_height": roi["frame_height"]
             }
+            if roi.get("polygon"):
+                roi_data[f"roi_{i}"]["polygon"] = roi["polygon"]
         
         output_path = os.path.join(self.workdir, "provided_rois.json")
         with open(output_path, 'w') as f:
             json.dump(roi_data, f, indent=4)
         
-        return output_path
\ No newline at end of file
+        return output_path
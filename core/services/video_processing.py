@@ -1,10 +1,15 @@
 import os
 import cv2
 import logging
-from django.core.files.storage import default_storage
+from django.core.files.storage import default_storage, FileSystemStorage
 from django.core.files import File
 from django.apps import apps
-from typing import Dict, List, Optional
+from django.db import transaction
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from infrastructure.metrics import PIPELINE_STAGE_DURATION
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.exploration_totals import ExplorationTotalsService
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +21,28 @@ class VideoProcessingService:
         3: "erguido"
     }
 
+    DEFAULT_ANALYZER_PARAMS = {
+        'min_interaction_frames': 4,
+        'max_gap_frames': 20,
+        'max_class_change_frames': 6,
+        'proximity_threshold': 40
+    }
+
+    DEFAULT_CLIP_PARAMS = {
+        'margin_frames': 10,
+        'fps': None
+    }
+
+    FILE_STORAGE_WORKERS = 4
+
     def __init__(self, model_path: str, segmenter_path: str):
         self.model_path = model_path
         self.segmenter_path = segmenter_path
 
-    def process(self, video_path: str, experiment_id: int) -> Dict:
+    def process(self, video_path: str, experiment_id: int,
+                progress_callback: Optional[Callable[[str, Optional[int], Optional[int]], None]] = None,
+                analyzer_params: Optional[Dict] = None) -> Dict:
+        analyzer_params = {**self.DEFAULT_ANALYZER_PARAMS, **(analyzer_params or {})}
         try:
             logger.info(f"Iniciando procesamiento para experimento {experiment_id}")
             
@@ -28,14 +50,21 @@ class VideoProcessingService:
             workdir = self._prepare_workspace(video_path, experiment_id)
             
             # 2. Ejecutar pipeline
-            pipeline_result = self._execute_behavior_pipeline(video_path, workdir)
+            pipeline_result = self._execute_behavior_pipeline(
+                video_path, workdir, analyzer_params, progress_callback
+            )
             
             # 3. Procesar resultados y crear registros
-            result = self._process_pipeline_results(
-                pipeline_result, 
-                video_path, 
-                experiment_id
-            )
+            if progress_callback is not None:
+                progress_callback('persist', None, None)
+            with PIPELINE_STAGE_DURATION.labels(stage='persist').time():
+                result = self._process_pipeline_results(
+                    pipeline_result, 
+                    video_path, 
+                    experiment_id
+                )
+                self._save_kinematics(experiment_id, pipeline_result.get('kinematics'))
+            result['analyzer_params'] = analyzer_params
             
             logger.info(f"Procesamiento completado. {result['total_clips']} clips generados")
             return result
@@ -45,33 +74,24 @@ class VideoProcessingService:
             raise
 
     def _prepare_workspace(self, video_path: str, experiment_id: int) -> str:
-        base_dir = os.path.dirname(video_path)
-        workdir = os.path.join(base_dir, "processing", str(experiment_id))
-        os.makedirs(workdir, exist_ok=True)
-        return workdir
+        return ExperimentArtifacts(video_path, experiment_id).ensure_workdir()
 
-    def _execute_behavior_pipeline(self, video_path: str, workdir: str) -> Dict:
+    def _execute_behavior_pipeline(self, video_path: str, workdir: str, analyzer_params: Dict,
+                                   progress_callback: Optional[Callable] = None) -> Dict:
         from core.services.video_behavior_pipeline import VideoProcessingPipeline
         
         pipeline = VideoProcessingPipeline(
             model_path=self.model_path,
             workdir=workdir,
             segmenter_model_path=self.segmenter_path,
-            analyzer_params={
-                'min_interaction_frames': 4,
-                'max_gap_frames': 20,
-                'max_class_change_frames': 6,
-                'proximity_threshold': 40
-            },
-            clip_params={
-                'margin_frames': 10,
-                'fps': None
-            },
+            analyzer_params=analyzer_params,
+            clip_params=self.DEFAULT_CLIP_PARAMS,
             segmenter_params={
                 'frame_index': 20,
                 'confidence': 0.3,
                 'max_objects': 2
-            }
+            },
+            progress_callback=progress_callback
         )
         
         return pipeline.run(
@@ -83,18 +103,47 @@ class VideoProcessingService:
         )
 
     def _process_pipeline_results(self, result: Dict, video_path: str, experiment_id: int) -> Dict:
+        """Registra todos los clips del experimento con un número constante de consultas"""
+        Clip = apps.get_model('core', 'Clip')
         fps = self._get_video_fps(video_path)
-        clips_metadata = []
-        
-        for clip_path, episode in zip(result['generated_clips'], result['episodes']):
-            clip_meta = self._process_single_clip(
-                clip_path=clip_path,
-                episode=episode,
-                fps=fps,
-                experiment_id=experiment_id
-            )
-            clips_metadata.append(clip_meta)
-        
+        episodes = result['episodes']
+        clip_paths = result['generated_clips']
+        thumbnails = result.get('clip_thumbnails') or [{}] * len(clip_paths)
+
+        metadata = [self._extract_clip_metadata(episode, fps) for episode in episodes[:len(clip_paths)]]
+        objects_by_reference = self._resolve_experiment_objects(
+            experiment_id,
+            {self._extract_object_reference(meta['object_roi']) for meta in metadata}
+        )
+        behavior_ids = self._behavior_ids()
+        stored_files = self._store_clip_files(clip_paths, thumbnails, experiment_id)
+
+        clips = []
+        for meta, (saved_path, stored_thumbnails) in zip(metadata, stored_files):
+            reference = self._extract_object_reference(meta['object_roi'])
+            clips.append(Clip(
+                experiment_id=experiment_id,
+                experiment_object_id=objects_by_reference[reference],
+                behavior_id=self._resolve_behavior_id(behavior_ids, meta['behavior_class']),
+                video_clip=saved_path,
+                start_time=meta['start_time'],
+                end_time=meta['end_time'],
+                # bulk_create no pasa por Clip.save: se replica su cálculo de la duración
+                duration=round(meta['end_time'] - meta['start_time'], 2),
+                valid=True,
+                poster=stored_thumbnails['poster'] or '',
+                sprite=stored_thumbnails['sprite'] or '',
+                sprite_frames=stored_thumbnails['sprite_frames']
+            ))
+
+        with transaction.atomic():
+            created = Clip.objects.bulk_create(clips)
+            ExplorationTotalsService.clips_added(created)
+
+        clips_metadata = [
+            {'clip_id': clip.id, 'path': saved_path, **meta}
+            for clip, meta, (saved_path, _) in zip(created, metadata, stored_files)
+        ]
         return {
             'experiment_id': experiment_id,
             'total_clips': len(clips_metadata),
@@ -102,28 +151,53 @@ class VideoProcessingService:
             'clips': clips_metadata
         }
 
+    def _save_kinematics(self, experiment_id: int, summary: Optional[Dict]):
+        if not summary:
+            return None
+        ExperimentKinematics = apps.get_model('core', 'ExperimentKinematics')
+        kinematics, _ = ExperimentKinematics.objects.update_or_create(
+            experiment_id=experiment_id,
+            defaults={
+                'units': summary['units'],
+                'distance_travelled': summary['distance_travelled'],
+                'mean_speed': summary['mean_speed'],
+                'max_speed': summary['max_speed'],
+                'body_length': summary['body_length_median'],
+                'immobility_time': summary['immobility']['total_seconds'],
+                'immobility_bouts': summary['immobility']['bouts'],
+                'summary': summary
+            }
+        )
+        return kinematics
+
     def _get_video_fps(self, video_path: str) -> float:
         cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
         cap.release()
         return float(fps)
 
-    def _process_single_clip(self, clip_path: str, episode: Dict, fps: float, experiment_id: int) -> Dict:
-        saved_path = self._store_clip_file(clip_path, experiment_id)
-        metadata = self._extract_clip_metadata(episode, fps)
-        
-        clip_id = self._create_clip_record(
-            experiment_id=experiment_id,
-            clip_path=saved_path,
-            metadata=metadata,
-            behavior_id=episode.get('class_id')
-        )
-        
-        return {
-            'clip_id': clip_id,
-            'path': saved_path,
-            **metadata
-        }
+    def _store_clip_files(self, clip_paths: List[str], thumbnails: List[Dict],
+                          experiment_id: int) -> List[Tuple[str, Dict]]:
+        """Copia clips, pósters y sprites al storage en paralelo (la copia es de E/S, no de CPU)"""
+        if not clip_paths:
+            return []
+        workers = min(self.FILE_STORAGE_WORKERS, len(clip_paths))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda args: (self._store_clip_file(args[0], experiment_id),
+                              self._store_thumbnails(args[1] or {}, experiment_id)),
+                zip(clip_paths, thumbnails)
+            ))
+
+    def _store_thumbnails(self, thumbnails: Dict, experiment_id: int) -> Dict:
+        """Guarda póster y sprite sheet del clip en el mismo directorio que el video"""
+        stored = {'poster': None, 'sprite': None, 'sprite_frames': 0}
+        if thumbnails.get('poster') and os.path.exists(thumbnails['poster']):
+            stored['poster'] = self._store_clip_file(thumbnails['poster'], experiment_id)
+        if thumbnails.get('sprite') and os.path.exists(thumbnails['sprite']):
+            stored['sprite'] = self._store_clip_file(thumbnails['sprite'], experiment_id)
+            stored['sprite_frames'] = thumbnails.get('sprite_frames', 0)
+        return stored
 
     def _store_clip_file(self, clip_path: str, experiment_id: int) -> str:
         filename = os.path.basename(clip_path)
@@ -133,10 +207,44 @@ class VideoProcessingService:
             "clips",
             filename
         )
-        
+
+        moved = self._move_into_storage(clip_path, storage_path)
+        if moved:
+            return moved
+
         with open(clip_path, 'rb') as f:
             return default_storage.save(storage_path, File(f))
 
+    def _move_into_storage(self, source_path: str, storage_path: str) -> Optional[str]:
+        """Mueve el archivo al storage local (enlace duro + borrado del origen) sin reescribir sus bytes.
+
+        El origen se borra en cuanto existe el enlace: si el workdir conservara el mismo inode,
+        una reextracción con el mismo nombre truncaría el archivo ya guardado.
+        Devuelve None si el storage no es local o está en otro sistema de archivos; en ese
+        caso se copia por streaming con default_storage.save.
+        """
+        if not isinstance(default_storage, FileSystemStorage):
+            return None
+
+        while True:
+            name = default_storage.get_available_name(storage_path)
+            target = default_storage.path(name)
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.link(source_path, target)
+            except FileExistsError:
+                # Otro hilo ocupó el mismo nombre entre get_available_name y el enlace
+                continue
+            except OSError as e:
+                logger.debug(f"No se pudo enlazar {source_path} en el storage ({e}), se copiará")
+                return None
+            break
+
+        os.unlink(source_path)
+        if default_storage.file_permissions_mode is not None:
+            os.chmod(target, default_storage.file_permissions_mode)
+        return name.replace('\\', '/')
+
     def _extract_clip_metadata(self, episode: Dict, fps: float) -> Dict:
         def frames_to_seconds(frames):
             return round(float(frames) / fps, 3)
@@ -152,32 +260,6 @@ class VideoProcessingService:
             'behavior_class': episode.get('class_id')
         }
 
-    def _create_clip_record(self, experiment_id: int, clip_path: str, metadata: Dict, behavior_id: Optional[int]) -> int:
-        Clip = apps.get_model('core', 'Clip')
-        Behavior = apps.get_model('core', 'Behavior')
-        ExperimentObject = apps.get_model('core', 'ExperimentObject')
-        
-        object_ref = self._extract_object_reference(metadata['object_roi'])
-        experiment_object = self._get_or_create_experiment_object(
-            experiment_id=experiment_id,
-            reference=object_ref
-        )
-        
-        behavior = self._get_behavior(behavior_id)
-        
-        clip = Clip.objects.create(
-            experiment_id=experiment_id,
-            experiment_object_id=experiment_object.id,
-            behavior_id=behavior.id if behavior else None,
-            video_clip=clip_path,
-            start_time=metadata['start_time'],
-            end_time=metadata['end_time'],
-            duration=metadata['duration'],
-            valid=True
-        )
-        
-        return clip.id
-
     def _extract_object_reference(self, roi_name: str) -> int:
         try:
             return int(roi_name.split('_')[-1])
@@ -185,6 +267,17 @@ class VideoProcessingService:
             logger.warning(f"Formato de ROI inválido: {roi_name}, usando default 1")
             return 1
 
+    def _resolve_experiment_objects(self, experiment_id: int, references: Set[int]) -> Dict[int, int]:
+        """ID de ExperimentObject por referencia; solo se crean los objetos que aún no existen"""
+        ExperimentObject = apps.get_model('core', 'ExperimentObject')
+
+        objects_by_reference = dict(
+            ExperimentObject.objects.filter(experiment_id=experiment_id).values_list('reference', 'id')
+        )
+        for reference in sorted(references - set(objects_by_reference)):
+            objects_by_reference[reference] = self._get_or_create_experiment_object(experiment_id, reference).id
+        return objects_by_reference
+
     def _get_or_create_experiment_object(self, experiment_id: int, reference: int):
         ExperimentObject = apps.get_model('core', 'ExperimentObject')
         
@@ -204,14 +297,26 @@ class VideoProcessingService:
                 time=0.0
             )
 
-    def _get_behavior(self, class_id: Optional[int]):
+    def _behavior_ids(self) -> Dict[Optional[int], Optional[int]]:
+        """ID de Behavior por class_id (None = comportamiento por defecto) con una sola consulta"""
         Behavior = apps.get_model('core', 'Behavior')
-        
+
+        behaviors = list(Behavior.objects.values_list('id', 'name', 'class_id'))
+        default_id = behaviors[0][0] if behaviors else None
+        by_name, by_class = {}, {}
+        for behavior_id, name, class_id in behaviors:
+            by_name.setdefault(name.lower(), behavior_id)
+            by_class.setdefault(class_id, behavior_id)
+
+        behavior_ids = {None: default_id}
+        for class_id, behavior_name in self.BEHAVIOR_MAPPING.items():
+            # Los nombres sembrados llevan tilde ("Exploración"): si el nombre no coincide se usa class_id
+            behavior_ids[class_id] = by_name.get(behavior_name.lower(), by_class.get(class_id))
+        return behavior_ids
+
+    @staticmethod
+    def _resolve_behavior_id(behavior_ids: Dict[Optional[int], Optional[int]],
+                             class_id: Optional[int]) -> Optional[int]:
         if class_id is None:
-            return Behavior.objects.first()
-            
-        behavior_name = self.BEHAVIOR_MAPPING.get(int(class_id))
-        if behavior_name:
-            return Behavior.objects.filter(name__iexact=behavior_name).first()
-        
-        return Behavior.objects.first()
\ No newline at end of file
+            return behavior_ids[None]
+        return behavior_ids.get(int(class_id), behavior_ids[None])
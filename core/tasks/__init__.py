@@ -1,5 +1,9 @@
-from .experiment_tasks import process_experiment_task  # noqa
+from .experiment_tasks import process_experiment_task, reanalyze_experiment_task  # noqa
+from .file_gc_tasks import process_file_deletions_task, sweep_orphan_files_task  # noqa
 
 __all__ = [
-    'process_experiment_task'
-]
\ No newline at end of file
+    'process_experiment_task',
+    'reanalyze_experiment_task',
+    'process_file_deletions_task',
+    'sweep_orphan_files_task'
+]
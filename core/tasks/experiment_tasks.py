@@ -2,6 +2,7 @@ from celery import shared_task
 from django.apps import apps
 import logging
 from infrastructure.storage.docker_volume_storage import DockerVolumeStorage
+from infrastructure.progress import RedisProgressPublisher
 from core.services.experiment_service import ExperimentService
 
 logger = logging.getLogger(__name__)
@@ -13,7 +14,8 @@ def process_experiment_task(self, experiment_id):
         
         service = ExperimentService(
             file_storage=DockerVolumeStorage(),
-            video_processor=None  # No se necesita para el procesamiento real
+            video_processor=None,  # No se necesita para el procesamiento real
+            progress_publisher=RedisProgressPublisher()
         )
         
         result = service.process_experiment(experiment_id)
@@ -22,4 +24,27 @@ def process_experiment_task(self, experiment_id):
         
     except Exception as e:
         logger.error(f"Error procesando experimento {experiment_id}: {str(e)}")
-        self.retry(exc=e, countdown=60)
\ No newline at end of file
+        self.retry(exc=e, countdown=60)
+
+@shared_task(name="reanalyze_experiment_task", bind=True, max_retries=1)
+def reanalyze_experiment_task(self, experiment_id, analyzer_params):
+    try:
+        logger.info(f"Iniciando re-análisis para experimento {experiment_id}")
+        
+        service = ExperimentService(
+            file_storage=DockerVolumeStorage(),
+            video_processor=None,
+            progress_publisher=RedisProgressPublisher()
+        )
+        
+        result = service.reanalyze_experiment(experiment_id, analyzer_params)
+        logger.info(f"Re-análisis completado para experimento {experiment_id}")
+        return result
+        
+    except ValueError as e:
+        # Sin predicciones guardadas: reintentar no sirve
+        logger.error(f"Re-análisis imposible para experimento {experiment_id}: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Error re-analizando experimento {experiment_id}: {str(e)}")
+        self.retry(exc=e, countdown=30)
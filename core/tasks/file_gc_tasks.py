@@ -0,0 +1,33 @@
+from celery import shared_task
+import logging
+from core.services.file_gc import FileGarbageCollector
+
+logger = logging.getLogger(__name__)
+
+@shared_task(name="process_file_deletions_task", bind=True, max_retries=3)
+def process_file_deletions_task(self):
+    """Borra un lote de archivos pendientes y se re-encola mientras queden más"""
+    try:
+        result = FileGarbageCollector().process_pending()
+    except Exception as e:
+        logger.error(f"Error en el GC de archivos: {str(e)}")
+        raise self.retry(exc=e, countdown=60)
+
+    logger.info(f"GC de archivos: {result['deleted']} borrados, {result['failed']} fallidos")
+    if result['remaining']:
+        process_file_deletions_task.delay()
+    return result
+
+@shared_task(name="sweep_orphan_files_task")
+def sweep_orphan_files_task():
+    """Barrido periódico: clips huérfanos, workdirs obsoletos y retención por tamaño"""
+    collector = FileGarbageCollector()
+    result = {
+        'orphan_clip_files': collector.sweep_orphan_clip_files(),
+        'stale_workdirs': collector.sweep_stale_workdirs(),
+        'freed_bytes': collector.enforce_workdir_retention()
+    }
+    # Los borrados encolados por el barrido los procesa la tarea por lotes
+    process_file_deletions_task.delay()
+    logger.info(f"Barrido de GC completado: {result}")
+    return result
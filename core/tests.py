@@ -1,3 +1,893 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from math import sqrt
+import numpy as np
+import pandas as pd
+from io import StringIO
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from core.models import Experiment, ExperimentObject, Clip, Behavior, PendingFileDeletion
+from core.services.exploration_totals import ExplorationTotalsService
+from core.services.clip_review import ClipReviewService
+from core.services.experiment_status import ExperimentStatusService
+from core.services.file_gc import FileGarbageCollector
+from core.services.synthetic_data import SyntheticDataGenerator
+from core.services.experiment_artifacts import ExperimentArtifacts
+from core.services.ethogram import Ethogram, EthogramService
+from core.services.pipeline_benchmark import PipelineBenchmark
+from core.services.video_processing import VideoProcessingService
+from core.services.reanalysis_service import ReanalysisService
+from core.services.trajectory_store import TrajectoryStore
+from core.services.downsampling import lttb
+from core.services.roi_distance_field import ROIDistanceField
+from core.services.interaction_engine import InteractionEngine, KEYPOINT_NAMES
+from core.services.timecourse import ExplorationTimeCourse
+from core.services.kinematics import KinematicsAnalyzer
+from core.services.experiment_service import ExperimentService
+from core.services.heatmaps import HeatmapService
+from interfaces.progress import ProgressPublisher
 
-# Create your tests here.
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class ExplorationTotalsTests(TestCase):
+    """Los totales guardados coinciden siempre con la suma de los clips de exploración válidos"""
+
+    def setUp(self):
+        self.experiment = Experiment.objects.create(
+            name="Totales", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/videos/totales.mp4", status='COM'
+        )
+        self.objects = [
+            ExperimentObject.objects.create(
+                experiment_id=self.experiment.id, reference=reference, name=f"Objeto {reference}"
+            )
+            for reference in (1, 2)
+        ]
+        behaviors = list(Behavior.objects.all())
+        clips = Clip.objects.bulk_create([
+            Clip(
+                experiment_id=self.experiment.id,
+                experiment_object_id=self.objects[i % 2].id,
+                behavior_id=behaviors[i % len(behaviors)].id,
+                video_clip=f"experiments/{self.experiment.id}/clips/clip_{i}.mp4",
+                start_time=float(i), end_time=i + 0.25 * (i % 5 + 1), duration=0.25 * (i % 5 + 1)
+            )
+            for i in range(30)
+        ])
+        ExplorationTotalsService.clips_added(clips)
+
+    def expected_totals(self):
+        exploration_ids = ExplorationTotalsService.exploration_behavior_ids()
+        clips = [
+            clip for clip in Clip.objects.filter(experiment_id=self.experiment.id, valid=True)
+            if clip.behavior_id in exploration_ids
+        ]
+        by_object = {
+            obj.id: sum(c.duration for c in clips if c.experiment_object_id == obj.id) for obj in self.objects
+        }
+        return by_object, sum(c.duration for c in clips)
+
+    def assertTotalsConsistent(self):
+        by_object, total = self.expected_totals()
+        for obj in ExperimentObject.objects.filter(experiment_id=self.experiment.id):
+            self.assertAlmostEqual(obj.time, by_object[obj.id])
+        self.experiment.refresh_from_db()
+        self.assertAlmostEqual(self.experiment.exploration_time, total)
+        self.assertGreater(total, 0)
+
+    def test_added_clips(self):
+        self.assertTotalsConsistent()
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_delete_clips_refreshes_cached_status(self):
+        service = ExperimentStatusService()
+        self.assertEqual(service.get_status(self.experiment.id)['clips_count'], 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            ExplorationTotalsService.delete_clips(Clip.objects.filter(experiment_id=self.experiment.id, start_time__lt=5))
+        self.assertEqual(service.get_status(self.experiment.id)['clips_count'], 25)
+
+    def test_delete_clips(self):
+        deleted = ExplorationTotalsService.delete_clips(
+            Clip.objects.filter(experiment_id=self.experiment.id, start_time__lt=10)
+        )
+        self.assertEqual(deleted, 10)
+        self.assertTotalsConsistent()
+
+    def test_review_validity(self):
+        review = ClipReviewService()
+        clips = Clip.objects.filter(experiment_id=self.experiment.id, start_time__lt=12)
+        invalidate = [{'clip_id': clip_id, 'valid': False} for clip_id in clips.values_list('id', flat=True)]
+        self.assertEqual(review.review(self.experiment.id, invalidate)['updated_clips'], 12)
+        self.assertTotalsConsistent()
+        # Invalidar dos veces no descuenta dos veces
+        self.assertEqual(review.review(self.experiment.id, invalidate)['updated_clips'], 0)
+        self.assertTotalsConsistent()
+        review.review(self.experiment.id, [
+            {'clip_id': clip_id, 'valid': True}
+            for clip_id in clips.filter(start_time__lt=5).values_list('id', flat=True)
+        ])
+        self.assertTotalsConsistent()
+
+    def test_rebuild_command(self):
+        ExperimentObject.objects.update(time=123.0)
+        Experiment.objects.update(exploration_time=0.0)
+        call_command('rebuild_exploration_totals', stdout=StringIO())
+        self.assertTotalsConsistent()
+
+
+class FileGarbageCollectorTests(TestCase):
+    """Los archivos de clips borrados se encolan con el borrado y el GC los elimina en lotes"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.experiment = Experiment.objects.create(
+            name="GC", mouse_name="Ratón 1", date="2025-01-01",
+            video_file="experiments/gc.mp4", status='COM'
+        )
+        self.clips = []
+        for i in range(3):
+            name = default_storage.save(f"experiments/{self.experiment.id}/clips/clip_{i}.mp4", ContentFile(b"x"))
+            poster = default_storage.save(
+                f"experiments/{self.experiment.id}/clips/clip_{i}_poster.jpg", ContentFile(b"y")
+            )
+            self.clips.append(Clip.objects.create(
+                experiment_id=self.experiment.id, video_clip=name, poster=poster,
+                start_time=float(i), end_time=i + 1.0, duration=1.0
+            ))
+
+    def test_deleted_clip_files_are_collected(self):
+        ExplorationTotalsService.delete_clips(Clip.objects.filter(id__in=[c.id for c in self.clips[:2]]))
+        self.assertEqual(PendingFileDeletion.objects.count(), 4)
+        # Los archivos siguen ahí hasta que corre el GC
+        self.assertTrue(default_storage.exists(self.clips[0].video_clip.name))
+
+        result = FileGarbageCollector(batch_size=3).process_pending()
+        self.assertEqual(result, {'deleted': 3, 'failed': 0, 'remaining': True})
+        FileGarbageCollector(batch_size=3).process_pending()
+
+        self.assertFalse(PendingFileDeletion.objects.exists())
+        for clip in self.clips[:2]:
+            self.assertFalse(default_storage.exists(clip.video_clip.name))
+            self.assertFalse(default_storage.exists(clip.poster.name))
+        self.assertTrue(default_storage.exists(self.clips[2].video_clip.name))
+
+    def test_referenced_names_are_not_deleted(self):
+        FileGarbageCollector.enqueue([self.clips[2].video_clip.name])
+        FileGarbageCollector().process_pending()
+        self.assertTrue(default_storage.exists(self.clips[2].video_clip.name))
+        self.assertFalse(PendingFileDeletion.objects.exists())
+
+    def test_sweeps_orphans_and_stale_workdirs(self):
+        orphan = default_storage.save(f"experiments/{self.experiment.id}/clips/huerfano.mp4", ContentFile(b"z"))
+        stale_workdir = os.path.join(self.media, "experiments", "processing", "999999")
+        live_workdir = os.path.join(self.media, "experiments", "processing", str(self.experiment.id))
+        for workdir in (stale_workdir, live_workdir):
+            os.makedirs(workdir)
+
+        collector = FileGarbageCollector(grace_seconds=0)
+        self.assertEqual(collector.sweep_orphan_clip_files(), 1)
+        self.assertEqual(collector.sweep_stale_workdirs(), 1)
+        # Un segundo barrido no vuelve a encolar lo pendiente
+        self.assertEqual(collector.sweep_orphan_clip_files(), 0)
+        collector.process_pending()
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertFalse(os.path.exists(stale_workdir))
+        self.assertTrue(os.path.exists(live_workdir))
+        self.assertTrue(all(default_storage.exists(c.video_clip.name) for c in self.clips))
+
+    def test_workdir_retention_keeps_trajectory(self):
+        workdir = os.path.join(self.media, "experiments", "processing", str(self.experiment.id))
+        os.makedirs(os.path.join(workdir, "clips"))
+        for name, size in (("predictions.trj", 100), ("predictions.csv", 900), ("clips/c.mp4", 2000)):
+            with open(os.path.join(workdir, name), 'wb') as f:
+                f.write(b"0" * size)
+
+        freed = FileGarbageCollector(max_workdir_bytes=1500).enforce_workdir_retention()
+        self.assertEqual(freed, 2000)
+        self.assertFalse(os.path.exists(os.path.join(workdir, "clips")))
+        self.assertTrue(os.path.exists(os.path.join(workdir, "predictions.csv")))
+        self.assertTrue(os.path.exists(os.path.join(workdir, "predictions.trj")))
+
+
+class SyntheticDataGeneratorTests(TestCase):
+    """Los datos sintéticos llegan con totales coherentes y artefactos de análisis utilizables"""
+
+    def test_totals_match_rebuild(self):
+        counts = SyntheticDataGenerator(seed=1, batch_size=3).create_experiments(4, clips_per_object=6)
+        self.assertEqual(counts, {'experiments': 4, 'objects': 8, 'clips': 48})
+
+        stored = dict(Experiment.objects.values_list('id', 'exploration_time'))
+        objects = dict(ExperimentObject.objects.values_list('id', 'time'))
+        ExplorationTotalsService.rebuild()
+        for experiment_id, total in Experiment.objects.values_list('id', 'exploration_time'):
+            self.assertAlmostEqual(stored[experiment_id], total, delta=0.01)
+        for object_id, total in ExperimentObject.objects.values_list('id', 'time'):
+            self.assertAlmostEqual(objects[object_id], total, delta=0.01)
+
+    def test_command_with_media_and_extra_behaviors(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            call_command(
+                'generate_synthetic_data', experiments=2, clips_per_object=3, behaviors=6, media=True, stdout=StringIO()
+            )
+            clips = list(Clip.objects.values_list('video_clip', 'poster', 'behavior_id'))
+            self.assertEqual(len(clips), 12)
+            for video_clip, poster, _ in clips:
+                self.assertTrue(default_storage.exists(video_clip))
+                self.assertTrue(default_storage.exists(poster))
+            for experiment in Experiment.objects.all():
+                self.assertTrue(default_storage.exists(experiment.video_file.name))
+        self.assertEqual(Behavior.objects.count(), 6)
+        self.assertTrue({behavior_id for _, _, behavior_id in clips} <= set(Behavior.objects.values_list('id', flat=True)))
+
+    def test_analysis_experiment(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media):
+            experiment = SyntheticDataGenerator().create_analysis_experiment(frames=900, clips_per_object=3)
+            artifacts = ExperimentArtifacts.for_experiment(experiment)
+            self.assertTrue(artifacts.has_predictions())
+            data = EthogramService().build(experiment)
+        self.assertEqual(experiment.status, 'COM')
+        self.assertAlmostEqual(sum(data['totals'].values()), 30.0, places=1)
+
+
+class PipelineBenchmarkTests(TestCase):
+    """El video sintético con el modelo de sustitución recorre el pipeline completo"""
+
+    def test_stub_configuration(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        result = PipelineBenchmark(workdir).run_configuration(seconds=4, width=160, height=120)
+        self.assertEqual(result['frames'], 120)
+        self.assertGreater(result['episodes'], 0)
+        self.assertEqual(result['clips'], result['episodes'])
+        self.assertGreater(result['stages']['keypoints'], 0)
+
+
+class ClipStorageTests(TestCase):
+    """Los archivos guardados no comparten inode con el directorio de trabajo"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media, CACHES=LOCMEM_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_stored_clip_survives_rewrite_of_workdir_path(self):
+        source = os.path.join(self.media, 'processing', 'clips', 'clip_0_class_0.0_roi_objeto_1.mp4')
+        os.makedirs(os.path.dirname(source))
+        with open(source, 'wb') as f:
+            f.write(b'original')
+
+        name = VideoProcessingService('', '')._store_clip_file(source, 7)
+        self.assertFalse(os.path.exists(source))
+        with open(source, 'wb') as f:
+            f.write(b'otro clip')
+        with default_storage.open(name) as f:
+            self.assertEqual(f.read(), b'original')
+
+    def test_reanalysis_keeps_stored_clip_files(self):
+        experiment = SyntheticDataGenerator(seed=3).create_analysis_experiment(frames=900, clips_per_object=1)
+        service = ReanalysisService(VideoProcessingService('', ''))
+        service.reanalyze(experiment.id, {'min_interaction_frames': 4})
+
+        def stored_files():
+            files = {}
+            for clip in Clip.objects.filter(experiment_id=experiment.id).exclude(video_clip=''):
+                for field in (clip.video_clip, clip.poster, clip.sprite):
+                    if field and default_storage.exists(field.name):
+                        with default_storage.open(field.name) as f:
+                            files[field.name] = f.read()
+            return files
+
+        before = stored_files()
+        self.assertTrue(before)
+        service.reanalyze(experiment.id, {'min_interaction_frames': 8})
+        after = stored_files()
+        self.assertTrue(set(before) & set(after))
+        for name in set(before) & set(after):
+            self.assertEqual(before[name], after[name], name)
+        for name in after:
+            self.assertEqual(os.stat(default_storage.path(name)).st_nlink, 1, name)
+        artifacts = ExperimentArtifacts.for_experiment(experiment)
+        self.assertFalse([entry for entry in os.listdir(artifacts.workdir) if entry.startswith('reanalysis_')])
+
+
+class TrajectoryStoreTests(TestCase):
+    """El almacén compacto devuelve las predicciones del CSV con la precisión del punto fijo"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        df = SyntheticDataGenerator(seed=2).predictions(600)
+        # Frames duplicados (con otros valores) y desordenados, como en un CSV concatenado
+        duplicates = df.iloc[[10, 20, 30]].assign(class_id=3.0, nariz_x=1.0)
+        self.source = pd.concat([df, duplicates]).sample(frac=1.0, random_state=0).reset_index(drop=True)
+        self.expected = self.source.drop_duplicates('frame', keep='first').sort_values('frame').reset_index(drop=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def assertMatchesSource(self, store):
+        result = store.to_dataframe()
+        self.assertEqual(list(result.columns), list(self.expected.columns))
+        np.testing.assert_array_equal(result['frame'], self.expected['frame'])
+        for column in self.expected.columns:
+            expected, actual = self.expected[column].to_numpy(float), result[column].to_numpy(float)
+            np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected), err_msg=column)
+            if column in ('confidence',) or column.endswith('_v'):
+                tolerance = 0.5 / 254 + 1e-6
+            else:
+                tolerance = 0.5 / store.scale + 1e-6
+            np.testing.assert_allclose(actual, expected, atol=tolerance, equal_nan=True, err_msg=column)
+
+    def test_write_open_round_trip(self):
+        TrajectoryStore.write(self.source, self.path('predicciones.trj'), fps=29.97)
+        store = TrajectoryStore.open(self.path('predicciones.trj'))
+        self.assertEqual(len(store), 600)
+        self.assertEqual(store.fps, 29.97)
+        self.assertTrue(self.expected['class_id'].isna().any())
+        self.assertMatchesSource(store)
+
+        i, j = store.frame_range(100, 200)
+        pd.testing.assert_frame_equal(
+            store.to_dataframe(100, 200).reset_index(drop=True),
+            store.to_dataframe().iloc[i:j].reset_index(drop=True)
+        )
+
+    def test_from_csv(self):
+        self.source.to_csv(self.path('predictions.csv'), index=False)
+        TrajectoryStore.from_csv(self.path('predictions.csv'), self.path('desde_csv.trj'), fps=30.0)
+        store = TrajectoryStore.open(self.path('desde_csv.trj'))
+        self.assertEqual(store.fps, 30.0)
+        self.assertMatchesSource(store)
+
+    def test_large_coordinates_round_trip(self):
+        # Un valor fuera del rango de int16 con escala 1 obliga a una escala < 1
+        frame = self.source.index[self.source['frame'] == 50][0]
+        self.source.loc[frame, ['nariz_x', 'bbox_w']] = [40000.0, -33000.5]
+        self.expected = self.source.drop_duplicates('frame', keep='first').sort_values('frame').reset_index(drop=True)
+
+        TrajectoryStore.write(self.source, self.path('grande.trj'))
+        store = TrajectoryStore.open(self.path('grande.trj'))
+        self.assertEqual(store.scale, 0.5)
+        self.assertMatchesSource(store)
+        self.assertAlmostEqual(store.to_dataframe(50, 51)['nariz_x'].iloc[0], 40000.0, delta=1.0)
+
+
+class LTTBTests(TestCase):
+    """lttb conserva los extremos de la serie y devuelve exactamente los puntos pedidos"""
+
+    def setUp(self):
+        t = np.arange(5000, dtype=float)
+        self.points = np.stack([t, np.sin(t / 50.0) + np.random.default_rng(0).normal(0, 0.05, len(t))], axis=1)
+
+    def test_keeps_first_and_last_and_threshold(self):
+        for n_out in (3, 10, 999, 4999):
+            selected = lttb(self.points, n_out)
+            self.assertEqual(len(selected), n_out)
+            self.assertEqual(selected[0], 0)
+            self.assertEqual(selected[-1], len(self.points) - 1)
+            self.assertTrue(np.all(np.diff(selected) > 0))
+
+    def test_short_input_unchanged(self):
+        np.testing.assert_array_equal(lttb(self.points[:50], 100), np.arange(50))
+        np.testing.assert_array_equal(lttb(self.points[:50], 50), np.arange(50))
+
+    def test_keeps_isolated_peak(self):
+        points = self.points.copy()
+        points[2345, 1] = 25.0
+        self.assertIn(2345, lttb(points, 100))
+
+
+class EthogramMergeTests(TestCase):
+    """Codificación por tramos del etograma y fusión de tramos cortos"""
+
+    @staticmethod
+    def runs(ethogram):
+        return list(zip(ethogram.starts.tolist(), ethogram.ends.tolist(), ethogram.classes.tolist()))
+
+    def ethogram(self, runs):
+        frames = np.concatenate([np.arange(start, end) for start, end, _ in runs])
+        classes = np.concatenate([np.full(end - start, class_id, dtype=float) for start, end, class_id in runs])
+        return Ethogram.from_frames(frames, classes, fps=10.0)
+
+    def test_from_frames_cuts_on_gaps_and_missing_detections(self):
+        frames = np.array([0, 1, 2, 3, 6, 7, 8])
+        classes = np.array([0, 0, np.nan, np.nan, 0, 0, 1])
+        self.assertEqual(
+            self.runs(Ethogram.from_frames(frames, classes, fps=10.0)),
+            [(0, 2, 0), (2, 4, Ethogram.NO_DETECTION), (6, 8, 0), (8, 9, 1)]
+        )
+
+    def test_short_runs_are_absorbed_by_previous_long_run(self):
+        ethogram = self.ethogram([(0, 10, 0), (10, 12, 1), (12, 20, 0), (20, 30, 2)])
+        self.assertEqual(self.runs(ethogram.merge_short(5)), [(0, 20, 0), (20, 30, 2)])
+        # Sin resolución solo se unen vecinos iguales
+        self.assertEqual(len(ethogram.merge_short(0)), 4)
+
+    def test_short_first_run_joins_next_long_run(self):
+        ethogram = self.ethogram([(0, 2, 1), (2, 20, 0)])
+        self.assertEqual(self.runs(ethogram.merge_short(5)), [(0, 20, 0)])
+
+    def test_gap_between_equal_runs_is_bridged(self):
+        ethogram = self.ethogram([(0, 10, 0), (15, 25, 0), (25, 40, 3)])
+        self.assertEqual(len(ethogram), 3)
+        self.assertEqual(self.runs(ethogram.merge_short(3)), [(0, 25, 0), (25, 40, 3)])
+        # Los totales salen de los frames reales, no de los tramos fusionados
+        self.assertEqual(ethogram.totals(), {0: 2.0, 3: 1.5})
+
+    def test_no_long_run_keeps_dominant_class(self):
+        ethogram = self.ethogram([(0, 2, 1), (2, 6, 0), (6, 7, 1)])
+        self.assertEqual(self.runs(ethogram.merge_short(10)), [(0, 7, 0)])
+
+    def test_empty(self):
+        ethogram = Ethogram.from_frames(np.array([]), np.array([]), fps=10.0)
+        self.assertEqual(len(ethogram), 0)
+        self.assertEqual(len(ethogram.merge_short(5)), 0)
+        self.assertEqual(len(ethogram.window(0, 100)), 0)
+        self.assertEqual(ethogram.totals(), {})
+        self.assertEqual(ethogram.to_dict(), {'start': [], 'end': [], 'class_id': []})
+
+
+def baseline_near_box(x, y, box, threshold):
+    """Criterio por punto del análisis original: dentro de la caja o a <= threshold de ella"""
+    if np.isnan(x) or np.isnan(y):
+        return False
+    if box['x1'] < x < box['x2'] and box['y1'] < y < box['y2']:
+        return True
+    closest_x = max(box['x1'], min(x, box['x2']))
+    closest_y = max(box['y1'], min(y, box['y2']))
+    return sqrt((x - closest_x) ** 2 + (y - closest_y) ** 2) <= threshold
+
+
+def baseline_box_distance(x, y, box):
+    closest_x = max(box['x1'], min(x, box['x2']))
+    closest_y = max(box['y1'], min(y, box['y2']))
+    return sqrt((x - closest_x) ** 2 + (y - closest_y) ** 2)
+
+
+def points_around(boxes, n, margin, seed=0, frame_size=(1280, 720)):
+    """Puntos concentrados alrededor de las cajas (dentro, en el borde y fuera), con NaN"""
+    rng = np.random.default_rng(seed)
+    box = [boxes[i] for i in rng.integers(len(boxes), size=n)]
+    x = np.array([rng.uniform(b['x1'] - margin, b['x2'] + margin) for b in box])
+    y = np.array([rng.uniform(b['y1'] - margin, b['y2'] + margin) for b in box])
+    # Algunos puntos exactamente sobre el borde y fuera del frame
+    x[:20] = [b['x1'] for b in box[:20]]
+    x[20:30] = -15.0
+    y[30:40] = frame_size[1] + 10.0
+    x[40:50] = np.nan
+    return x, y
+
+
+class ROIDistanceFieldTests(TestCase):
+    """El campo de distancias rasterizado coincide con la distancia geométrica original"""
+    BOX = {'x1': 200.0, 'y1': 120.0, 'x2': 330.0, 'y2': 230.0}
+
+    def setUp(self):
+        self.field = ROIDistanceField.from_box(*self.BOX.values(), 1280, 720)
+        self.x, self.y = points_around([self.BOX], 4000, margin=80)
+
+    def test_lookup_matches_box_distance_within_refine_band(self):
+        distances = self.field.lookup(self.x, self.y)
+        valid = np.isfinite(self.x) & np.isfinite(self.y)
+        self.assertTrue(np.all(np.isinf(distances[~valid])))
+        expected = np.array([baseline_box_distance(x, y, self.BOX) for x, y in zip(self.x[valid], self.y[valid])])
+        # El error de rasterizar no supera la banda que within() recalcula de forma exacta
+        np.testing.assert_allclose(distances[valid], expected, atol=ROIDistanceField.REFINE_BAND)
+
+    def test_refined_threshold_matches_exactly(self):
+        for threshold in (0, 10, 40, 55.5):
+            within = self.field.within(self.x, self.y, threshold)
+            expected = [baseline_near_box(x, y, self.BOX, threshold) for x, y in zip(self.x, self.y)]
+            np.testing.assert_array_equal(within, expected, err_msg=str(threshold))
+
+    def test_contains_matches_geometry(self):
+        contains = self.field.contains(self.x, self.y)
+        expected = [
+            bool(np.isfinite(x) and np.isfinite(y) and self.BOX['x1'] < x < self.BOX['x2'] and self.BOX['y1'] < y < self.BOX['y2'])
+            for x, y in zip(self.x, self.y)
+        ]
+        np.testing.assert_array_equal(contains, expected)
+
+    def test_polygon_distance_matches_shapely(self):
+        import shapely
+        polygon = [(600, 300), (760, 320), (700, 460), (590, 420)]
+        field = ROIDistanceField.from_polygon(polygon, 1280, 720)
+        rng = np.random.default_rng(1)
+        x, y = rng.uniform(520, 840, 3000), rng.uniform(220, 540, 3000)
+        exact = shapely.distance(shapely.Polygon(polygon), shapely.points(x, y))
+        np.testing.assert_allclose(field.lookup(x, y), exact, atol=ROIDistanceField.REFINE_BAND)
+        np.testing.assert_array_equal(field.within(x, y, 25), exact <= 25)
+
+
+class InteractionEngineTests(TestCase):
+    """Reglas por defecto frente al _detect_interactions original y cada opción de regla por separado"""
+
+    def test_default_rules_match_original_detection(self):
+        boxes = [dict(box) for box in SyntheticDataGenerator.ROI_BOXES]
+        rois = {
+            f"objeto_{i + 1}": {
+                'field': ROIDistanceField.from_box(box['x1'], box['y1'], box['x2'], box['y2'], 1280, 720),
+                'class_id': i,
+            }
+            for i, box in enumerate(boxes)
+        }
+        x, y = points_around(boxes, 3000, margin=70, seed=4)
+        df = pd.DataFrame({'frame': np.arange(len(x)), 'nariz_x': x, 'nariz_y': y})
+
+        masks = InteractionEngine(rois).evaluate(df, proximity_threshold=40)
+        for (roi_name, roi), box in zip(rois.items(), boxes):
+            if roi['class_id'] == 0:
+                expected = [baseline_near_box(px, py, box, 40) for px, py in zip(x, y)]
+            else:
+                expected = [
+                    bool(np.isfinite(px) and np.isfinite(py) and box['x1'] < px < box['x2'] and box['y1'] < py < box['y2'])
+                    for px, py in zip(x, y)
+                ]
+            self.assertTrue(any(expected), roi_name)
+            np.testing.assert_array_equal(masks[roi_name], expected, err_msg=roi_name)
+
+    # Opciones de regla: un objeto en (100, 100)-(200, 200) y otro de clase 1 en (250, 100)-(350, 200)
+
+    @staticmethod
+    def engine(pixels_per_cm=None):
+        return InteractionEngine({
+            'objeto_1': {'field': ROIDistanceField.from_box(100, 100, 200, 200, 400, 300), 'class_id': 0},
+            'objeto_2': {'field': ROIDistanceField.from_box(250, 100, 350, 200, 400, 300), 'class_id': 1},
+        }, pixels_per_cm=pixels_per_cm)
+
+    @staticmethod
+    def frames(*rows):
+        """Una fila por frame: {keypoint: (x, y, visibilidad)}"""
+        data = {'frame': np.arange(len(rows))}
+        for name in KEYPOINT_NAMES:
+            for c, suffix in enumerate(('x', 'y', 'v')):
+                data[f'{name}_{suffix}'] = [row[name][c] if name in row else np.nan for row in rows]
+        return pd.DataFrame(data)
+
+    def test_aggregate_all(self):
+        df = self.frames(
+            {'nariz': (90, 150, 1.0), 'cabeza': (80, 150, 1.0)},
+            {'nariz': (90, 150, 1.0), 'cabeza': (20, 150, 1.0)},
+        )
+        rule = {'keypoints': ['nariz', 'cabeza'], 'roi_class_ids': [0]}
+        engine = self.engine()
+        np.testing.assert_array_equal(engine.evaluate(df, [rule])['objeto_1'], [True, True])
+        np.testing.assert_array_equal(engine.evaluate(df, [{**rule, 'aggregate': 'all'}])['objeto_1'], [True, False])
+
+    def test_aggregate_weighted(self):
+        df = self.frames(
+            {'nariz': (90, 150, 0.9), 'cabeza': (20, 150, 0.1)},
+            {'nariz': (20, 150, 0.9), 'cabeza': (90, 150, 0.1)},
+            {'nariz': (90, 150, 0.3), 'cabeza': (20, 150, 0.1)},
+        )
+        rule = {'keypoints': ['nariz', 'cabeza'], 'aggregate': 'weighted', 'roi_class_ids': [0]}
+        masks = self.engine().evaluate(df, [rule])
+        np.testing.assert_array_equal(masks['objeto_1'], [True, False, True])
+        masks = self.engine().evaluate(df, [{**rule, 'min_score': 0.8}])
+        np.testing.assert_array_equal(masks['objeto_1'], [True, False, False])
+
+    def test_min_visibility(self):
+        df = self.frames({'nariz': (90, 150, 0.3)}, {'nariz': (90, 150, 0.8)}, {'nariz': (90, 150, np.nan)})
+        rule = {'keypoints': ['nariz'], 'roi_class_ids': [0]}
+        engine = self.engine()
+        np.testing.assert_array_equal(engine.evaluate(df, [rule])['objeto_1'], [True, True, True])
+        np.testing.assert_array_equal(
+            engine.evaluate(df, [{**rule, 'min_visibility': 0.5}])['objeto_1'], [False, True, False]
+        )
+
+    def test_facing(self):
+        # Misma nariz junto al objeto; en el segundo frame el cuello queda delante y mira hacia fuera
+        df = self.frames(
+            {'nariz': (90, 150, 1.0), 'cuello': (60, 150, 1.0)},
+            {'nariz': (90, 150, 1.0), 'cuello': (120, 150, 1.0)},
+            {'nariz': (90, 150, 1.0), 'cuello': (80, 100, 1.0)},
+        )
+        rule = {'keypoints': ['nariz'], 'roi_class_ids': [0], 'facing': {'from': 'cuello', 'to': 'nariz', 'max_angle': 45}}
+        engine = self.engine()
+        np.testing.assert_array_equal(engine.evaluate(df, [rule])['objeto_1'], [True, False, False])
+        rule['facing']['max_angle'] = 90
+        np.testing.assert_array_equal(engine.evaluate(df, [rule])['objeto_1'], [True, False, True])
+
+    def test_max_distance_cm(self):
+        df = self.frames({'nariz': (70, 150, 1.0)})
+        rule = {'keypoints': ['nariz'], 'max_distance_cm': 2.0, 'roi_class_ids': [0]}
+        self.assertFalse(self.engine(pixels_per_cm=10).evaluate(df, [rule])['objeto_1'][0])
+        self.assertTrue(self.engine(pixels_per_cm=20).evaluate(df, [rule])['objeto_1'][0])
+        with self.assertRaises(ValueError):
+            self.engine().evaluate(df, [rule])
+
+    def test_roi_class_ids(self):
+        # A 25 px de los dos objetos
+        df = self.frames({'nariz': (225, 150, 1.0)})
+        engine = self.engine()
+        masks = engine.evaluate(df, [{'keypoints': ['nariz']}])
+        self.assertTrue(masks['objeto_1'][0] and masks['objeto_2'][0])
+        masks = engine.evaluate(df, [{'keypoints': ['nariz'], 'roi_class_ids': [1]}])
+        self.assertEqual((masks['objeto_1'][0], masks['objeto_2'][0]), (False, True))
+        masks = engine.evaluate(df, [{'keypoints': ['nariz'], 'exclude_roi_class_ids': [1]}])
+        self.assertEqual((masks['objeto_1'][0], masks['objeto_2'][0]), (True, False))
+
+
+class ExplorationTimeCourseTests(TestCase):
+    """bins() con sumas prefijas frente a la suma directa por bin de la máscara por frame"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.fps = 30.0
+        self.mask = {
+            'objeto_1': rng.random(9001) < 0.3,
+            'objeto_2': np.repeat(rng.random(300) < 0.5, 31)[:9001],
+        }
+        self.timecourse = ExplorationTimeCourse(list(self.mask), self.fps, {
+            source: ExplorationTimeCourse._prefix(np.array([self.mask[roi] for roi in self.mask], dtype=np.int8))
+            for source in ExplorationTimeCourse.SOURCES
+        })
+
+    def naive_bins(self, bin_frames, start_frame, end_frame):
+        """Frames con exploración por bin, recorriendo la máscara frame a frame"""
+        counts = {roi: [] for roi in self.mask}
+        for a in range(start_frame, end_frame, bin_frames):
+            b = min(a + bin_frames, end_frame)
+            for roi, mask in self.mask.items():
+                counts[roi].append(int(sum(mask[f] for f in range(a, b))))
+        return counts
+
+    def seconds(self, counts):
+        return {roi: [round(c / self.fps, 3) for c in roi_counts] for roi, roi_counts in counts.items()}
+
+    def test_prefix_bins_match_naive_sum(self):
+        for bin_seconds, start, end in [(10, None, None), (7.3, 12.5, 250), (1 / 30, 100, 103), (500, None, None)]:
+            with self.subTest(bin_seconds=bin_seconds, start=start, end=end):
+                binned = self.timecourse.bins(bin_seconds, start=start, end=end)
+                start_frame = int(round((start or 0) * self.fps))
+                end_frame = 9001 if end is None else int(round(end * self.fps))
+                counts = self.naive_bins(int(round(bin_seconds * self.fps)), start_frame, end_frame)
+
+                self.assertEqual(binned['seconds'], self.seconds(counts))
+                self.assertEqual(binned['cumulative'], self.seconds({
+                    roi: np.cumsum(roi_counts).tolist() for roi, roi_counts in counts.items()
+                }))
+                self.assertEqual(binned['edges'][0], round(start_frame / self.fps, 3))
+                self.assertEqual(binned['edges'][-1], round(end_frame / self.fps, 3))
+
+    def test_bin_count_is_capped(self):
+        binned = self.timecourse.bins(0.01)
+        self.assertLessEqual(len(binned['edges']) - 1, ExplorationTimeCourse.MAX_BINS)
+        self.assertEqual(binned['bin_seconds'], round(5 / self.fps, 6))
+        self.assertEqual(binned['seconds'], self.seconds(self.naive_bins(5, 0, 9001)))
+
+
+class KinematicsAnalyzerTests(TestCase):
+    """Resultados por bloques idénticos al cálculo en un solo bloque y filtrado de saltos"""
+
+    def trajectory(self, n=5000, seed=11):
+        rng = np.random.default_rng(seed)
+        frames = np.cumsum(rng.choice([1, 1, 1, 2], size=n))
+        center = 300 + np.cumsum(rng.normal(0, 2.0, (n, 2)), axis=0)
+        df = pd.DataFrame({'frame': frames})
+        for name, offset in (('cuello', (10, 0)), ('base_cola', (-30, 0)), ('nariz', (25, 5))):
+            df[f'{name}_x'] = center[:, 0] + offset[0]
+            df[f'{name}_y'] = center[:, 1] + offset[1]
+        missing = rng.random(n) < 0.03
+        df.loc[missing, df.columns != 'frame'] = np.nan
+        return df
+
+    def test_chunked_matches_single_chunk(self):
+        df = self.trajectory()
+        whole = KinematicsAnalyzer(df, fps=30.0, pixels_per_cm=15.0, chunk_size=len(df))
+        for chunk_size in (1, 7, 1000, 4999):
+            with self.subTest(chunk_size=chunk_size):
+                chunked = KinematicsAnalyzer(df, fps=30.0, pixels_per_cm=15.0, chunk_size=chunk_size)
+                for name, values in whole.per_frame().items():
+                    np.testing.assert_array_equal(chunked.per_frame()[name], values, err_msg=name)
+                self.assertEqual(chunked.summarize(), whole.summarize())
+
+    def test_default_max_speed_drops_detection_jumps(self):
+        df = self.trajectory(n=300)
+        df.loc[150, ['cuello_x', 'base_cola_x', 'nariz_x']] += 800
+        analyzer = KinematicsAnalyzer(df, fps=30.0)
+        self.assertEqual(analyzer.max_speed, KinematicsAnalyzer.DEFAULT_MAX_SPEED['px'])
+
+        speed = analyzer.per_frame()['speed']
+        self.assertTrue(np.isnan(speed[150]) and np.isnan(speed[151]))
+        self.assertLess(analyzer.summarize()['max_speed'], analyzer.max_speed)
+
+
+class RecordingProgressPublisher(ProgressPublisher):
+    """Publicador en memoria que anota cada evento junto al estado que vería el endpoint"""
+
+    def __init__(self, snapshot=None):
+        self.snapshot = snapshot
+        self.events = []
+
+    def publish(self, experiment_id, stage, current=None, total=None, status=None):
+        self.snapshot = {'experiment_id': experiment_id, 'stage': stage, 'current': current,
+                         'total': total, 'status': status}
+        status_data = ExperimentStatusService(self).get_status(experiment_id)
+        self.events.append((stage, status, status_data['processing_status'], status_data['progress']['stage']))
+
+    def get_snapshot(self, experiment_id):
+        return self.snapshot
+
+    def subscribe(self, experiment_id):
+        raise NotImplementedError
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ReanalysisProgressTests(TestCase):
+    """El re-análisis publica su propio progreso en lugar de dejar el 'completed' anterior"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.experiment = SyntheticDataGenerator(seed=5).create_analysis_experiment(frames=900, clips_per_object=1)
+        # Snapshot que deja el procesamiento original
+        self.publisher = RecordingProgressPublisher(
+            {'experiment_id': self.experiment.id, 'stage': 'completed', 'status': 'COM'}
+        )
+        self.service = ExperimentService(file_storage=None, video_processor=None, progress_publisher=self.publisher)
+
+    def test_reanalysis_publishes_progress(self):
+        self.service.reanalyze_experiment(self.experiment.id, {'min_interaction_frames': 6})
+
+        stages = [event[0] for event in self.publisher.events]
+        self.assertEqual(stages[0], 'started')
+        self.assertIn('analysis', stages)
+        self.assertEqual(self.publisher.events[-1][:2], ('completed', 'COM'))
+        # Mientras dura el re-análisis el estado y el progreso son coherentes
+        for stage, _, processing_status, progress_stage in self.publisher.events[1:-1]:
+            self.assertEqual((processing_status, progress_stage), ('PRO', stage))
+
+        status = ExperimentStatusService(self.publisher).get_status(self.experiment.id)
+        self.assertEqual((status['processing_status'], status['progress']['stage']), ('COM', 'completed'))
+
+    def test_failed_reanalysis_publishes_failure(self):
+        with mock.patch('core.services.pipeline_total_v2.ROIAnalyzer.analyze', side_effect=RuntimeError('fallo')):
+            with self.assertRaises(RuntimeError):
+                self.service.reanalyze_experiment(self.experiment.id, {'min_interaction_frames': 6})
+
+        self.assertEqual(self.publisher.events[-1][:2], ('failed', 'COM'))
+        status = ExperimentStatusService(self.publisher).get_status(self.experiment.id)
+        self.assertEqual((status['processing_status'], status['progress']['stage']), ('COM', 'failed'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HeatmapServiceTests(TestCase):
+    """Mapas frente a np.histogram2d directo y caché en disco ligada a la firma del almacén"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.experiment = SyntheticDataGenerator(seed=9).create_analysis_experiment(frames=900, clips_per_object=1)
+        self.artifacts = ExperimentArtifacts.for_experiment(self.experiment)
+
+    def expected_map(self, df, kind, grid=HeatmapService.DEFAULT_GRID):
+        width, height = SyntheticDataGenerator.FRAME_SIZE
+        if kind == 'nose':
+            x, y = df['nariz_x'], df['nariz_y']
+        else:
+            # Mismo redondeo que el almacén: la media se hace en float32
+            x = (df['cuello_x'].astype(np.float32) + df['base_cola_x'].astype(np.float32)) / 2
+            y = (df['cuello_y'].astype(np.float32) + df['base_cola_y'].astype(np.float32)) / 2
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        valid = np.isfinite(x) & np.isfinite(y)
+        counts, _, _ = np.histogram2d(
+            y[valid], x[valid], bins=[round(grid * height / width), grid], range=[[0, height], [0, width]]
+        )
+        return counts / 30.0
+
+    def test_compute_matches_histogram2d(self):
+        service = HeatmapService.for_experiment(self.experiment)
+        df = service.store.to_dataframe()
+        for kind in HeatmapService.KINDS:
+            for grid in (16, 64):
+                with self.subTest(kind=kind, grid=grid):
+                    result = service.compute(kind, grid)
+                    self.assertEqual(result['grid'], [grid, round(grid * 720 / 1280)])
+                    np.testing.assert_allclose(result['maps']['all'], self.expected_map(df, kind, grid), rtol=1e-6)
+
+    def test_cache_reused_and_invalidated_by_store_signature(self):
+        first = HeatmapService.for_experiment(self.experiment).get('occupancy')
+        with mock.patch.object(HeatmapService, 'compute', side_effect=AssertionError('recalculado')):
+            cached = HeatmapService.for_experiment(self.experiment).get('occupancy')
+        np.testing.assert_array_equal(cached['maps']['all'], first['maps']['all'])
+        old_dirs = os.listdir(os.path.join(self.artifacts.workdir, HeatmapService.HEATMAPS_DIR))
+
+        # Nuevas predicciones: cambia la firma, se recalcula y se borra la caché anterior
+        TrajectoryStore.write(SyntheticDataGenerator(seed=10).predictions(600), self.artifacts.trajectory_store, fps=30.0)
+        service = HeatmapService.for_experiment(self.experiment)
+        refreshed = service.get('occupancy')
+        np.testing.assert_allclose(refreshed['maps']['all'], self.expected_map(service.store.to_dataframe(), 'occupancy'),
+                                   rtol=1e-6)
+        new_dirs = os.listdir(os.path.join(self.artifacts.workdir, HeatmapService.HEATMAPS_DIR))
+        self.assertEqual(len(new_dirs), 1)
+        self.assertNotIn(new_dirs[0], old_dirs)
+
+    def test_split_by_roi_and_episode(self):
+        self.assertFalse(os.path.exists(self.artifacts.timecourse))
+        service = HeatmapService.for_experiment(self.experiment)
+        total = service.get('nose')['maps']['all']
+
+        # El timecourse se genera al pedir la separación, igual que en su endpoint
+        by_roi = service.get('nose', split='roi')['maps']
+        self.assertTrue(os.path.exists(self.artifacts.timecourse))
+        self.assertEqual(sorted(by_roi), sorted(ExplorationTimeCourse.load(self.artifacts.timecourse).roi_names))
+        self.assertTrue(any(values.sum() > 0 for values in by_roi.values()))
+
+        by_episode = service.get('nose', split='episode')['maps']
+        self.assertEqual(sorted(by_episode), ['in_episode', 'outside_episode'])
+        np.testing.assert_allclose(by_episode['in_episode'] + by_episode['outside_episode'], total, atol=1e-5)
+        self.assertTrue(np.all(sum(by_roi.values()) >= by_episode['in_episode'] - 1e-5))
+
+
+class ROIAnalyzerSweepTests(TestCase):
+    """sweep() sobre una rejilla da lo mismo que un analyze() independiente por combinación"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media, CACHES=LOCMEM_CACHES)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        experiment = SyntheticDataGenerator(seed=12).create_analysis_experiment(frames=3000, clips_per_object=1)
+        self.artifacts = ExperimentArtifacts.for_experiment(experiment)
+
+    def analyzer(self, **params):
+        from core.services.pipeline_total_v2 import ROIAnalyzer
+        return ROIAnalyzer(
+            data_path=self.artifacts.predictions_path,
+            json_path=self.artifacts.rois_json,
+            video_path=self.artifacts.video_path,
+            **{**VideoProcessingService.DEFAULT_ANALYZER_PARAMS, **params}
+        )
+
+    def test_sweep_matches_separate_analyze_runs(self):
+        grid = {'proximity_threshold': [10, 40, 90], 'min_interaction_frames': [1, 4, 15]}
+        swept = self.analyzer().sweep(grid)
+        param_names = list(VideoProcessingService.DEFAULT_ANALYZER_PARAMS)
+
+        self.assertEqual(len(swept.groupby(param_names)), 9)
+        totals = set()
+        for proximity in grid['proximity_threshold']:
+            for min_frames in grid['min_interaction_frames']:
+                with self.subTest(proximity_threshold=proximity, min_interaction_frames=min_frames):
+                    result = self.analyzer(proximity_threshold=proximity, min_interaction_frames=min_frames).analyze()
+                    rows = swept[(swept['proximity_threshold'] == proximity) &
+                                 (swept['min_interaction_frames'] == min_frames)]
+
+                    self.assertTrue((rows['episodes_all_classes'] == len(result['episodes'])).all())
+                    expected = result['aggregated'].reset_index(drop=True)
+                    actual = rows.drop(columns=[*param_names, 'episodes_all_classes'])
+                    if expected.empty:
+                        self.assertTrue(actual.isna().all().all())
+                        continue
+                    pd.testing.assert_frame_equal(
+                        actual[expected.columns].reset_index(drop=True), expected, check_dtype=False
+                    )
+                    totals.add(round(float(expected['total_time_seconds'].sum()), 6))
+        # La rejilla cambia de verdad el resultado
+        self.assertGreater(len(totals), 3)
@@ -1,5 +1,5 @@
 from interfaces.ai.video_processor import VideoProcessor
-from core.tasks.experiment_tasks import process_experiment_task
+from core.tasks.experiment_tasks import process_experiment_task, reanalyze_experiment_task
 
 class CeleryVideoAdapter(VideoProcessor):
     """Adaptador para procesamiento asíncrono con Celery"""
@@ -10,4 +10,11 @@ class CeleryVideoAdapter(VideoProcessor):
         return {
             'task_id': task.id,
             'status': 'queued'
-        }
\ No newline at end of file
+        }
+
+    def reanalyze(self, experiment_id: int, analyzer_params: dict) -> dict:
+        task = reanalyze_experiment_task.delay(experiment_id, analyzer_params)
+        return {
+            'task_id': task.id,
+            'status': 'queued'
+        }
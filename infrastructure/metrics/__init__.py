@@ -0,0 +1,23 @@
+from .prometheus import (  # noqa
+    API_REQUEST_LATENCY,
+    API_DB_QUERIES,
+    TASK_DURATION,
+    PIPELINE_STAGE_DURATION,
+    INFERENCE_FRAMES,
+    INFERENCE_FPS,
+    CLIPS_ENCODED,
+    CLIP_ENCODE_RATE,
+    render_latest
+)
+
+__all__ = [
+    'API_REQUEST_LATENCY',
+    'API_DB_QUERIES',
+    'TASK_DURATION',
+    'PIPELINE_STAGE_DURATION',
+    'INFERENCE_FRAMES',
+    'INFERENCE_FPS',
+    'CLIPS_ENCODED',
+    'CLIP_ENCODE_RATE',
+    'render_latest'
+]
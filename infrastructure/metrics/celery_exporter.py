@@ -0,0 +1,41 @@
+import time
+import logging
+from celery.signals import task_prerun, task_postrun, worker_ready
+from prometheus_client import start_http_server
+from django.conf import settings
+from .prometheus import TASK_DURATION, register_queue_depth_collector
+
+logger = logging.getLogger(__name__)
+
+_task_started_at = {}
+
+
+def _on_task_prerun(task_id=None, **kwargs):
+    _task_started_at[task_id] = time.perf_counter()
+
+
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started_at.pop(task_id, None)
+    if started is None:
+        return
+    TASK_DURATION.labels(
+        task=getattr(task, 'name', 'unknown'),
+        state=state or 'UNKNOWN'
+    ).observe(time.perf_counter() - started)
+
+
+def _on_worker_ready(**kwargs):
+    port = settings.CELERY_METRICS_PORT
+    if not port:
+        return
+    register_queue_depth_collector()
+    start_http_server(port)
+    logger.info(f"Exportador de métricas de Celery escuchando en el puerto {port}")
+
+
+def install_celery_metrics(app):
+    """Conecta las señales de Celery con las métricas del worker"""
+    task_prerun.connect(_on_task_prerun, weak=False)
+    task_postrun.connect(_on_task_postrun, weak=False)
+    worker_ready.connect(_on_worker_ready, weak=False)
+    return app
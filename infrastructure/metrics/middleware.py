@@ -0,0 +1,45 @@
+import time
+from django.db import connection
+from .prometheus import API_REQUEST_LATENCY, API_DB_QUERIES
+
+
+class _QueryCounter:
+    """execute_wrapper que cuenta las consultas SQL de una petición"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class PrometheusMetricsMiddleware:
+    """Registra latencia y número de consultas SQL por vista"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        start = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        view = self._get_view_name(request)
+        API_REQUEST_LATENCY.labels(
+            view=view,
+            method=request.method,
+            status=str(response.status_code)
+        ).observe(elapsed)
+        API_DB_QUERIES.labels(view=view, method=request.method).observe(counter.count)
+        return response
+
+    def _get_view_name(self, request) -> str:
+        # Se usa el nombre de la clase de la vista para acotar la cardinalidad
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        view_class = getattr(match.func, 'view_class', None)
+        if view_class is not None:
+            return view_class.__name__
+        return getattr(match.func, '__name__', match.view_name or 'unknown')
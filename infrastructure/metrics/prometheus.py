@@ -0,0 +1,139 @@
+import os
+import logging
+from urllib.parse import urlparse
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    CONTENT_TYPE_LATEST,
+    multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Latencia y consultas SQL por vista de la API
+API_REQUEST_LATENCY = Histogram(
+    'ratlab_api_request_duration_seconds',
+    'Latencia de las peticiones HTTP por vista',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+API_DB_QUERIES = Histogram(
+    'ratlab_api_db_queries',
+    'Consultas SQL ejecutadas por petición',
+    ['view', 'method'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+)
+
+# Tareas de Celery y etapas del pipeline
+TASK_DURATION = Histogram(
+    'ratlab_celery_task_duration_seconds',
+    'Duración de las tareas de Celery',
+    ['task', 'state'],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+PIPELINE_STAGE_DURATION = Histogram(
+    'ratlab_pipeline_stage_duration_seconds',
+    'Duración de cada etapa del pipeline de video',
+    ['stage'],
+    buckets=(0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+INFERENCE_FRAMES = Counter(
+    'ratlab_inference_frames_total',
+    'Frames procesados por el modelo de keypoints'
+)
+INFERENCE_FPS = Gauge(
+    'ratlab_inference_fps',
+    'FPS de inferencia de keypoints en la última ejecución',
+    multiprocess_mode='mostrecent'
+)
+CLIPS_ENCODED = Counter(
+    'ratlab_clips_encoded_total',
+    'Clips de video codificados'
+)
+CLIP_ENCODE_RATE = Gauge(
+    'ratlab_clip_encode_rate',
+    'Clips codificados por segundo en la última ejecución',
+    multiprocess_mode='mostrecent'
+)
+
+
+class QueueDepthCollector:
+    """Publica la longitud de las colas de Celery leyendo el broker Redis en cada scrape"""
+
+    def __init__(self, broker_url: str, queues):
+        self.broker_url = broker_url
+        self.queues = [q for q in queues if q]
+        self._client = None
+
+    def _get_client(self):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(
+                self.broker_url,
+                socket_timeout=1,
+                socket_connect_timeout=1
+            )
+        return self._client
+
+    def describe(self):
+        # Evita que el registro consulte el broker al registrar el collector
+        return [GaugeMetricFamily('ratlab_celery_queue_depth', '', labels=['queue'])]
+
+    def collect(self):
+        metric = GaugeMetricFamily(
+            'ratlab_celery_queue_depth',
+            'Tareas pendientes por cola de Celery',
+            labels=['queue']
+        )
+        if urlparse(self.broker_url).scheme not in ('redis', 'rediss'):
+            return
+        try:
+            client = self._get_client()
+            for queue in self.queues:
+                metric.add_metric([queue], client.llen(queue))
+        except Exception as e:
+            logger.warning(f"No se pudo leer la profundidad de colas: {str(e)}")
+            return
+        yield metric
+
+
+_queue_collector = None
+
+
+def get_queue_depth_collector() -> QueueDepthCollector:
+    global _queue_collector
+    if _queue_collector is None:
+        _queue_collector = QueueDepthCollector(
+            broker_url=settings.CELERY_BROKER_URL,
+            queues=settings.CELERY_METRICS_QUEUES
+        )
+    return _queue_collector
+
+
+def register_queue_depth_collector(registry=REGISTRY):
+    """Registra el collector de colas una única vez por registry"""
+    collector = get_queue_depth_collector()
+    try:
+        registry.register(collector)
+    except ValueError:
+        # Ya registrado
+        pass
+    return collector
+
+
+def render_latest():
+    """Devuelve (payload, content_type) con el estado actual de las métricas"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(get_queue_depth_collector())
+    else:
+        registry = REGISTRY
+        register_queue_depth_collector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
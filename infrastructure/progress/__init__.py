@@ -0,0 +1,5 @@
+from .redis_progress import RedisProgressPublisher  # noqa
+
+__all__ = [
+    'RedisProgressPublisher'
+]
@@ -0,0 +1,88 @@
+import json
+import time
+import logging
+from typing import Dict, Optional
+import redis
+from django.conf import settings
+from interfaces.progress.progress_publisher import ProgressPublisher
+
+logger = logging.getLogger(__name__)
+
+
+class RedisProgressSubscription:
+    """Suscripción al canal de progreso de un experimento"""
+    CONFIRM_TIMEOUT = 5.0
+
+    def __init__(self, pubsub, channel: str):
+        self.pubsub = pubsub
+        self.pubsub.subscribe(channel)
+        # Se espera la confirmación: a partir de aquí ningún mensaje publicado se pierde
+        deadline = time.monotonic() + self.CONFIRM_TIMEOUT
+        while time.monotonic() < deadline:
+            message = self.pubsub.get_message(timeout=deadline - time.monotonic())
+            if message and message.get('type') == 'subscribe':
+                break
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        message = self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if not message or message.get('type') != 'message':
+            return None
+        return json.loads(message['data'])
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisProgressPublisher(ProgressPublisher):
+    """Guarda el último progreso en una clave Redis y lo difunde por pub/sub"""
+    KEY_TEMPLATE = "experiment:{experiment_id}:progress"
+    SNAPSHOT_TTL = 60 * 60 * 24
+
+    def __init__(self, redis_url: Optional[str] = None, min_interval: float = 0.5):
+        self.client = redis.Redis.from_url(redis_url or settings.PROGRESS_REDIS_URL)
+        self.min_interval = min_interval
+        self._last_published = {}
+        self._last_status = {}
+
+    def _key(self, experiment_id: int) -> str:
+        return self.KEY_TEMPLATE.format(experiment_id=experiment_id)
+
+    def publish(self, experiment_id: int, stage: str, current: Optional[int] = None,
+                total: Optional[int] = None, status: Optional[str] = None) -> None:
+        # Limita los eventos por frame; los cambios de etapa siempre se publican
+        now = time.monotonic()
+        last_stage, last_time = self._last_published.get(experiment_id, (None, 0.0))
+        is_last_step = current is not None and total is not None and current >= total
+        if stage == last_stage and not is_last_step and now - last_time < self.min_interval:
+            return
+        self._last_published[experiment_id] = (stage, now)
+
+        snapshot = {
+            "experiment_id": experiment_id,
+            "stage": stage,
+            "current": current,
+            "total": total,
+            "progress": round(current / total, 4) if current is not None and total else None,
+            "updated_at": time.time()
+        }
+        if status is not None:
+            self._last_status[experiment_id] = status
+        snapshot["status"] = self._last_status.get(experiment_id)
+
+        payload = json.dumps(snapshot)
+        try:
+            self.client.set(self._key(experiment_id), payload, ex=self.SNAPSHOT_TTL)
+            self.client.publish(self._key(experiment_id), payload)
+        except redis.RedisError as e:
+            logger.warning(f"No se pudo publicar el progreso del experimento {experiment_id}: {str(e)}")
+
+    def get_snapshot(self, experiment_id: int) -> Optional[Dict]:
+        try:
+            payload = self.client.get(self._key(experiment_id))
+        except redis.RedisError as e:
+            logger.warning(f"No se pudo leer el progreso del experimento {experiment_id}: {str(e)}")
+            return None
+        return json.loads(payload) if payload else None
+
+    def subscribe(self, experiment_id: int) -> RedisProgressSubscription:
+        return RedisProgressSubscription(self.client.pubsub(), self._key(experiment_id))
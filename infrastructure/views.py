@@ -1,3 +1,8 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from infrastructure.metrics import render_latest
 
-# Create your views here.
+
+def metrics_view(request):
+    """Endpoint de métricas en formato Prometheus (GET)"""
+    payload, content_type = render_latest()
+    return HttpResponse(payload, content_type=content_type)
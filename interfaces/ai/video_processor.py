@@ -6,4 +6,9 @@ class VideoProcessor(ABC):
     @abstractmethod
     def process(self, experiment_id: int) -> dict:
         """Procesa un experimento y devuelve metadata"""
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    @abstractmethod
+    def reanalyze(self, experiment_id: int, analyzer_params: dict) -> dict:
+        """Re-analiza las predicciones guardadas con nuevos parámetros"""
+        raise NotImplementedError
@@ -0,0 +1,5 @@
+from .progress_publisher import ProgressPublisher  # noqa
+
+__all__ = [
+    'ProgressPublisher'
+]
@@ -0,0 +1,22 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+class ProgressPublisher(ABC):
+    """Contrato para publicar el progreso de procesamiento de un experimento"""
+    TERMINAL_STAGES = ('completed', 'failed')
+
+    @abstractmethod
+    def publish(self, experiment_id: int, stage: str, current: Optional[int] = None,
+                total: Optional[int] = None, status: Optional[str] = None) -> None:
+        """Publica la etapa actual y el avance dentro de ella"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_snapshot(self, experiment_id: int) -> Optional[Dict]:
+        """Devuelve el último progreso publicado (o None)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def subscribe(self, experiment_id: int):
+        """Devuelve una suscripción con get(timeout) y close()"""
+        raise NotImplementedError